@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Query-count regression benchmark for FundEngine.calculate_batch_valuation.
+
+    python scripts/bench_batch_queries.py                  # 200 funds from fund_holdings
+    python scripts/bench_batch_queries.py --funds 50 --max-queries 5
+
+Counts every cursor.execute issued while valuing a batch (cold: empty holdings
+cache, warm: second call) and exits non-zero when the warm call exceeds
+--max-queries, so per-fund query loops show up as a failure instead of latency.
+Needs a populated database; quotes come from the usual quote book / upstream.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alphasignal.core.database import get_db
+from src.alphasignal.core.fund_engine import FundEngine
+
+
+class _CountingCursor:
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter["queries"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _CountingConn:
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._conn.cursor(*args, **kwargs), self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def sample_funds(db, n):
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT fund_code FROM fund_holdings ORDER BY fund_code LIMIT %s", (n,))
+            return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--funds", type=int, default=200)
+    parser.add_argument("--max-queries", type=int, default=10, help="fail if the warm batch issues more queries")
+    args = parser.parse_args()
+
+    db = get_db()
+    codes = sample_funds(db, args.funds)
+    if not codes:
+        print("fund_holdings is empty; nothing to benchmark")
+        return 1
+
+    counter = {"queries": 0}
+    get_connection = db.get_connection
+    db.get_connection = lambda: _CountingConn(get_connection(), counter)
+    db._get_conn = db.get_connection
+
+    engine = FundEngine(db=db)
+    engine.redis = None  # count DB work only: no metadata / valuation cache hits
+    engine._locks.redis = None
+
+    print(f"{len(codes)} funds")
+    warm = None
+    for label in ("cold", "warm"):
+        counter["queries"] = 0
+        started = time.perf_counter()
+        results = engine.calculate_batch_valuation(codes, use_cache=False)
+        ms = (time.perf_counter() - started) * 1000
+        warm = counter["queries"]
+        print(f"  {label}: {counter['queries']:4d} queries  {ms:8.1f}ms  {len(results)} results")
+
+    if warm > args.max_queries:
+        print(f"FAIL: warm batch issued {warm} queries (max {args.max_queries})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
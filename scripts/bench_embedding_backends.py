@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare deduplicator embedding backends on a stored corpus.
+
+    python scripts/bench_embedding_backends.py                       # last 2000 intelligence rows
+    python scripts/bench_embedding_backends.py --limit 5000 --backends sentence_transformer int8
+    python scripts/bench_embedding_backends.py --file corpus.txt     # one text per line, no DB
+
+Each backend runs in its own process so memory numbers are not mixed: load time,
+resident memory after loading and after encoding, and throughput (texts/sec).
+Every candidate is then checked against the first (reference) backend: cosine
+between the two vectors of each text, and agreement of the semantic duplicate
+decision the deduplicator would take replaying the corpus in order.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.embedding_buffer import EmbeddingRingBuffer
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def load_corpus(args):
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        from src.alphasignal.core.database import IntelligenceDB
+        conn = IntelligenceDB()._get_conn()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT content FROM intelligence
+            WHERE content IS NOT NULL AND content <> ''
+            ORDER BY timestamp ASC LIMIT %s
+        """, (args.limit,))
+        texts = [row[0] for row in cursor.fetchall()]
+        conn.close()
+    from src.alphasignal.core.deduplication import NewsDeduplicator
+    normalize = NewsDeduplicator().normalize
+    return [t for t in (normalize(t) for t in texts) if t]
+
+
+def run_backend(name, model_name, texts, batch_size):
+    from src.alphasignal.core.embedding_backends import get_embedding_backend
+    base = rss_mb()
+    backend = get_embedding_backend(name, model_name)
+    started = time.perf_counter()
+    backend.warm_up(background=False)
+    load_s = time.perf_counter() - started
+    loaded = rss_mb()
+    started = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    encode_s = time.perf_counter() - started
+    return {
+        "name": name, "vectors": vectors, "load_s": load_s, "texts_per_s": len(texts) / encode_s,
+        "rss_loaded_mb": loaded - base, "rss_peak_mb": rss_mb() - base,
+    }
+
+
+def duplicate_decisions(vectors, threshold):
+    """Replay the semantic check in corpus order: duplicates are not added to history."""
+    history = EmbeddingRingBuffer(capacity=len(vectors) + 1)
+    decisions = np.zeros(len(vectors), dtype=bool)
+    for i, v in enumerate(vectors):
+        decisions[i] = history.any_above(v, threshold)
+        if not decisions[i]:
+            history.add(v, i)
+    return decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sentence_transformer", "int8"],
+                        help="First one is the reference")
+    parser.add_argument("--model", default=settings.NEWS_EMBEDDING_MODEL)
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--file", help="Plain-text corpus instead of the intelligence table")
+    parser.add_argument("--batch-size", type=int, default=settings.NEWS_DEDUPE_ENCODE_BATCH)
+    parser.add_argument("--threshold", type=float, default=0.85, help="Semantic duplicate threshold")
+    args = parser.parse_args()
+
+    texts = load_corpus(args)
+    if not texts:
+        print("Empty corpus.")
+        return 1
+    print(f"Corpus: {len(texts)} texts, model {args.model}, batch {args.batch_size}\n")
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for name in args.backends:
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(run_backend, (name, args.model, texts, args.batch_size)))
+
+    ref = results[0]
+    ref_unit = ref["vectors"] / np.linalg.norm(ref["vectors"], axis=1, keepdims=True)
+    ref_dups = duplicate_decisions(ref["vectors"], args.threshold)
+    print(f"{'backend':<22} {'load s':>7} {'texts/s':>9} {'RSS load MB':>12} {'RSS peak MB':>12} "
+          f"{'cos mean':>9} {'cos min':>8} {'dups':>6} {'agree':>7}")
+    for r in results:
+        unit = r["vectors"] / np.linalg.norm(r["vectors"], axis=1, keepdims=True)
+        cos = (unit * ref_unit).sum(axis=1)
+        dups = duplicate_decisions(r["vectors"], args.threshold)
+        print(f"{r['name']:<22} {r['load_s']:7.1f} {r['texts_per_s']:9.1f} {r['rss_loaded_mb']:12.0f} "
+              f"{r['rss_peak_mb']:12.0f} {cos.mean():9.4f} {cos.min():8.4f} {int(dups.sum()):6d} "
+              f"{(dups == ref_dups).mean() * 100:6.2f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
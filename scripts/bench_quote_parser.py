@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the qt.gtimg.cn quote parser.
+
+    python scripts/bench_quote_parser.py                       # synthetic 5,000-quote payload
+    python scripts/bench_quote_parser.py --payload quotes.bin  # recorded payload
+    python scripts/bench_quote_parser.py --record quotes.bin   # record one from the holdings universe
+
+Compares the legacy str-split parser (as it was inlined in calculate_batch_valuation)
+with providers.market.tencent_parser.parse_payload.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alphasignal.providers.market.tencent_parser import parse_payload
+
+
+def synthetic_payload(n=5000, fields=88, seed=7):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        market = rnd.choice(["sh", "sz", "hk", "us"])
+        code = f"{i:05d}" if market == "hk" else (f"T{i}.OQ" if market == "us" else f"{600000 + i:06d}")
+        parts = [str(rnd.randint(0, 99)) for _ in range(fields)]
+        parts[1] = "测试股票" + str(i)
+        parts[2] = code
+        parts[3] = f"{rnd.uniform(1, 500):.2f}"
+        parts[32] = f"{rnd.uniform(-10, 10):.2f}"
+        secid = market + (code.split(".")[0] if market == "us" else code)
+        lines.append(f'v_{secid}="{"~".join(parts)}";\n')
+    return "".join(lines).encode("gbk")
+
+
+def legacy_parse(payload):
+    quotes = {}
+    content = payload.decode('gbk', errors='ignore')
+    for line in content.split(';'):
+        line = line.strip()
+        if not line or '=' not in line: continue
+        key_part, val_part = line.split('=', 1)
+        actual_market_code = key_part.replace('v_', '').strip()
+        parts = val_part.strip('"').split('~')
+        if len(parts) > 32:
+            try:
+                real_name = parts[1]
+                price = float(parts[3])
+                pct = float(parts[32])
+                t_code = parts[2]
+                quotes[t_code] = {'price': price, 'change_pct': pct, 'name': real_name}
+                quotes[actual_market_code] = {'price': price, 'change_pct': pct, 'name': real_name}
+                if '.' in t_code and actual_market_code.startswith('us'):
+                    quotes[t_code.split('.')[0]] = {'price': price, 'change_pct': pct, 'name': real_name}
+                if len(actual_market_code) > 2 and actual_market_code[:2] in ['sh', 'sz', 'hk', 'us']:
+                    base_code = actual_market_code[2:]
+                    if base_code not in quotes:
+                        quotes[base_code] = {'price': price, 'change_pct': pct, 'name': real_name}
+            except:
+                pass
+    return quotes
+
+
+def record_payload(path):
+    from src.alphasignal.core.database import IntelligenceDB
+    from src.alphasignal.providers.market.tencent_quotes import get_quote_client
+
+    secids = set()
+    for _, s_code, _ in IntelligenceDB(auto_migrate=False).get_all_fund_holdings():
+        if s_code and s_code.isdigit() and len(s_code) == 6:
+            secids.add(("sh" if s_code.startswith(("6", "9")) else "sz") + s_code)
+        elif s_code and s_code.isdigit() and len(s_code) == 5:
+            secids.add("hk" + s_code)
+    payload = b"".join(get_quote_client().fetch_raw(sorted(secids)))
+    with open(path, "wb") as f:
+        f.write(payload)
+    print(f"Recorded {len(secids)} secids ({len(payload) / 1024:.0f} KB) -> {path}")
+    return payload
+
+
+def bench(fn, payload, rounds):
+    fn(payload)  # warm-up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(payload)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", help="recorded payload file (raw GBK bytes)")
+    parser.add_argument("--record", help="fetch a live payload for all holdings and save it here")
+    parser.add_argument("--quotes", type=int, default=5000, help="synthetic payload size")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        payload = record_payload(args.record)
+    elif args.payload:
+        with open(args.payload, "rb") as f:
+            payload = f.read()
+    else:
+        payload = synthetic_payload(args.quotes)
+
+    n = len(parse_payload(payload))
+    legacy = bench(legacy_parse, payload, args.rounds)
+    fast = bench(parse_payload, payload, args.rounds)
+    print(f"Payload: {len(payload) / 1024:.0f} KB, {n} quotes")
+    print(f"{'legacy str split':<18} {legacy * 1000:8.2f} ms  {n / legacy:12,.0f} quotes/s")
+    print(f"{'parse_payload':<18} {fast * 1000:8.2f} ms  {n / fast:12,.0f} quotes/s  ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Lookup benchmark for the SimHash multi-index used by NewsDeduplicator.rough_duplicate.
+
+    python scripts/bench_simhash_index.py                 # 10k, 100k, 1M history entries
+    python scripts/bench_simhash_index.py --sizes 10000 50000 --queries 2000
+
+For each history size, compares the old linear scan (Simhash.distance against every
+entry) with core.simhash_index.SimhashIndex: build time, lookup latency for random
+(miss) and near-duplicate (hit) probes, and that both return the same answers.
+The linear scan is timed on a sample of probes above 100k entries.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simhash import Simhash
+
+from src.alphasignal.core.simhash_index import SimhashIndex
+
+
+def near(fp, rnd, max_flips):
+    for bit in rnd.sample(range(64), rnd.randint(0, max_flips)):
+        fp ^= 1 << bit
+    return fp
+
+
+def linear_duplicate(history, probe, k):
+    return any(probe.distance(h) <= k for h in history)
+
+
+def run(size, queries, k, rnd):
+    fps = [rnd.getrandbits(64) for _ in range(size)]
+    started = time.perf_counter()
+    index = SimhashIndex(k=k)
+    for fp in fps:
+        index.add(fp, timestamp=0)
+    build_s = time.perf_counter() - started
+
+    probes = [rnd.getrandbits(64) for _ in range(queries // 2)]
+    probes += [near(rnd.choice(fps), rnd, k) for _ in range(queries - len(probes))]
+
+    started = time.perf_counter()
+    indexed = [index.contains_near(p) for p in probes]
+    index_us = (time.perf_counter() - started) / len(probes) * 1e6
+
+    history = [Simhash(fp) for fp in fps]
+    step = 1 if size <= 100_000 else max(1, len(probes) // 20)
+    sample_idx = range(0, len(probes), step)
+    started = time.perf_counter()
+    linear = [linear_duplicate(history, Simhash(probes[i]), k) for i in sample_idx]
+    linear_us = (time.perf_counter() - started) / len(sample_idx) * 1e6
+
+    mismatches = sum(indexed[i] != hit for i, hit in zip(sample_idx, linear))
+    print(f"{size:>9,d} entries | build {build_s:6.2f}s | index {index_us:9.1f} µs/lookup | "
+          f"linear {linear_us:12.1f} µs/lookup | {linear_us / index_us:8.0f}x | "
+          f"hits {sum(indexed)}/{len(probes)} | mismatches {mismatches}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=6, help="Hamming threshold (simhash_threshold)")
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    failures = sum(run(size, args.queries, args.k, rnd) for size in args.sizes)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Regression check for prompt compaction (utils.prompt_compactor): analyze each
+sample item with its full crawled text and with the compacted text, and compare
+the structured outputs.
+
+    python scripts/check_prompt_compaction.py --limit 20 --save sample.jsonl   # crawl recent items, keep the sample
+    python scripts/check_prompt_compaction.py --sample sample.jsonl            # re-run on the stored sample
+    python scripts/check_prompt_compaction.py --sample sample.jsonl --offline  # token savings only, no LLM calls
+
+An item agrees when the sentiment label matches, the sentiment score moves by at
+most --max-score-delta and the urgency by at most --max-urgency-delta. Exits 1 if
+the agreement rate is below --min-agreement.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alphasignal.core.database import IntelligenceDB
+from src.alphasignal.providers.llm.gemini import GeminiLLM
+from src.alphasignal.utils.crawler import AsyncRichCrawler
+from src.alphasignal.utils.prompt_compactor import PromptCompactor
+
+
+def load_sample(path, limit):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()][:limit]
+    rows = IntelligenceDB().get_recent_intelligence(limit=limit)
+    items = [{k: row.get(k) for k in ('id', 'source_id', 'source', 'author', 'url', 'content')} for row in rows if row.get('url')]
+    items = asyncio.run(AsyncRichCrawler().batch_crawl(items))
+    return [item for item in items if item.get('extraction_method') == "JINA_READER"]
+
+
+def _label(result):
+    sentiment = result.get('sentiment')
+    return (sentiment.get('en') if isinstance(sentiment, dict) else str(sentiment or "")).strip().lower()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compare(full, compact, max_score_delta, max_urgency_delta):
+    """(agrees, details) for two analyses of the same item."""
+    score_a, score_b = _number(full.get('sentiment_score')), _number(compact.get('sentiment_score'))
+    urgency_a, urgency_b = _number(full.get('urgency_score')), _number(compact.get('urgency_score'))
+    score_delta = abs(score_a - score_b) if None not in (score_a, score_b) else None
+    urgency_delta = abs(urgency_a - urgency_b) if None not in (urgency_a, urgency_b) else None
+    same_label = _label(full) == _label(compact)
+    agrees = (same_label and score_delta is not None and score_delta <= max_score_delta
+              and urgency_delta is not None and urgency_delta <= max_urgency_delta)
+    return agrees, {"label": (_label(full), _label(compact)), "score_delta": score_delta, "urgency_delta": urgency_delta}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", help="JSONL of stored items (id, source, author, content = full text)")
+    parser.add_argument("--save", help="write the crawled sample to this JSONL for later runs")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default: PROMPT_CONTENT_TOKEN_BUDGET)")
+    parser.add_argument("--offline", action="store_true", help="report token savings only")
+    parser.add_argument("--max-score-delta", type=float, default=0.3)
+    parser.add_argument("--max-urgency-delta", type=float, default=2)
+    parser.add_argument("--min-agreement", type=float, default=0.8)
+    args = parser.parse_args()
+
+    items = load_sample(args.sample, args.limit)
+    if not items:
+        print("No full-text items in the sample.")
+        return 1
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+    compactor = PromptCompactor(budget=args.budget)
+    llm = None if args.offline else GeminiLLM()
+    agreed = compared = 0
+    for item in items:
+        compacted, before, after = compactor.compact(item['content'])
+        line = f"{item.get('source_id') or item.get('id')}: {before} → {after} tokens"
+        if llm is not None:
+            full = llm.analyze(item)
+            compact = llm.analyze(dict(item, prompt_content=compacted))
+            if isinstance(full, dict) and isinstance(compact, dict):
+                agrees, details = compare(full, compact, args.max_score_delta, args.max_urgency_delta)
+                compared += 1
+                agreed += agrees
+                line += f" | {'OK ' if agrees else 'DIFF'} {details}"
+            else:
+                line += " | analysis failed, skipped"
+        print(line)
+
+    stats = compactor.stats()
+    print(f"\nItems: {stats['items']}, tokens {stats['tokens_before']} → {stats['tokens_after']} "
+          f"({stats.get('saved_pct', 0)}% saved, {stats['truncated']} truncated to budget)")
+    if llm is None:
+        return 0
+    if not compared:
+        print("No comparable analyses.")
+        return 1
+    rate = agreed / compared
+    print(f"Agreement: {agreed}/{compared} ({rate:.0%}, threshold {args.min_agreement:.0%})")
+    return 0 if rate >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Convert intelligence.embedding from pickled ndarrays to the raw float32 format
+(core.embedding_codec), in id-ordered batches.
+
+    python scripts/migrate_embeddings.py                  # migrate everything
+    python scripts/migrate_embeddings.py --batch-size 500 --dry-run
+
+Legacy blobs are read with a numpy-only unpickler; rows that fail to decode are
+set to NULL so the next bootstrap re-encodes them. Safe to re-run: rows already
+in the new format are skipped.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.database import IntelligenceDB
+from src.alphasignal.core.embedding_codec import MAGIC, decode_legacy, encode_embedding
+from src.alphasignal.core.logger import logger
+
+
+def migrate_embeddings(batch_size=1000, model=None, dry_run=False):
+    model = model or settings.NEWS_EMBEDDING_MODEL
+    db = IntelligenceDB()
+    conn = db._get_conn()
+    cursor = conn.cursor()
+
+    logger.info(f"🛠️ Converting pickled embeddings to float32 ({model})...")
+    last_id, converted, dropped, bytes_before, bytes_after = 0, 0, 0, 0, 0
+    while True:
+        cursor.execute("""
+            SELECT id, embedding FROM intelligence
+            WHERE id > %s AND embedding IS NOT NULL AND substring(embedding FROM 1 FOR 4) <> %s
+            ORDER BY id LIMIT %s
+        """, (last_id, psycopg2.Binary(MAGIC), batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for record_id, blob in rows:
+            bytes_before += len(blob)
+            try:
+                new_blob = encode_embedding(decode_legacy(blob), model)
+                bytes_after += len(new_blob)
+                updates.append((record_id, psycopg2.Binary(new_blob)))
+                converted += 1
+            except Exception as e:
+                logger.warning(f"Unreadable embedding for ID {record_id}, clearing: {e}")
+                updates.append((record_id, None))
+                dropped += 1
+        last_id = rows[-1][0]
+
+        if not dry_run:
+            execute_values(cursor, """
+                UPDATE intelligence i SET embedding = v.embedding
+                FROM (VALUES %s) AS v(id, embedding)
+                WHERE i.id = v.id
+            """, updates, template="(%s, %s::bytea)")
+            conn.commit()
+        logger.info(f"🔄 Progress: {converted} converted, {dropped} cleared (last id {last_id})")
+
+    conn.close()
+    saved = (1 - bytes_after / bytes_before) * 100 if bytes_before else 0.0
+    logger.info(f"✅ Migration {'simulated' if dry_run else 'complete'}. {converted} converted, "
+                f"{dropped} cleared, {bytes_before:,} -> {bytes_after:,} bytes ({saved:.1f}% smaller).")
+    return converted, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--model", default=None, help="Model name stamped into the header (default: NEWS_EMBEDDING_MODEL)")
+    parser.add_argument("--dry-run", action="store_true", help="Decode and report without writing")
+    args = parser.parse_args()
+    migrate_embeddings(args.batch_size, args.model, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
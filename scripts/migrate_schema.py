@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Explicit schema bootstrap for the IntelligenceDB tables.
+Run once per deploy (e.g. before starting api/workers with DB_AUTO_MIGRATE=false).
+"""
+import sys
+import os
+
+# Add project path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alphasignal.core.database import IntelligenceDB
+from src.alphasignal.core.logger import logger
+
+def migrate_schema():
+    db = IntelligenceDB(auto_migrate=False)
+    logger.info("🛠️ Running PostgreSQL schema bootstrap...")
+    if not db.ensure_schema(force=True):
+        logger.error("❌ Schema bootstrap failed.")
+        sys.exit(1)
+    logger.info("✅ Schema is up to date.")
+
+if __name__ == "__main__":
+    migrate_schema()
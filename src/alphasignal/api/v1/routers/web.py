@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, Query, Request, HTTPException
 from sqlmodel import Session, select, text
 from typing import List, Dict, Any, Optional
@@ -6,8 +7,8 @@ from src.alphasignal.models.fund import FundMetadata, FundValuationArchive
 from src.alphasignal.models.intelligence import Intelligence
 from src.alphasignal.auth.dependencies import get_current_user
 from src.alphasignal.auth.models import User
-from src.alphasignal.core.fund_engine import FundEngine
-from src.alphasignal.core.database import IntelligenceDB
+from src.alphasignal.core.fund_engine import get_fund_engine
+from src.alphasignal.core.database import get_db
 from src.alphasignal.utils import v1_prepare_json
 
 router = APIRouter()
@@ -21,7 +22,7 @@ async def get_web_watchlist(
     Get user's watchlist for Web.
     Maintains the {"data": [...]} wrapper for TanStack Query compatibility.
     """
-    db_legacy = IntelligenceDB()
+    db_legacy = get_db()
     rows = db_legacy.get_watchlist(str(current_user.id))
     return v1_prepare_json({"data": [{"code": r['fund_code'], "name": r['fund_name']} for r in rows]})
 
@@ -38,13 +39,14 @@ async def get_web_batch_valuations(
         return {"data": []}
     
     code_list = [c.strip() for c in codes.split(',') if c.strip()]
-    engine = FundEngine()
+    engine = get_fund_engine()
     
-    results = engine.calculate_batch_valuation(code_list, summary=(mode == "summary"))
+    # Off the event loop: valuation may wait on a peer computing the same funds
+    results = await asyncio.to_thread(engine.calculate_batch_valuation, code_list, summary=(mode == "summary"))
     
     # Enrich with stats
-    db_legacy = IntelligenceDB()
-    stats_map = db_legacy.get_fund_stats(code_list)
+    db_legacy = get_db()
+    stats_map = await asyncio.to_thread(db_legacy.get_fund_stats, code_list)
     
     for res in results:
         f_code = res.get('fund_code')
@@ -58,11 +60,11 @@ async def get_web_fund_valuation(code: str, current_user: User = Depends(get_cur
     """
     Detailed single fund valuation for Web.
     """
-    engine = FundEngine()
-    results = engine.calculate_batch_valuation([code])
+    engine = get_fund_engine()
+    results = await asyncio.to_thread(engine.calculate_batch_valuation, [code])
     if results:
-        db_legacy = IntelligenceDB()
-        stats_map = db_legacy.get_fund_stats([code])
+        db_legacy = get_db()
+        stats_map = await asyncio.to_thread(db_legacy.get_fund_stats, [code])
         if code in stats_map:
             results[0]['stats'] = stats_map[code]
         return v1_prepare_json(results[0])
@@ -73,7 +75,7 @@ async def get_web_fund_history(code: str, limit: int = 30, current_user: User =
     """
     Historical performance for Web.
     """
-    db_legacy = IntelligenceDB()
+    db_legacy = get_db()
     history = db_legacy.get_valuation_history(code, limit)
     
     formatted_history = []
@@ -108,7 +110,7 @@ async def add_web_watchlist(
     current_user: User = Depends(get_current_user)
 ):
     """Add a fund to watchlist via Web BFF."""
-    db_legacy = IntelligenceDB()
+    db_legacy = get_db()
     success = db_legacy.add_to_watchlist(item.code, item.name, str(current_user.id))
     return {"success": success}
 
@@ -118,7 +120,7 @@ async def remove_web_watchlist(
     current_user: User = Depends(get_current_user)
 ):
     """Remove a fund from watchlist via Web BFF."""
-    db_legacy = IntelligenceDB()
+    db_legacy = get_db()
     success = db_legacy.remove_from_watchlist(code, str(current_user.id))
     return {"success": success}
 
@@ -137,7 +139,7 @@ async def get_web_intelligence_item(
 @router.get("/funds/search", response_model=Dict[str, Any])
 async def search_web_funds(q: str = "", limit: int = 20):
     """Search for funds via Web BFF."""
-    engine = FundEngine()
+    engine = get_fund_engine()
     results = engine.search_funds(q.strip(), limit)
     return v1_prepare_json({
         "results": results,
@@ -362,7 +364,7 @@ async def get_web_monitor_stats(current_user: User = Depends(get_current_user)):
     """
     Admin stats for Web monitor page.
     """
-    db_legacy = IntelligenceDB()
+    db_legacy = get_db()
     stats = db_legacy.get_reconciliation_stats()
     stats['heatmap'] = db_legacy.get_heatmap_stats()
     return v1_prepare_json(stats)
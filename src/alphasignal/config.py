@@ -26,6 +26,28 @@ class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
+    # LLM 批量调度
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 8)) # Max news items per analyze_batch call
+    LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", 12000)) # Estimated input tokens per batch
+    LLM_BATCH_MAX_WAIT = float(os.getenv("LLM_BATCH_MAX_WAIT", 1.5)) # Seconds a partial batch waits for more items
+    LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", 2)) # Batch calls in flight at once
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 90)) # Per-request timeout (seconds)
+    PROMPT_COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION_ENABLED", "true").lower() == "true" # Compact crawled full text before prompting
+    PROMPT_CONTENT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTENT_TOKEN_BUDGET", 1500)) # Estimated tokens of article text per prompt
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true" # Start the fallback provider when the primary is slow
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95)) # Hedge after this percentile of recent primary latency
+    LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", 5)) # Deadline floor
+    LLM_HEDGE_MAX_SECONDS = float(os.getenv("LLM_HEDGE_MAX_SECONDS", 45)) # Deadline ceiling, also used until enough samples exist
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)) # Latency samples needed before the percentile is trusted
+    ANALYSIS_CACHE_TTL_HOURS = int(os.getenv("ANALYSIS_CACHE_TTL_HOURS", 168)) # Redis lifetime of cached analyses (Postgres keeps them)
+    ANALYSIS_CACHE_MIN_CHARS = int(os.getenv("ANALYSIS_CACHE_MIN_CHARS", 80)) # Shorter (title-only) content is never cached
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8)) # Requests in flight per process
+    GEMINI_RPM = int(os.getenv("GEMINI_RPM", 0)) # Requests per minute (0 = unlimited)
+    GEMINI_TPM = int(os.getenv("GEMINI_TPM", 0)) # Estimated input tokens per minute (0 = unlimited)
+    DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", 8))
+    DEEPSEEK_RPM = int(os.getenv("DEEPSEEK_RPM", 0))
+    DEEPSEEK_TPM = int(os.getenv("DEEPSEEK_TPM", 0))
+
     # 推送配置
     BARK_URL = os.getenv("BARK_URL")
     
@@ -47,13 +69,47 @@ class Settings:
     POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
     POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB = os.getenv("POSTGRES_DB", "alphasignal")
+
+    DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true" # Run schema bootstrap on first IntelligenceDB() per process
+
+    # PostgreSQL connection pool (psycopg2, shared per process)
+    POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", 1))
+    POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", 20))
+    POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", 10)) # Seconds to wait for a free connection
+    POSTGRES_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("POSTGRES_POOL_HEALTH_CHECK_SECONDS", 30)) # Ping idle connections older than this
+    POSTGRES_POOL_MAX_LIFETIME = float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", 1800)) # Recycle connections after N seconds
+    POSTGRES_POOL_LEAK_SECONDS = float(os.getenv("POSTGRES_POOL_LEAK_SECONDS", 60)) # Warn when a connection is held longer
     
     # Redis
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Fund Valuation
+    HOLDINGS_MATRIX_CHECK_SECONDS = int(os.getenv("HOLDINGS_MATRIX_CHECK_SECONDS", 60)) # How often to check fund_holdings for changes before rebuilding the matrix
+    QUOTE_FETCH_CHUNK_SIZE = int(os.getenv("QUOTE_FETCH_CHUNK_SIZE", 60)) # Secids per qt.gtimg.cn request
+    QUOTE_FETCH_CONCURRENCY = int(os.getenv("QUOTE_FETCH_CONCURRENCY", 8)) # Max chunks in flight
+    QUOTE_FETCH_TIMEOUT = float(os.getenv("QUOTE_FETCH_TIMEOUT", 3)) # Per-request timeout (seconds)
+    QUOTE_FETCH_RETRIES = int(os.getenv("QUOTE_FETCH_RETRIES", 2)) # Retries per failed chunk
+    QUOTE_BOOK_ENABLED = os.getenv("QUOTE_BOOK_ENABLED", "true").lower() == "true" # Run the shared quote-book poller in the API process
+    QUOTE_BOOK_INTERVAL = float(os.getenv("QUOTE_BOOK_INTERVAL", 5)) # Seconds between polls during trading hours
+    QUOTE_BOOK_MAX_AGE = float(os.getenv("QUOTE_BOOK_MAX_AGE", 30)) # Older books are ignored during trading hours
+    QUOTE_BOOK_UNIVERSE_REFRESH = float(os.getenv("QUOTE_BOOK_UNIVERSE_REFRESH", 300)) # Re-read watchlist/holdings secids every N seconds
+    REVALUATION_INDEX_REFRESH = float(os.getenv("REVALUATION_INDEX_REFRESH", 300)) # Rebuild the security -> fund index every N seconds
+    VALUATION_CACHE_SECONDS = int(os.getenv("VALUATION_CACHE_SECONDS", 180)) # Fresh fund:valuation:{code} lifetime
+    VALUATION_STALE_SECONDS = int(os.getenv("VALUATION_STALE_SECONDS", 900)) # Serve the previous valuation while a refresh runs, up to this age
+    SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", 10)) # Max wait on another request's in-flight valuation
+    FX_SNAPSHOT_TTL = float(os.getenv("FX_SNAPSHOT_TTL", 60)) # All FX pairs are refetched at most once per N seconds
+    MACRO_CONTEXT_TTL = float(os.getenv("MACRO_CONTEXT_TTL", 120)) # DXY / US10Y / GVZ / gold backdrop refetched at most once per N seconds
+    METRICS_COUNTER_RETENTION_HOURS = int(os.getenv("METRICS_COUNTER_RETENTION_HOURS", 48)) # Rolling clustering/exhaustion buckets kept in Redis
+    METRICS_COUNTER_SYNC_SECONDS = float(os.getenv("METRICS_COUNTER_SYNC_SECONDS", 5)) # Local copy of the counters resynced from Redis every N seconds
     
     # News Deduplication Settings
     NEWS_SIMILARITY_THRESHOLD = float(os.getenv("NEWS_SIMILARITY_THRESHOLD", 0.7)) # Cosine similarity for news content
     NEWS_DEDUPE_WINDOW_HOURS = int(os.getenv("NEWS_DEDUPE_WINDOW_HOURS", 24)) # How many hours back to check for duplicates
+    NEWS_DEDUPE_CAPACITY = int(os.getenv("NEWS_DEDUPE_CAPACITY", 50000)) # Max embeddings kept for semantic dedupe (ring buffer)
+    NEWS_DEDUPE_ENCODE_BATCH = int(os.getenv("NEWS_DEDUPE_ENCODE_BATCH", 32)) # Texts per forward pass when batch-encoding for dedupe
+    NEWS_EMBEDDING_MODEL = os.getenv("NEWS_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2") # Dedupe encoder; stamped into stored embeddings
+    NEWS_EMBEDDING_BACKEND = os.getenv("NEWS_EMBEDDING_BACKEND", "sentence_transformer") # sentence_transformer | int8 (quantized CPU)
+    NEWS_EMBEDDING_WARMUP = os.getenv("NEWS_EMBEDDING_WARMUP", "true").lower() == "true" # Load the encoder in the background at engine start
     
     # 路径配置
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import re
+import threading
+
+import redis
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.providers.llm.base import ANALYSIS_PROMPT_VERSION
+
+_TAGS = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_content(text):
+    """Canonical form for hashing: tags stripped, whitespace collapsed, case folded."""
+    if not text:
+        return ""
+    return _SPACE.sub(" ", _TAGS.sub(" ", str(text))).strip().casefold()
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of structured LLM analyses.
+
+    Keyed by sha256 of the normalized content plus a version string (prompt version
+    and models), so a retried item or a syndicated copy under another source id
+    reuses the earlier result. Redis holds recent entries for `ttl_hours`; the
+    `llm_analysis_cache` table behind it keeps them indefinitely and refills Redis
+    on a hit. Content shorter than `min_chars` (bare headlines) is never cached.
+    """
+
+    KEY = "llm:analysis:{}:{}"
+
+    def __init__(self, db, redis_client=None, ttl_hours=None, min_chars=None, version=None):
+        self.db = db
+        if redis_client is None:
+            try:
+                redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            except Exception as e:
+                logger.warning(f"AnalysisCache Redis unavailable: {e}")
+        self.redis = redis_client
+        self.ttl = int((settings.ANALYSIS_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours) * 3600)
+        self.min_chars = settings.ANALYSIS_CACHE_MIN_CHARS if min_chars is None else min_chars
+        self.version = version or f"p{ANALYSIS_PROMPT_VERSION}|{settings.GEMINI_MODEL}|{settings.DEEPSEEK_MODEL}"
+        self._lock = threading.Lock()
+        self._stats = {"redis_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def key(self, raw_data):
+        """Content hash for an item, or None if it should not be cached."""
+        text = normalize_content(raw_data.get('content'))
+        if len(text) < self.min_chars:
+            return None
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, content_hash):
+        """Cached analysis (a fresh dict the caller may mutate), or None."""
+        if content_hash is None:
+            return None
+        redis_key = self.KEY.format(self.version, content_hash)
+        if self.redis is not None:
+            try:
+                cached = self.redis.get(redis_key)
+                if cached:
+                    self._count("redis_hits")
+                    return json.loads(cached)
+            except Exception as e:
+                logger.warning(f"AnalysisCache Redis read failed: {e}")
+
+        result = self.db.get_cached_analysis(content_hash, self.version)
+        if isinstance(result, dict):
+            self._count("db_hits")
+            self._set_redis(redis_key, result)
+            return result
+        self._count("misses")
+        return None
+
+    def put(self, content_hash, result):
+        if content_hash is None or not isinstance(result, dict) or not result:
+            return
+        # Batch responses carry the originating item's id; the cached analysis must not
+        result = {k: v for k, v in result.items() if k not in ('news_id', 'embedding')}
+        self._set_redis(self.KEY.format(self.version, content_hash), result)
+        if self.db.save_cached_analysis(content_hash, self.version, result):
+            self._count("stores")
+
+    def _set_redis(self, redis_key, result):
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(redis_key, json.dumps(result, ensure_ascii=False), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"AnalysisCache Redis write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,230 @@
+import asyncio
+import copy
+
+import numpy as np
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.providers.llm.base import prompt_content
+from src.alphasignal.utils.tokens import estimate_tokens
+
+
+class AnalysisScheduler:
+    """
+    Micro-batches LLM analysis requests through the providers' `analyze_batch_async`.
+
+    Callers `await analyze(raw_data)` one item at a time; items are grouped until the
+    batch is full (`max_batch` items or `max_tokens` estimated input tokens) or the
+    oldest has waited `max_wait` seconds, then sent as one batch call (at most
+    `concurrency` in flight). Results are matched back by `news_id`; only items the
+    batch response is missing fall back to the per-item `analyze_async` path
+    (primary, then fallback provider). A lone item skips the batch prompt entirely.
+
+    With a `cache` (core.analysis_cache.AnalysisCache), content already analyzed is
+    answered from it, and identical content already in flight waits for that result
+    instead of being queued again.
+
+    Every provider call is hedged: if the primary has not answered within its
+    recent latency percentile (per request kind, clamped to the configured bounds)
+    or fails, the fallback is started too and the first valid answer wins; the
+    other request is cancelled.
+    """
+
+    def __init__(self, primary, fallback, max_batch=None, max_tokens=None, max_wait=None, concurrency=None, cache=None,
+                 hedge=None):
+        self.primary = primary
+        self.fallback = fallback
+        self.cache = cache
+        self.hedge = settings.LLM_HEDGE_ENABLED if hedge is None else hedge
+        self.max_batch = max_batch or settings.LLM_BATCH_SIZE
+        self.max_tokens = max_tokens or settings.LLM_BATCH_TOKEN_BUDGET
+        self.max_wait = settings.LLM_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.concurrency = concurrency or settings.LLM_BATCH_CONCURRENCY
+        self.stats = {"batches": 0, "batched_items": 0, "single_items": 0, "batch_failures": 0,
+                      "cache_hits": 0, "coalesced": 0, "hedges": 0, "fallback_wins": 0}
+        self._loop = None
+
+    @property
+    def max_inflight(self):
+        """Items worth having queued at once to keep every batch slot full."""
+        return self.max_batch * self.concurrency
+
+    def _bind(self):
+        # run_once() spins a fresh event loop per cycle; queue state belongs to one loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = []
+            self._pending_tokens = 0
+            self._timer = None
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._tasks = set()
+            self._inflight = {}
+
+    async def analyze(self, raw_data):
+        self._bind()
+        key = self.cache.key(raw_data) if self.cache is not None else None
+        if key is None:
+            return await self._enqueue(raw_data, self._loop.create_future())
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return copy.deepcopy(await asyncio.shield(inflight))
+
+        future = self._inflight[key] = self._loop.create_future()
+        try:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached:
+                self.stats["cache_hits"] += 1
+                future.set_result(cached)
+                return cached
+            result = await self._enqueue(raw_data, future)
+            await asyncio.to_thread(self.cache.put, key, result)
+            return result
+        except BaseException as e:
+            # Wake anything coalesced onto this item; mark the exception retrieved so it isn't logged twice
+            if not future.done():
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    future.exception()
+                else:
+                    future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _enqueue(self, raw_data, future):
+        tokens = estimate_tokens(prompt_content(raw_data)) + estimate_tokens(raw_data.get('context'))
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+        self._pending.append((raw_data, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        async with self._slots:
+            try:
+                results = await self._analyze_batch([raw for raw, _ in batch]) if len(batch) > 1 else {}
+                missing = []
+                for raw, future in batch:
+                    result = results.get(str(raw.get('id')))
+                    if result:
+                        if not future.done():
+                            future.set_result(result)
+                    else:
+                        missing.append((raw, future))
+                if missing:
+                    self.stats["single_items"] += len(missing)
+                    await asyncio.gather(*(self._analyze_single(raw, future) for raw, future in missing))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _analyze_batch(self, items):
+        """{news_id: analysis} from one hedged batch call; {} if both providers fail."""
+        try:
+            indexed, llm = await self._hedged(
+                lambda llm: llm.analyze_batch_async(items), kind="batch", parse=self._index_results,
+            )
+        except Exception as e:
+            self.stats["batch_failures"] += 1
+            logger.warning(f"批量分析失败 ({len(items)} 条): {e}")
+            return {}
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(indexed)
+        logger.info(f"📦 批量分析完成 ({llm.__class__.__name__}): {len(indexed)}/{len(items)} 条")
+        return indexed
+
+    def hedge_deadline(self, kind):
+        """Seconds to wait on the primary before also asking the fallback."""
+        limiter = getattr(self.primary, 'limiter', None)
+        samples = limiter.samples(kind) if limiter is not None else []
+        if len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_MAX_SECONDS
+        deadline = float(np.percentile(samples, settings.LLM_HEDGE_PERCENTILE))
+        return min(max(deadline, settings.LLM_HEDGE_MIN_SECONDS), settings.LLM_HEDGE_MAX_SECONDS)
+
+    async def _hedged(self, request, kind, parse):
+        """
+        (parsed result, winning llm) for `request(llm)`. The primary starts alone; the
+        fallback joins once the primary misses its deadline or fails. A result counts
+        only if `parse` returns something truthy; the slower request is cancelled.
+        """
+        attempts = {asyncio.ensure_future(request(self.primary)): self.primary}
+        deadline = self.hedge_deadline(kind) if self.hedge else None
+        hedged, error = False, None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=None if hedged else deadline,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    llm = attempts.pop(task)
+                    try:
+                        parsed = parse(task.result())
+                        if parsed:
+                            if llm is self.fallback:
+                                self.stats["fallback_wins"] += 1
+                            return parsed, llm
+                        error = ValueError(f"{llm.__class__.__name__} returned no usable result")
+                    except Exception as e:
+                        error = e
+                    logger.warning(f"{llm.__class__.__name__} {kind} request failed: {error}")
+                if not hedged and (not done or not attempts):
+                    # Primary is past its deadline (or already failed): race the fallback
+                    hedged = True
+                    if done:
+                        logger.info(f"Primary LLM failed, trying fallback ({kind})")
+                    else:
+                        self.stats["hedges"] += 1
+                        logger.info(f"⏱️ Primary LLM slower than {deadline:.1f}s, hedging with fallback ({kind})")
+                    attempts[asyncio.ensure_future(request(self.fallback))] = self.fallback
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    @staticmethod
+    def _index_results(results):
+        # json_object mode wraps the array (e.g. {"results": [...]}); a lone object is one result
+        if isinstance(results, dict):
+            if 'news_id' in results:
+                results = [results]
+            else:
+                results = next((v for v in results.values() if isinstance(v, list)), [])
+        indexed = {}
+        for result in results or []:
+            if isinstance(result, dict) and result.get('news_id') is not None:
+                indexed.setdefault(str(result['news_id']).strip(), result)
+        return indexed
+
+    async def _analyze_single(self, raw_data, future):
+        source_id = raw_data.get('source_id') or raw_data.get('id')
+        try:
+            result, _ = await self._hedged(
+                lambda llm: llm.analyze_async(raw_data), kind="single",
+                parse=lambda r: r if isinstance(r, dict) and r else None,
+            )
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            logger.warning(f"Analysis failed for {source_id}: {e}")
+            if not future.done():
+                future.set_exception(e)
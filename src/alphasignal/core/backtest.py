@@ -2,8 +2,6 @@ import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 import pytz
-import psycopg2
-from src.alphasignal.config import settings
 from src.alphasignal.core.logger import logger
 from src.alphasignal.core.database import IntelligenceDB
 
@@ -166,13 +164,8 @@ class BacktestEngine:
         [策略执行] 根据关键词查询历史表现
         """
         try:
-            with psycopg2.connect(
-                host=settings.POSTGRES_HOST,
-                port=settings.POSTGRES_PORT,
-                user=settings.POSTGRES_USER,
-                password=settings.POSTGRES_PASSWORD,
-                dbname=settings.POSTGRES_DB
-            ) as conn:
+            conn = self.db.get_connection()
+            try:
                 with conn.cursor() as cursor:
                     query = """
                         SELECT gold_price_snapshot, price_1h 
@@ -183,6 +176,8 @@ class BacktestEngine:
                     pattern = f"%{keyword}%"
                     cursor.execute(query, (pattern, pattern))
                     rows = cursor.fetchall()
+            finally:
+                conn.close()
 
             if not rows:
                 return None
@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
 import pytz
 import akshare as ak
@@ -7,17 +8,44 @@ import pandas as pd
 from src.alphasignal.config import settings
 from src.alphasignal.core.logger import logger
 from src.alphasignal.utils import format_iso8601
+from src.alphasignal.infra.database.pool import get_pool
+from src.alphasignal.providers.market.fx_snapshot import get_fx_snapshot
+from src.alphasignal.providers.market.macro_context import get_macro_context
+from src.alphasignal.core.rolling_metrics import get_rolling_counters, ITEMS, URGENT
+from src.alphasignal.core.embedding_codec import encode_embedding
 
 try:
     import psycopg2
-    from psycopg2.extras import Json, DictCursor
+    from psycopg2.extras import Json, DictCursor, execute_values
 except ImportError:
     logger.error("❌ 'psycopg2-binary' is required for PostgreSQL.")
     raise
 
+# Schema bootstrap runs at most once per process (see IntelligenceDB.ensure_schema)
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_db():
+    """Return the process-wide IntelligenceDB (stateless apart from the shared pool, safe to share)."""
+    global _shared_db
+    if _shared_db is None:
+        with _shared_db_lock:
+            if _shared_db is None:
+                _shared_db = IntelligenceDB()
+    return _shared_db
+
+
 class IntelligenceDB:
-    def __init__(self):
-        """Initialize PostgreSQL Database connection configuration."""
+    def __init__(self, auto_migrate=None):
+        """
+        Initialize PostgreSQL Database connection configuration.
+        Instances are cheap: connections come from the shared pool and the schema
+        bootstrap only runs on the first instantiation in the process.
+        """
         # Ensure we are configured for Postgres
         self.host = settings.POSTGRES_HOST
         self.port = settings.POSTGRES_PORT
@@ -25,23 +53,35 @@ class IntelligenceDB:
         self.password = settings.POSTGRES_PASSWORD
         self.dbname = settings.POSTGRES_DB
         
-        self._init_db()
+        if settings.DB_AUTO_MIGRATE if auto_migrate is None else auto_migrate:
+            self.ensure_schema()
+
+    def ensure_schema(self, force=False):
+        """
+        Run the idempotent schema bootstrap once per process.
+        force=True re-runs it (used by scripts/migrate_schema.py).
+        """
+        global _schema_ready
+        if _schema_ready and not force:
+            return True
+        with _schema_lock:
+            if force or not _schema_ready:
+                _schema_ready = self._init_db()
+        return _schema_ready
 
     def get_connection(self):
-        """Get a fresh PostgreSQL connection."""
-        return psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            dbname=self.dbname
-        )
+        """
+        Check out a connection from the process-wide pool.
+        conn.close() returns it to the pool instead of tearing down the socket.
+        """
+        return get_pool().getconn()
 
     def _get_conn(self):
         return self.get_connection()
 
     def _init_db(self):
-        """Ensure PostgreSQL schema exists."""
+        """Ensure PostgreSQL schema exists. Returns True on success."""
+        conn = None
         try:
             conn = self._get_conn()
             cursor = conn.cursor()
@@ -300,16 +340,33 @@ class IntelligenceDB:
                 CREATE INDEX IF NOT EXISTS idx_fund_rel_parent ON fund_relationships(parent_code);
             """)
 
+            # Content-addressed LLM analysis cache (backs the Redis copy, see core.analysis_cache)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS llm_analysis_cache (
+                    content_hash CHAR(64) NOT NULL,
+                    version TEXT NOT NULL,
+                    result JSONB NOT NULL,
+                    hits INTEGER DEFAULT 0,
+                    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                    last_hit_at TIMESTAMPTZ,
+                    PRIMARY KEY (content_hash, version)
+                );
+            """)
+
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_intelligence_timestamp ON intelligence(timestamp DESC);
                 CREATE INDEX IF NOT EXISTS idx_intelligence_source_id ON intelligence(source_id);
             """)
 
             conn.commit()
-            conn.close()
+            return True
         except Exception as e:
             logger.error(f"PostgreSQL Init Failed: {e}")
-            # If DB init fails, we probably can't run. Let it raise or stay broken.
+            # If DB init fails, we probably can't run. Stay broken; the next instantiation retries.
+            return False
+        finally:
+            if conn is not None:
+                conn.close()
 
     # ... (existing methods) ...
 
@@ -417,96 +474,151 @@ class IntelligenceDB:
             return []
 
 
+    def _parse_news_time(self, raw_data):
+        """raw_data['timestamp'] (ISO string or UTC struct_time) -> aware UTC datetime; now if missing/unparseable."""
+        import pytz
+        news_time = None
+        if raw_data.get('timestamp'):
+            import dateutil.parser
+            try:
+                if isinstance(raw_data['timestamp'], str):
+                    news_time = dateutil.parser.parse(raw_data['timestamp'])
+                elif hasattr(raw_data['timestamp'], 'tm_year'):
+                    import calendar
+                    timestamp_utc = calendar.timegm(raw_data['timestamp'])
+                    news_time = datetime.fromtimestamp(timestamp_utc, tz=pytz.utc)
+            except Exception as e:
+                logger.warning(f"Timestamp parsing failed: {e}")
+
+        if news_time is None:
+            return datetime.now(pytz.utc)
+        if news_time.tzinfo is None:
+            return pytz.utc.localize(news_time)
+        return news_time.astimezone(pytz.utc)
+
+    def _raw_intelligence_row(self, raw_data, news_time, clustering_score, exhaustion_score, macro):
+        """Column values for an intelligence INSERT (see _RAW_INTELLIGENCE_COLUMNS)."""
+        dxy = raw_data.get('dxy_snapshot')
+        if dxy is None: dxy = macro.get("DX-Y.NYB")
+        us10y = raw_data.get('us10y_snapshot')
+        if us10y is None: us10y = macro.get("^TNX")
+        gvz = raw_data.get('gvz_snapshot')
+        if gvz is None: gvz = macro.get("^GVZ")
+        gold = macro.get("GC=F")
+
+        # Handle Embedding Serialization (raw float32, see core.embedding_codec)
+        embedding_binary = None
+        if 'embedding' in raw_data and raw_data['embedding'] is not None:
+            embedding_binary = psycopg2.Binary(encode_embedding(raw_data['embedding'], settings.NEWS_EMBEDDING_MODEL))
+
+        return (
+            raw_data.get('id'),
+            raw_data.get('author'),
+            raw_data.get('original_content') if raw_data.get('original_content') else raw_data.get('content'),
+            raw_data.get('url'),
+            news_time,
+            self.get_market_session(news_time),
+            clustering_score,
+            float(exhaustion_score),
+            float(dxy) if dxy is not None else None,
+            float(us10y) if us10y is not None else None,
+            float(gvz) if gvz is not None else None,
+            float(gold) if gold is not None else None,
+            float(raw_data.get('fed_val', 0.0)),
+            embedding_binary
+        )
+
+    _RAW_INTELLIGENCE_COLUMNS = """
+        source_id, author, content, url, timestamp,
+        market_session, clustering_score, exhaustion_score,
+        dxy_snapshot, us10y_snapshot, gvz_snapshot, gold_price_snapshot,
+        fed_regime, embedding
+    """
+
     def save_raw_intelligence(self, raw_data):
         """Save raw intelligence data immediately usually before analysis."""
         try:
-            # 1. Parse time
-            news_time = None
-            if raw_data.get('timestamp'):
-                import dateutil.parser
-                try:
-                    if isinstance(raw_data['timestamp'], str):
-                        news_time = dateutil.parser.parse(raw_data['timestamp'])
-                    elif hasattr(raw_data['timestamp'], 'tm_year'):
-                        from time import mktime
-                        import calendar
-                        import pytz
-                        timestamp_utc = calendar.timegm(raw_data['timestamp'])
-                        news_time = datetime.fromtimestamp(timestamp_utc, tz=pytz.utc)
-                except Exception as e:
-                    logger.warning(f"Timestamp parsing failed: {e}")
-            
-            import pytz
-            if news_time is None:
-                news_time = datetime.now(pytz.utc)
-            else:
-                if news_time.tzinfo is None:
-                    news_time = pytz.utc.localize(news_time)
-                else:
-                    news_time = news_time.astimezone(pytz.utc)
+            news_time = self._parse_news_time(raw_data)
 
             # Metrics
-            market_session = self.get_market_session(news_time)
             clustering_score, exhaustion_score = self.get_advanced_metrics(news_time, raw_data.get('content'))
-            
-            # Snapshots
-            dxy = raw_data.get('dxy_snapshot')
-            if dxy is None: dxy = self.get_market_snapshot("DX-Y.NYB", news_time)
-                
-            us10y = raw_data.get('us10y_snapshot')
-            if us10y is None: us10y = self.get_market_snapshot("^TNX", news_time)
-                
-            gvz = raw_data.get('gvz_snapshot')
-            if gvz is None: gvz = self.get_market_snapshot("^GVZ", news_time)
-            
-            gold = self.get_market_snapshot("GC=F", news_time)
+
+            # Snapshots (shared macro context)
+            macro = get_macro_context().snapshot()["values"]
+            row_values = self._raw_intelligence_row(raw_data, news_time, clustering_score, exhaustion_score, macro)
 
             conn = self._get_conn()
             cursor = conn.cursor()
-            
-            # Handle Embedding Serialization
-            embedding_binary = None
-            if 'embedding' in raw_data and raw_data['embedding'] is not None:
-                import pickle
-                embedding_binary = psycopg2.Binary(pickle.dumps(raw_data['embedding']))
-
-            cursor.execute("""
-                INSERT INTO intelligence (
-                    source_id, author, content, url, timestamp, 
-                    market_session, clustering_score, exhaustion_score,
-                    dxy_snapshot, us10y_snapshot, gvz_snapshot, gold_price_snapshot,
-                    fed_regime, embedding
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            cursor.execute(f"""
+                INSERT INTO intelligence ({self._RAW_INTELLIGENCE_COLUMNS})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (source_id) DO UPDATE SET 
                     author = EXCLUDED.author -- Minimal update to trigger RETURNING
-                RETURNING id
-            """, (
-                raw_data.get('id'),
-                raw_data.get('author'),
-                raw_data.get('original_content') if raw_data.get('original_content') else raw_data.get('content'), 
-                raw_data.get('url'),
-                news_time,
-                market_session,
-                clustering_score,
-                float(exhaustion_score),
-                float(dxy) if dxy is not None else None,
-                float(us10y) if us10y is not None else None,
-                float(gvz) if gvz is not None else None,
-                float(gold) if gold is not None else None,
-                float(raw_data.get('fed_val', 0.0)),
-                embedding_binary
-            ))
+                RETURNING id, (xmax = 0) AS inserted
+            """, row_values)
             
             row = cursor.fetchone()
             conn.commit()
             conn.close()
-            
+
+            if row and row[1]:
+                get_rolling_counters().record(ITEMS, [news_time])
             return row[0] if row else None
             
         except Exception as e:
             logger.error(f"Save Raw Failed: {e}")
             return None
 
+    def save_raw_intelligence_many(self, items):
+        """
+        Batch form of save_raw_intelligence: one windowed metrics query, one
+        multi-row upsert and the ids back in the same round trip.
+        Returns ids aligned with `items` (None where an item could not be saved).
+        """
+        if not items:
+            return []
+        # Items without a source_id cannot be matched back from RETURNING; save them singly
+        ids = [None] * len(items)
+        batch = {}
+        for i, item in enumerate(items):
+            if item.get('id') is None:
+                ids[i] = self.save_raw_intelligence(item)
+            else:
+                batch.setdefault(item['id'], []).append(i)
+        if not batch:
+            return ids
+
+        try:
+            firsts = [idxs[0] for idxs in batch.values()]
+            times = [self._parse_news_time(items[i]) for i in firsts]
+            metrics = self.get_advanced_metrics_many(times)
+            macro = get_macro_context().snapshot()["values"]
+            rows = [self._raw_intelligence_row(items[i], t, c, e, macro)
+                    for i, t, (c, e) in zip(firsts, times, metrics)]
+
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            returned = execute_values(cursor, f"""
+                INSERT INTO intelligence ({self._RAW_INTELLIGENCE_COLUMNS})
+                VALUES %s
+                ON CONFLICT (source_id) DO UPDATE SET 
+                    author = EXCLUDED.author -- Minimal update to trigger RETURNING
+                RETURNING source_id, id, (xmax = 0) AS inserted
+            """, rows, page_size=len(rows), fetch=True)
+            conn.commit()
+            conn.close()
+
+            saved = {r[0]: r[1] for r in returned}
+            inserted = {r[0] for r in returned if r[2]}
+            get_rolling_counters().record(ITEMS, [t for i, t in zip(firsts, times) if items[i]['id'] in inserted])
+            for source_id, idxs in batch.items():
+                for i in idxs:
+                    ids[i] = saved.get(source_id)
+            return ids
+        except Exception as e:
+            logger.error(f"Save Raw Batch Failed ({len(batch)} items): {e}")
+            return ids
+
     def update_intelligence_analysis(self, source_id, analysis_result, raw_data):
         """Update a record with analysis results."""
         try:
@@ -532,14 +644,14 @@ class IntelligenceDB:
             conn = self._get_conn()
             cursor = conn.cursor()
             
-            # Handle Embedding Serialization
+            # Handle Embedding Serialization (raw float32, see core.embedding_codec)
             embedding_binary = None
             if 'embedding' in analysis_result and analysis_result['embedding'] is not None:
-                import pickle
-                embedding_binary = psycopg2.Binary(pickle.dumps(analysis_result['embedding']))
+                embedding_binary = psycopg2.Binary(encode_embedding(analysis_result['embedding'], settings.NEWS_EMBEDDING_MODEL))
 
+            # Previous urgency comes back too, so the rolling urgent counter moves only on a real transition
             cursor.execute("""
-                UPDATE intelligence SET
+                UPDATE intelligence i SET
                     summary = %s,
                     sentiment = %s,
                     urgency_score = %s,
@@ -547,10 +659,12 @@ class IntelligenceDB:
                     actionable_advice = %s,
                     sentiment_score = %s,
                     macro_adjustment = %s,
-                    embedding = COALESCE(%s, embedding),
+                    embedding = COALESCE(%s, i.embedding),
                     status = 'COMPLETED',
                     last_error = NULL
-                WHERE source_id = %s
+                FROM (SELECT id, urgency_score FROM intelligence WHERE source_id = %s FOR UPDATE) prev
+                WHERE i.id = prev.id
+                RETURNING i.timestamp, prev.urgency_score, i.urgency_score
             """, (
                 to_jsonb(analysis_result.get('summary')),
                 to_jsonb(analysis_result.get('sentiment')),
@@ -562,10 +676,16 @@ class IntelligenceDB:
                 embedding_binary,
                 source_id
             ))
+            row = cursor.fetchone()
             
             conn.commit()
             conn.close()
             logger.info(f"💾 Updated Analysis for ID: {source_id}")
+
+            if row and row[0] is not None:
+                was_urgent, is_urgent = (row[1] or 0) >= 5, (row[2] or 0) >= 5
+                if was_urgent != is_urgent:
+                    get_rolling_counters().record(URGENT, [row[0]], 1 if is_urgent else -1)
             
         except Exception as e:
             logger.error(f"Update Analysis Failed: {e}")
@@ -677,6 +797,7 @@ class IntelligenceDB:
                     sentiment_score, fed_regime, macro_adjustment
                 ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (source_id) DO NOTHING
+                RETURNING timestamp, urgency_score
             """, (
                 raw_data.get('id'),
                 raw_data.get('author'),
@@ -702,7 +823,12 @@ class IntelligenceDB:
                 float(macro_adj)
             ))
 
+            row = cursor.fetchone()
             conn.commit()
+            if row:
+                get_rolling_counters().record(ITEMS, [row[0]])
+                if (row[1] or 0) >= 5:
+                    get_rolling_counters().record(URGENT, [row[0]])
             if cursor.rowcount > 0:
                 price_info = f"${current_gold_price}"
                 if price_1h:
@@ -748,7 +874,11 @@ class IntelligenceDB:
     def get_advanced_metrics(self, dt, content):
         """
         Calculate Scenario A (Clustering) and Scenario B (Exhaustion)
+        Served from the rolling counters when they cover the window; SQL otherwise.
         """
+        counters = get_rolling_counters()
+        if counters.ready and counters.covers(dt - timedelta(hours=24)):
+            return counters.metrics(dt)
         try:
             conn = self._get_conn()
             cursor = conn.cursor()
@@ -775,47 +905,99 @@ class IntelligenceDB:
         except:
             return 0, 0.0
 
-    def get_market_snapshot(self, ticker_symbol, target_time):
-        """Unified snapshot fetcher for domestic-friendly environment"""
+    def get_advanced_metrics_many(self, times):
+        """
+        get_advanced_metrics for many timestamps in one query. Earlier items of the
+        same batch count towards clustering, as they would when saved one by one.
+        Returns [(clustering_score, exhaustion_score)] aligned with `times`.
+        """
+        if not times:
+            return []
+        counters = get_rolling_counters()
+        if counters.ready and counters.covers(min(times) - timedelta(hours=24)):
+            return self._with_batch_clustering(times, [counters.metrics(t) for t in times])
         try:
-            # Normalize target_time to UTC
-            if target_time.tzinfo is None:
-                target_time = pytz.utc.localize(target_time)
-            else:
-                target_time = target_time.astimezone(pytz.utc)
-            
-            # Map Ticker to Data Source logic
-            if ticker_symbol == "GC=F": # International Gold Spot (London Gold)
-                try:
-                    df = ak.gold_zh_spot_qhkd()
-                    row = df[df['名称'].str.contains('伦敦金|London Gold', case=False, na=False)]
-                    if not row.empty:
-                        return round(float(row.iloc[0]['最新价']), 3)
-                except:
-                    pass
-            
-            elif ticker_symbol == "DX-Y.NYB": # DXY (USD Index)
-                try:
-                    df = ak.fx_spot_quote()
-                    row = df[df['外汇名称'].str.contains('美元指数|USD Index', case=False, na=False)]
-                    if not row.empty:
-                        return round(float(row.iloc[0]['最新价']), 3)
-                except:
-                    pass
-            
-            elif ticker_symbol == "^TNX": # US10Y Yield
-                try:
-                    df = ak.bond_zh_us_rate()
-                    if not df.empty:
-                        return round(float(df.iloc[-1]['10年']), 3)
-                except:
-                    pass
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM intelligence
+                     WHERE timestamp BETWEEN t.ts - INTERVAL '1 hour' AND t.ts + INTERVAL '1 hour'),
+                    (SELECT COUNT(*) FROM intelligence
+                     WHERE timestamp BETWEEN t.ts - INTERVAL '24 hours' AND t.ts
+                     AND urgency_score >= 5)
+                FROM unnest(%s::timestamptz[]) WITH ORDINALITY AS t(ts, n)
+                ORDER BY t.n
+            """, (list(times),))
+            counts = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Advanced Metrics Batch Failed: {e}")
+            return [(0, 0.0)] * len(times)
+        return self._with_batch_clustering(times, counts)
+
+    @staticmethod
+    def _with_batch_clustering(times, counts):
+        hour = timedelta(hours=1)
+        metrics = []
+        for k, (t, (clustering, exhaustion)) in enumerate(zip(times, counts)):
+            clustering += sum(1 for prev in times[:k] if abs(prev - t) <= hour)
+            metrics.append((clustering, float(exhaustion)))
+        return metrics
+
+    def reconcile_metric_counters(self, force=True):
+        """
+        Rebuild the rolling clustering/exhaustion counters from the table (one grouped
+        query over the retained window). Run at startup, and every cycle with
+        force=False, which only rebuilds once the ready marker has lapsed; a Redis
+        lock keeps concurrent workers from rebuilding at the same time.
+        """
+        counters = get_rolling_counters()
+        if not force and counters.ready:
+            return True
+        if not counters.claim_reconcile():
+            return False
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT floor(extract(epoch FROM timestamp) / %s) * %s AS bucket,
+                       COUNT(*),
+                       COUNT(*) FILTER (WHERE urgency_score >= 5)
+                FROM intelligence
+                WHERE timestamp > NOW() - %s * INTERVAL '1 second'
+                GROUP BY bucket
+            """, (counters.bucket, counters.bucket, counters.retention))
+            rows = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Reconcile Metric Counters Failed: {e}")
+            return False
+        ok = counters.reconcile(rows)
+        if ok:
+            logger.info(f"🧮 Rolling metric counters reconciled ({len(rows)} buckets)")
+        return ok
 
-            return None
+    def get_market_snapshot(self, ticker_symbol, target_time):
+        """
+        Unified snapshot fetcher for domestic-friendly environment.
+        Values are live (target_time is not used for lookup) and come from the shared
+        macro context, refreshed at most once per MACRO_CONTEXT_TTL for all series.
+        """
+        try:
+            return get_macro_context().get(ticker_symbol)
         except Exception as e:
             logger.warning(f"Market Snapshot Failed for {ticker_symbol}: {e}")
             return None
 
+    def get_market_context(self):
+        """Shared macro snapshot: {"values": {ticker: value}, "as_of": UTC datetime}, refreshed when older than the TTL."""
+        try:
+            return get_macro_context().snapshot()
+        except Exception as e:
+            logger.warning(f"Market Context Failed: {e}")
+            return {"values": {}, "as_of": None}
+
     def get_historical_gold_price(self, target_time=None):
         """Fetch gold price using domestic sources."""
         try:
@@ -831,45 +1013,11 @@ class IntelligenceDB:
     def get_fx_rate_change(self, currency_pair="USD/CNY"):
         """
         Fetch real-time exchange rate daily change percentage.
-        Supports USD/CNY, HKD/CNY etc.
+        Supports USD/CNY, HKD/CNY etc. Served from the shared FX snapshot
+        (one upstream fx_spot_quote call per FX_SNAPSHOT_TTL for all pairs).
         """
         try:
-            # Use Sina FX spot quote via AkShare
-            df = ak.fx_spot_quote()
-            
-            mapping = {
-                "USD/CNY": "美元人民币",
-                "HKD/CNY": "港元人民币",
-                "JPY/CNY": "日元人民币",
-                "EUR/CNY": "欧元人民币"
-            }
-            
-            search_name = mapping.get(currency_pair, currency_pair)
-            
-            # Find the name column dynamically
-            name_col = next((c for c in df.columns if '名称' in c or '外汇' in c or '货币对' in c), None)
-            if not name_col:
-                return 0.0
-                
-            row = df[df[name_col].str.contains(search_name, case=False, na=False)]
-            
-            if not row.empty:
-                # Some versions of AkShare use '涨跌幅', others might use different names
-                change_col = next((c for c in row.columns if '涨跌幅' in c or '幅度' in c), None)
-                if change_col:
-                    return float(row.iloc[0][change_col])
-                
-                # If no direct percentage, calculate from Last Close if available
-                price_col = next((c for c in row.columns if '最新价' in c), None)
-                close_col = next((c for c in row.columns if '昨收' in c or '昨开' in c), None) # Fallback heuristic
-                
-                if price_col and close_col:
-                    price = float(row.iloc[0][price_col])
-                    close = float(row.iloc[0][close_col])
-                    if close > 0:
-                        return (price - close) / close * 100
-            
-            return 0.0
+            return get_fx_snapshot().get_change(currency_pair)
         except Exception as e:
             logger.error(f"Get FX Rate Change Failed for {currency_pair}: {e}")
             return 0.0
@@ -923,6 +1071,38 @@ class IntelligenceDB:
             logger.error(f"Get Recent Failed: {e}")
             return []
 
+    def iter_dedupe_history(self, since, batch_size=2000):
+        """
+        Stream analyzed (COMPLETED) intelligence rows newer than `since`, oldest first,
+        for the deduplicator. PENDING / FAILED rows are left out: they are about to be
+        (re)analyzed and would otherwise match themselves as near-duplicates.
+        Yields lists of dicts (id, timestamp, summary, content, embedding) of up to
+        `batch_size` rows from a server-side cursor, so the window is never held in
+        memory twice. Embeddings come back as raw BYTEA buffers (see core.embedding_codec).
+        """
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor(name="dedupe_history", cursor_factory=DictCursor)
+            cursor.itersize = batch_size
+            cursor.execute("""
+                SELECT id, timestamp, summary, content, embedding
+                FROM intelligence
+                WHERE timestamp >= %s AND status = 'COMPLETED'
+                ORDER BY timestamp ASC
+            """, (since,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Stream Dedupe History Failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
     def get_pending_intelligence(self, limit=20):
         """Fetch records that need AI analysis or retries."""
         try:
@@ -941,6 +1121,41 @@ class IntelligenceDB:
             logger.error(f"Get Pending Failed: {e}")
             return []
 
+    def get_cached_analysis(self, content_hash, version):
+        """Stored LLM analysis for a content hash + prompt/model version (counts the hit), or None."""
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE llm_analysis_cache
+                SET hits = hits + 1, last_hit_at = CURRENT_TIMESTAMP
+                WHERE content_hash = %s AND version = %s
+                RETURNING result
+            """, (content_hash, version))
+            row = cursor.fetchone()
+            conn.commit()
+            conn.close()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Get Cached Analysis Failed: {e}")
+            return None
+
+    def save_cached_analysis(self, content_hash, version, result):
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO llm_analysis_cache (content_hash, version, result)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (content_hash, version) DO UPDATE SET result = EXCLUDED.result
+            """, (content_hash, version, Json(result)))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Save Cached Analysis Failed: {e}")
+            return False
+
     def update_intelligence_status(self, source_id, status, error=None):
         """Update the lifecycle status of an intelligence item."""
         try:
@@ -1215,6 +1430,65 @@ class IntelligenceDB:
             logger.error(f"Get Fund Holdings Failed: {e}")
             return []
 
+    def get_fund_holdings_batch(self, fund_codes):
+        """Holdings for many funds in one query: {fund_code: [holding rows]} (funds without holdings are absent)."""
+        if not fund_codes: return {}
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor(cursor_factory=DictCursor)
+            cursor.execute("SELECT * FROM fund_holdings WHERE fund_code = ANY(%s)", (list(fund_codes),))
+            holdings = {}
+            for row in cursor.fetchall():
+                holdings.setdefault(row['fund_code'], []).append(dict(row))
+            conn.close()
+            return holdings
+        except Exception as e:
+            logger.error(f"Get Fund Holdings Batch Failed: {e}")
+            return {}
+
+    def get_holdings_report_dates(self, fund_codes):
+        """Latest holdings report date per fund: {fund_code: report_date}."""
+        if not fund_codes: return {}
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT fund_code, MAX(report_date) FROM fund_holdings
+                WHERE fund_code = ANY(%s) GROUP BY fund_code
+            """, (list(fund_codes),))
+            dates = {row[0]: row[1] or '' for row in cursor.fetchall()}
+            conn.close()
+            return dates
+        except Exception as e:
+            logger.error(f"Get Holdings Report Dates Failed: {e}")
+            return None
+
+    def get_holdings_fingerprint(self):
+        """Cheap change marker for fund_holdings: (row count, last update time)."""
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM fund_holdings")
+            count, last_update = cursor.fetchone()
+            conn.close()
+            return f"{count}:{last_update.isoformat() if last_update else ''}"
+        except Exception as e:
+            logger.error(f"Get Holdings Fingerprint Failed: {e}")
+            return None
+
+    def get_all_fund_holdings(self):
+        """All (fund_code, stock_code, weight) rows, for building the holdings matrix."""
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("SELECT fund_code, stock_code, weight FROM fund_holdings")
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            logger.error(f"Get All Fund Holdings Failed: {e}")
+            return []
+
     def save_fund_valuation(self, fund_code, growth, details):
         try:
             conn = self._get_conn()
@@ -1436,6 +1710,44 @@ class IntelligenceDB:
             logger.error(f"Get Recent Bias Failed for {fund_code}: {e}")
             return 0.0
 
+    def get_calibration_batch(self, fund_codes, days=7, history=3):
+        """
+        Calibration inputs for many funds in one query, keyed by fund code:
+        bias (avg deviation, as get_recent_bias), avg_mae / sample_count (as
+        get_fund_performance_metrics) and the last `history` tracking statuses
+        (as get_recent_tracking_statuses). Funds without reconciled history are absent.
+        """
+        if not fund_codes: return {}
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT fund_code,
+                       AVG(deviation) FILTER (WHERE trade_date > CURRENT_DATE - %s * INTERVAL '1 day'),
+                       AVG(abs_deviation) FILTER (WHERE trade_date > CURRENT_DATE - %s * INTERVAL '1 day'),
+                       COUNT(*) FILTER (WHERE trade_date > CURRENT_DATE - %s * INTERVAL '1 day'),
+                       (ARRAY_AGG(tracking_status ORDER BY trade_date DESC))[1:%s],
+                       (ARRAY_AGG(deviation ORDER BY trade_date DESC))[1:%s]
+                FROM fund_valuation_archive
+                WHERE fund_code = ANY(%s)
+                AND official_growth IS NOT NULL
+                GROUP BY fund_code
+            """, (days, days, days, history, history, list(fund_codes)))
+            stats = {}
+            for code, bias, mae, count, statuses, deviations in cursor.fetchall():
+                stats[code] = {
+                    'bias': float(bias) if bias is not None else 0.0,
+                    'avg_mae': float(mae) if mae is not None else None,
+                    'sample_count': int(count or 0),
+                    'recent': [{'status': st, 'deviation': float(dev or 0)}
+                               for st, dev in zip(statuses or [], deviations or []) if st],
+                }
+            conn.close()
+            return stats
+        except Exception as e:
+            logger.error(f"Get Calibration Batch Failed: {e}")
+            return {}
+
     def get_watchlist_all_codes(self):
         """Internal helper to get all unique codes across all users for batch snapshots."""
         try:
@@ -1449,6 +1761,53 @@ class IntelligenceDB:
             logger.error(f"Get Watchlist All Codes Failed: {e}")
             return []
 
+    def get_quote_universe(self):
+        """
+        Codes that watched funds need quotes for.
+        Returns (holding stock codes, shadow/proxy parent codes).
+        """
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT h.stock_code
+                FROM fund_holdings h
+                JOIN (SELECT DISTINCT fund_code FROM fund_watchlist) w ON w.fund_code = h.fund_code
+            """)
+            stocks = [row[0] for row in cursor.fetchall()]
+            cursor.execute("""
+                SELECT DISTINCT r.parent_code
+                FROM fund_relationships r
+                JOIN (SELECT DISTINCT fund_code FROM fund_watchlist) w ON w.fund_code = r.sub_code
+            """)
+            parents = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return stocks, parents
+        except Exception as e:
+            logger.error(f"Get Quote Universe Failed: {e}")
+            return [], []
+
+    def get_watchlist_links(self):
+        """
+        (fund_code, stock_code, 'holding') for every holding of a watched fund.
+        Shadow/proxy parents are resolved by FundEngine (stored and heuristic) and
+        added by the caller; see core.fund_revaluation.
+        """
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT h.fund_code, h.stock_code, 'holding'
+                FROM fund_holdings h
+                JOIN (SELECT DISTINCT fund_code FROM fund_watchlist) w ON w.fund_code = h.fund_code
+            """)
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            logger.error(f"Get Watchlist Links Failed: {e}")
+            return []
+
     # --- Fund Relationship Methods (Shadow Mapping) ---
 
     def get_fund_relationship(self, sub_code):
@@ -1464,6 +1823,20 @@ class IntelligenceDB:
             logger.error(f"Get Fund Relationship Failed: {e}")
             return None
 
+    def get_fund_relationships_batch(self, sub_codes):
+        """Parent/shadow mappings for many funds in one query: {sub_code: relationship}."""
+        if not sub_codes: return {}
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor(cursor_factory=DictCursor)
+            cursor.execute("SELECT * FROM fund_relationships WHERE sub_code = ANY(%s)", (list(sub_codes),))
+            rels = {row['sub_code']: dict(row) for row in cursor.fetchall()}
+            conn.close()
+            return rels
+        except Exception as e:
+            logger.error(f"Get Fund Relationships Batch Failed: {e}")
+            return {}
+
     def save_fund_relationship(self, sub_code, parent_code, rel_type="ETF_FEEDER", ratio=0.95):
         """Save or update a fund relationship mapping."""
         try:
@@ -1,36 +1,46 @@
 import re
 import logging
+import threading
+import time
 from simhash import Simhash
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from src.alphasignal.config import settings
+from src.alphasignal.core.simhash_index import SimhashIndex
+from src.alphasignal.core.embedding_buffer import EmbeddingRingBuffer
+from src.alphasignal.core.embedding_backends import get_embedding_backend
 
 logger = logging.getLogger(__name__)
 
 class NewsDeduplicator:
-    def __init__(self, model_name="paraphrase-multilingual-MiniLM-L12-v2", simhash_threshold=6, semantic_threshold=0.85):
+    def __init__(self, model_name=None, simhash_threshold=6, semantic_threshold=0.85,
+                 window_hours=None, capacity=None, backend=None):
         self.simhash_threshold = simhash_threshold
         self.semantic_threshold = semantic_threshold
-        self.model_name = model_name
-        self._model = None
+        self.model_name = model_name or settings.NEWS_EMBEDDING_MODEL
+        # Pluggable encoder (full SentenceTransformer or int8-quantized CPU), loaded lazily or via warm_up()
+        self.backend = backend or get_embedding_backend(settings.NEWS_EMBEDDING_BACKEND, self.model_name)
         
         # History containers for batch processing
-        self.simhash_history = [] # List of Simhash objects
-        self.vec_history = []     # List of numpy arrays (vectors)
-        self.id_history = []      # List of IDs corresponding to the history
+        # Multi-index over SimHash fingerprints, limited to the dedupe window
+        window_hours = settings.NEWS_DEDUPE_WINDOW_HOURS if window_hours is None else window_hours
+        self.simhash_index = SimhashIndex(k=simhash_threshold, window_seconds=window_hours * 3600)
+        # Normalized float32 embeddings (+ record ids) for the semantic check
+        self.embeddings = EmbeddingRingBuffer(
+            capacity=settings.NEWS_DEDUPE_CAPACITY if capacity is None else capacity,
+            window_seconds=window_hours * 3600,
+        )
         self.last_vector = None   # Store the last calculated vector for caching
+        self.encode_batch_size = settings.NEWS_DEDUPE_ENCODE_BATCH
+        # check_batch runs in a worker thread; history updates must not interleave
+        self._lock = threading.Lock()
 
     @property
     def model(self):
-        if self._model is None:
-            try:
-                logger.info(f"Loading SentenceTransformer model: {self.model_name}...")
-                self._model = SentenceTransformer(self.model_name)
-                logger.info("Model loaded.")
-            except Exception as e:
-                logger.error(f"Failed to load SentenceTransformer model: {e}. Semantic deduplication will be disabled.")
-                self._model = False # Mark as failed
-        return self._model
+        """The embedding backend once loaded, or False if it failed to load."""
+        return self.backend if self.backend.available else False
+
+    def warm_up(self, background=True):
+        """Load the encoder ahead of the first cycle (in a daemon thread by default)."""
+        return self.backend.warm_up(background=background)
 
     def normalize(self, text):
         """
@@ -61,44 +71,86 @@ class NewsDeduplicator:
     def rough_duplicate(self, text_simhash):
         """
         SimHash rough filtering.
-        Returns True if duplicate found in history.
+        Returns True if duplicate found in history (within the dedupe window).
         """
-        for old_hash in self.simhash_history:
-            if text_simhash.distance(old_hash) <= self.simhash_threshold:
-                return True
-        return False
+        return self.simhash_index.contains_near(text_simhash.value)
 
     def semantic_duplicate(self, text_vector):
         """
         BERT semantic vector reranking.
-        Returns True if duplicate found in history.
+        Returns True if duplicate found in history: one dot product against the
+        normalized history matrix, stopping at the first block over the threshold.
         """
-        # cosine_similarity expects 2D arrays (n_samples, n_features)
-        # text_vector is (n_features, ) or (1, n_features)
-        
-        if not self.vec_history:
-            return False
-            
-        # Stack history for efficient batch calculation (optional, but loop is fine for now)
-        # To avoid large matrix ops in a growing loop, iterating is acceptable for small batch sizes
-        # or checking against the last N vectors. 
-        # User spec: "for v in vectors".
-        
-        # Ensure text_vector is 2D
-        vec = text_vector.reshape(1, -1)
-        
-        for v in self.vec_history:
-            v_2d = v.reshape(1, -1)
-            score = cosine_similarity(vec, v_2d)[0][0]
-            if score > self.semantic_threshold:
-                return True
-        return False
+        return self.embeddings.any_above(text_vector, self.semantic_threshold)
+
+    def most_similar(self, text_vector, k=5):
+        """Top-k prior records by cosine similarity: [(record_id, score)], best first."""
+        return self.embeddings.top_k(text_vector, k)
+
+    def encode_many(self, texts):
+        """
+        Encode `texts` in one batched model call.
+        Returns a list aligned with `texts` (None entries if the model is unavailable or encoding fails).
+        """
+        if not texts or not self.model:
+            return [None] * len(texts)
+        try:
+            return list(self.backend.encode(texts, batch_size=self.encode_batch_size))
+        except Exception as e:
+            logger.warning(f"Batch semantic encoding failed: {e}")
+            return [None] * len(texts)
+
+    def check_batch(self, contents, record_ids=None, timestamps=None):
+        """
+        Batch judgement over one cycle's pending items, in order.
+        Returns [(is_duplicate, vector)] aligned with `contents`.
+
+        SimHash runs first against history and against earlier survivors of the
+        same batch; the survivors are then encoded in a single model call and
+        checked semantically one by one, each accepted item joining history before
+        the next is checked, so near-identical items within a batch are caught too.
+        """
+        n = len(contents)
+        record_ids = list(record_ids) if record_ids is not None else [None] * n
+        timestamps = list(timestamps) if timestamps is not None else [None] * n
+        results = [(False, None)] * n
+
+        with self._lock:
+            # 1. SimHash rough filter (history + batch)
+            survivors, batch_fps = [], []
+            for i, content in enumerate(contents):
+                clean_text = self.normalize(content)
+                if not clean_text:
+                    continue
+                sh = Simhash(clean_text)
+                if self.rough_duplicate(sh) or any((sh.value ^ fp).bit_count() <= self.simhash_threshold for fp in batch_fps):
+                    results[i] = (True, None)
+                    continue
+                batch_fps.append(sh.value)
+                survivors.append((i, clean_text, sh))
+
+            # 2. One batched encode for everything that passed
+            vectors = self.encode_many([clean_text for _, clean_text, _ in survivors])
+
+            # 3. Semantic filter in batch order; accepted items join history immediately
+            for (i, _, sh), vector in zip(survivors, vectors):
+                if vector is not None and self.semantic_duplicate(vector):
+                    results[i] = (True, vector)
+                    continue
+                self.add_to_history(sh, vector, record_ids[i], timestamps[i])
+                results[i] = (False, vector)
+
+        return results
 
     def is_duplicate(self, news_content, record_id=None):
         """
         Comprehensive judgement function.
         Updates history if NOT duplicate.
         """
+        with self._lock:
+            return self._is_duplicate(news_content, record_id)
+
+    def _is_duplicate(self, news_content, record_id=None):
         clean_text = self.normalize(news_content)
         
         if not clean_text:
@@ -112,13 +164,10 @@ class NewsDeduplicator:
         # 2. Semantic Vector Filter (Only if model loaded successfully)
         current_vector = None
         if self.model: # Check if model is available (not False/None)
-            try:
-                current_vector = self.model.encode(clean_text)
-                self.last_vector = current_vector # Store for external persistence
-                if self.semantic_duplicate(current_vector):
-                    return True
-            except Exception as e:
-                logger.warning(f"Semantic encoding failed: {e}")
+            current_vector = self.encode_many([clean_text])[0]
+            self.last_vector = current_vector # Store for external persistence
+            if current_vector is not None and self.semantic_duplicate(current_vector):
+                return True
         else:
             self.last_vector = None
 
@@ -127,14 +176,34 @@ class NewsDeduplicator:
             
         return False
 
-    def add_to_history(self, sh_obj, vector, record_id=None):
-        """Manually add an item to history"""
-        self.simhash_history.append(sh_obj)
-        self.vec_history.append(vector)
-        if record_id:
-            self.id_history.append(record_id)
+    def add_to_history(self, sh_obj, vector, record_id=None, timestamp=None):
+        """Manually add an item to history (timestamp: datetime or epoch seconds, default now)"""
+        if hasattr(timestamp, 'timestamp'):
+            timestamp = timestamp.timestamp()
+        self.simhash_index.add(sh_obj.value, timestamp, record_id)
+        if vector is not None:
+            self.embeddings.add(vector, record_id, timestamp)
+
+    def load_history(self, entries):
+        """
+        Bulk-add prior records, oldest first: entries of (clean_text, vector or None, record_id, timestamp).
+        Vectors go into the embedding matrix in one write.
+        """
+        vectors, ids, stamps = [], [], []
+        with self._lock:
+            for clean_text, vector, record_id, timestamp in entries:
+                if hasattr(timestamp, 'timestamp'):
+                    timestamp = timestamp.timestamp()
+                if timestamp is None:
+                    timestamp = time.time()
+                self.simhash_index.add(Simhash(clean_text).value, timestamp, record_id)
+                if vector is not None:
+                    vectors.append(vector)
+                    ids.append(record_id)
+                    stamps.append(timestamp)
+            if vectors:
+                self.embeddings.add_many(vectors, ids, stamps)
 
     def clear_history(self):
-        self.simhash_history = []
-        self.vec_history = []
-        self.id_history = []
+        self.simhash_index.clear()
+        self.embeddings.clear()
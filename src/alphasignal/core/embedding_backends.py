@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(ABC):
+    """
+    Text -> float32 matrix encoder used by NewsDeduplicator.
+    Subclasses implement `_load()` (returning the underlying model) and `_encode()`;
+    loading is lazy, thread-safe and happens once, either on first use or via `warm_up()`.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @abstractmethod
+    def _load(self):
+        """Load and return the underlying model."""
+
+    @abstractmethod
+    def _encode(self, model, texts, batch_size):
+        """Encode `texts` with the loaded model; anything np.asarray turns into a (n, dim) matrix."""
+
+    @property
+    def available(self):
+        return self._ensure_loaded() is not False
+
+    def _ensure_loaded(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    try:
+                        logger.info(f"Loading embedding backend {self.name}: {self.model_name}...")
+                        self._model = self._load()
+                        self.load_seconds = time.perf_counter() - started
+                        logger.info(f"Embedding backend {self.name} loaded in {self.load_seconds:.1f}s.")
+                    except Exception as e:
+                        logger.error(f"Failed to load embedding backend {self.name}: {e}. Semantic deduplication will be disabled.")
+                        self._model = False  # Mark as failed
+        return self._model
+
+    def encode(self, texts, batch_size=32):
+        """(len(texts), dim) float32 matrix."""
+        model = self._ensure_loaded()
+        if model is False:
+            raise RuntimeError(f"embedding backend {self.name} unavailable")
+        return np.asarray(self._encode(model, list(texts), batch_size), dtype=np.float32)
+
+    def warm_up(self, background=True):
+        """Load the model and run one forward pass; in a daemon thread unless background=False."""
+        def run():
+            try:
+                if self.available:
+                    self.encode(["warm-up"], batch_size=1)
+            except Exception as e:
+                logger.warning(f"Embedding warm-up failed: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name=f"embedding-warmup-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Full-precision SentenceTransformer (the original dedupe encoder)."""
+
+    name = "sentence_transformer"
+
+    def __init__(self, model_name, device=None):
+        super().__init__(model_name)
+        self.device = device
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name, device=self.device)
+
+    def _encode(self, model, texts, batch_size):
+        return model.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+
+
+class Int8SentenceTransformerBackend(SentenceTransformerBackend):
+    """
+    Same model on CPU with int8 dynamic quantization: Linear weights are quantized
+    per tensor and the (large, multilingual) word embedding table per row. Vectors
+    stay in the full model's space, so stored embeddings remain comparable.
+    """
+
+    name = "int8"
+
+    def __init__(self, model_name):
+        super().__init__(model_name, device="cpu")
+
+    def _load(self):
+        import torch
+        from torch import nn
+        from torch.ao.quantization import default_dynamic_qconfig, float_qparams_weight_only_qconfig, quantize_dynamic
+
+        model = super()._load().eval()
+        spec = {nn.Linear: default_dynamic_qconfig}
+        # Only vocabulary-sized tables; tiny ones (token types) gain nothing and need contiguous inputs
+        spec.update({
+            name: float_qparams_weight_only_qconfig
+            for name, module in model.named_modules()
+            if isinstance(module, nn.Embedding) and module.num_embeddings >= 1000
+        })
+        return quantize_dynamic(model, spec, dtype=torch.qint8)
+
+    def _encode(self, model, texts, batch_size):
+        import torch
+        with torch.inference_mode():
+            return super()._encode(model, texts, batch_size)
+
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    Int8SentenceTransformerBackend.name: Int8SentenceTransformerBackend,
+}
+
+
+def get_embedding_backend(name, model_name):
+    try:
+        return BACKENDS[name](model_name)
+    except KeyError:
+        raise ValueError(f"unknown embedding backend {name!r} (expected one of {sorted(BACKENDS)})")
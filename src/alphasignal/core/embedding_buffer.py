@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+
+
+class EmbeddingRingBuffer:
+    """
+    Fixed-capacity history of L2-normalized float32 embeddings in one contiguous
+    matrix, with record ids and timestamps alongside. Cosine similarity against
+    the whole history is a single mat-vec; the oldest rows are overwritten once
+    the buffer is full, and rows older than `window_seconds` are ignored.
+    """
+
+    BLOCK = 4096  # rows per dot-product block when scanning with early exit
+
+    def __init__(self, capacity=50000, window_seconds=None):
+        self.capacity = max(1, int(capacity))
+        self.window = window_seconds
+        self.dim = None
+        self._vecs = None
+        self._ids = np.empty(self.capacity, dtype=object)
+        self._ts = np.full(self.capacity, -np.inf)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return int(self._live().sum()) if self._size else 0
+
+    @staticmethod
+    def normalize(vec):
+        v = np.asarray(vec, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def add(self, vec, record_id=None, timestamp=None):
+        v = self.normalize(vec)
+        if self._vecs is None:
+            self.dim = v.shape[0]
+            self._vecs = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        elif v.shape[0] != self.dim:
+            raise ValueError(f"embedding dim {v.shape[0]} != buffer dim {self.dim}")
+        i = self._head
+        self._vecs[i] = v
+        self._ids[i] = record_id
+        self._ts[i] = time.time() if timestamp is None else timestamp
+        self._head = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def add_many(self, vecs, record_ids=None, timestamps=None):
+        """Append rows in order (e.g. a bulk load from the table); only the last `capacity` are kept."""
+        m = np.array(vecs, dtype=np.float32, ndmin=2)
+        n = m.shape[0]
+        if not n:
+            return
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        m /= norms
+        if self._vecs is None:
+            self.dim = m.shape[1]
+            self._vecs = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        elif m.shape[1] != self.dim:
+            raise ValueError(f"embedding dim {m.shape[1]} != buffer dim {self.dim}")
+        ids = np.empty(n, dtype=object)
+        ids[:] = [None] * n if record_ids is None else list(record_ids)
+        ts = np.full(n, time.time()) if timestamps is None else np.asarray(timestamps, dtype=float)
+        if n > self.capacity:
+            m, ids, ts = m[-self.capacity:], ids[-self.capacity:], ts[-self.capacity:]
+            n = self.capacity
+        idx = (self._head + np.arange(n)) % self.capacity
+        self._vecs[idx] = m
+        self._ids[idx] = ids
+        self._ts[idx] = ts
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def _live(self, now=None):
+        ts = self._ts[:self._size]
+        if self.window is None:
+            return np.isfinite(ts)
+        return ts >= (time.time() if now is None else now) - self.window
+
+    def _query(self, vec):
+        q = self.normalize(vec)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"embedding dim {q.shape[0]} != buffer dim {self.dim}")
+        return q
+
+    def any_above(self, vec, threshold):
+        """True if any live row has cosine similarity > threshold; scans block by block, newest first."""
+        if not self._size:
+            return False
+        q = self._query(vec)
+        live = self._live()
+        # Rows are written at head, so [0, head) then [head, size) walked backwards is newest first
+        order = [(0, self._head), (self._head, self._size)] if self._size == self.capacity else [(0, self._size)]
+        for start, end in order:
+            for e in range(end, start, -self.BLOCK):
+                s = max(e - self.BLOCK, start)
+                sims = self._vecs[s:e] @ q
+                if (sims[live[s:e]] > threshold).any():
+                    return True
+        return False
+
+    def similarities(self, vec):
+        """(record ids, cosine similarities) for every live row."""
+        if not self._size:
+            return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+        live = self._live()
+        sims = self._vecs[:self._size] @ self._query(vec)
+        return self._ids[:self._size][live], sims[live]
+
+    def top_k(self, vec, k=5):
+        """Most similar live records: [(record_id, similarity)], best first."""
+        ids, sims = self.similarities(vec)
+        if not len(sims):
+            return []
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(ids[i], float(sims[i])) for i in top]
+
+    def clear(self):
+        self._ids[:] = None
+        self._ts[:] = -np.inf
+        self._head = 0
+        self._size = 0
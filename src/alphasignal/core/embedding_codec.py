@@ -0,0 +1,81 @@
+import io
+import pickle
+import struct
+
+import numpy as np
+
+# Layout (little-endian):
+#   magic "AEMB" | version u8 | reserved u8 | model name length u16 | dim u32 | model name (utf-8)
+#   zero padding to a 4-byte boundary | dim x float32
+# The vector is read in place with np.frombuffer; padding keeps it float32-aligned.
+MAGIC = b"AEMB"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBHI")
+_DTYPE = np.dtype("<f4")
+
+
+class EmbeddingFormatError(ValueError):
+    pass
+
+
+def _data_offset(model_len):
+    end = _HEADER.size + model_len
+    return end + (-end % _DTYPE.itemsize)
+
+
+def encode_embedding(vector, model=""):
+    """Serialize a 1-D vector as raw little-endian float32 behind a small header."""
+    v = np.ascontiguousarray(np.asarray(vector).reshape(-1), dtype=_DTYPE)
+    name = (model or "").encode("utf-8")[:0xFFFF]
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(name), v.shape[0]) + name
+    return header + b"\0" * (_data_offset(len(name)) - len(header)) + v.tobytes()
+
+
+def is_encoded(blob):
+    return blob is not None and bytes(blob[:4]) == MAGIC
+
+
+def read_header(blob):
+    """(version, dim, model) of an encoded blob."""
+    if len(blob) < _HEADER.size:
+        raise EmbeddingFormatError("embedding blob shorter than header")
+    magic, version, _, model_len, dim = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise EmbeddingFormatError("not an AEMB embedding blob")
+    if version != VERSION:
+        raise EmbeddingFormatError(f"unsupported embedding format version {version}")
+    model = bytes(blob[_HEADER.size:_HEADER.size + model_len]).decode("utf-8", "replace")
+    return version, dim, model
+
+
+def decode_embedding(blob):
+    """
+    (vector, model) from an encoded blob. The vector is a read-only float32 view
+    over `blob` (bytes or the memoryview psycopg2 returns for BYTEA) - no copy.
+    """
+    _, dim, model = read_header(blob)
+    offset = _data_offset(len(model.encode("utf-8")))
+    if len(blob) < offset + dim * _DTYPE.itemsize:
+        raise EmbeddingFormatError("embedding blob truncated")
+    return np.frombuffer(blob, dtype=_DTYPE, count=dim, offset=offset), model
+
+
+class _NumpyOnlyUnpickler(pickle.Unpickler):
+    """Legacy pickled ndarrays only; anything else in the stream is refused."""
+    ALLOWED = {
+        ("numpy", "ndarray"), ("numpy", "dtype"),
+        ("numpy.core.multiarray", "_reconstruct"), ("numpy._core.multiarray", "_reconstruct"),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"refusing to load {module}.{name}")
+
+
+def decode_legacy(blob):
+    """Vector from a pre-AEMB `pickle.dumps(ndarray)` blob (restricted unpickler)."""
+    value = _NumpyOnlyUnpickler(io.BytesIO(bytes(blob))).load()
+    if not isinstance(value, np.ndarray):
+        raise EmbeddingFormatError(f"legacy embedding is {type(value).__name__}, not ndarray")
+    return value.astype(_DTYPE, copy=False).reshape(-1)
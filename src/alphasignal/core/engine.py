@@ -1,7 +1,6 @@
-import time
 import json
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 from src.alphasignal.config import settings
 from src.alphasignal.core.logger import logger
@@ -11,11 +10,16 @@ from src.alphasignal.providers.data_sources.google_news import GoogleNewsSource
 from src.alphasignal.providers.data_sources.rsshub import RSSHubSource
 from src.alphasignal.providers.llm.gemini import GeminiLLM
 from src.alphasignal.providers.llm.deepseek import DeepSeekLLM
+from src.alphasignal.providers.llm.limits import provider_stats
 from src.alphasignal.providers.channels.email import EmailChannel
 from src.alphasignal.providers.channels.bark import BarkChannel
 from src.alphasignal.core.database import IntelligenceDB
 from src.alphasignal.core.backtest import BacktestEngine
 from src.alphasignal.core.deduplication import NewsDeduplicator
+from src.alphasignal.core.analysis_scheduler import AnalysisScheduler
+from src.alphasignal.core.analysis_cache import AnalysisCache
+from src.alphasignal.utils.prompt_compactor import PromptCompactor
+from src.alphasignal.core.embedding_codec import decode_embedding, decode_legacy, is_encoded
 
 class AlphaEngine:
     def __init__(self):
@@ -30,21 +34,34 @@ class AlphaEngine:
         self.backtester = BacktestEngine(self.db)
         self.deduplicator = NewsDeduplicator()
         
-        # Concurrency Control
-        self.ai_semaphore = asyncio.Semaphore(5) # Limit to 5 concurrent AI calls
+        # Micro-batched LLM analysis (analyze_batch_async, per-item fallback), content-addressed cache in front
+        self.analysis_cache = AnalysisCache(self.db)
+        self.prompt_compactor = PromptCompactor()
+        self.analyzer = AnalysisScheduler(self.primary_llm, self.fallback_llm, cache=self.analysis_cache)
+
+        # Concurrency Control: enough items in flight to fill every batch slot
+        self.ai_semaphore = asyncio.Semaphore(self.analyzer.max_inflight)
         
+        # Load the embedding model in the background so the first cycle doesn't stall on it
+        if settings.NEWS_EMBEDDING_WARMUP:
+            self.deduplicator.warm_up()
+
         # Bootstrap deduplicator history from DB
         self._bootstrap_deduplicator()
+
+        # Rebuild the rolling clustering/exhaustion counters from the table
+        self.db.reconcile_metric_counters()
         
     def _bootstrap_deduplicator(self):
-        """Load recent intelligence from DB to initialize deduplicator history"""
+        """Stream the dedupe window from DB into the deduplicator (SimHash index + embedding matrix)"""
         logger.info("🧵正在初始化去重引擎历史数据...")
         try:
-            # Load intelligence from the last 24 hours
-            recent_items = self.db.get_recent_intelligence(limit=200)
-            if recent_items:
-                # Process from oldest to newest to maintain correct history order
-                for item in reversed(recent_items):
+            since = datetime.now(pytz.utc) - timedelta(hours=settings.NEWS_DEDUPE_WINDOW_HOURS)
+            encoded = 0
+            # Oldest first, so the ring buffer keeps the newest records
+            for rows in self.db.iter_dedupe_history(since):
+                entries, missing = [], []
+                for item in rows:
                     # Combine summary and content for consistent matching
                     summary = item.get('summary')
                     summary_text = ""
@@ -54,36 +71,44 @@ class AlphaEngine:
                         summary_text = summary
                     
                     text = summary_text if len(summary_text) > 20 else (item.get('content') or "")
-                    if text:
-                        clean_text = self.deduplicator.normalize(text)
-                        if clean_text:
-                            from simhash import Simhash
-                            sh = Simhash(clean_text)
-                            
-                            # --- Persistent Embedding Cache Logic ---
-                            vec = None
-                            db_vec_binary = item.get('embedding')
-                            
-                            if db_vec_binary:
-                                try:
-                                    import pickle
-                                    vec = pickle.loads(db_vec_binary)
-                                except Exception as e:
-                                    logger.warning(f"Failed to deserialize embedding for ID {item.get('id')}: {e}")
-                            
-                            # Fallback if no cache in DB
-                            if vec is None and self.deduplicator.model:
-                                try:
-                                    vec = self.deduplicator.model.encode(clean_text)
-                                except Exception as e:
-                                    logger.warning(f"Semantic encoding failed during bootstrap: {e}")
-                            
-                            self.deduplicator.add_to_history(sh, vec, record_id=item.get('id'))
-                
-                logger.info(f"✅ 已加载 {len(self.deduplicator.simhash_history)} 条记录到去重引擎历史。")
+                    clean_text = self.deduplicator.normalize(text) if text else ""
+                    if not clean_text:
+                        continue
+
+                    # --- Persistent Embedding Cache Logic ---
+                    vec = self._stored_embedding(item)
+                    if vec is None:
+                        missing.append(len(entries))
+                    entries.append([clean_text, vec, item.get('id'), item.get('timestamp')])
+
+                # Fallback for rows without a usable stored embedding: one batched encode per chunk
+                if missing:
+                    vectors = self.deduplicator.encode_many([entries[i][0] for i in missing])
+                    for i, vec in zip(missing, vectors):
+                        entries[i][1] = vec
+                    encoded += len(missing)
+
+                self.deduplicator.load_history(entries)
+
+            logger.info(f"✅ 已加载 {len(self.deduplicator.simhash_index)} 条记录到去重引擎历史 (重新编码 {encoded} 条)。")
         except Exception as e:
             logger.error(f"❌ 初始化去重引擎失败: {e}")
 
+    def _stored_embedding(self, item):
+        """Stored vector for a row, or None if absent, unreadable, or from a different model."""
+        blob = item.get('embedding')
+        if not blob:
+            return None
+        try:
+            if is_encoded(blob):
+                vec, model = decode_embedding(blob)
+                return vec if model == self.deduplicator.model_name else None
+            # Not yet migrated (scripts/migrate_embeddings.py): legacy pickled ndarray
+            return decode_legacy(blob)
+        except Exception as e:
+            logger.warning(f"Failed to deserialize embedding for ID {item.get('id')}: {e}")
+            return None
+
     async def run_once_async(self):
         """
         核心异步流水线：
@@ -97,6 +122,12 @@ class AlphaEngine:
         # 0. 异步同步收益率
         await asyncio.to_thread(self.backtester.sync_outcomes)
 
+        # 0.5 刷新宏观背景快照 (每轮一次, 入库与分析共用)
+        await asyncio.to_thread(self.db.get_market_context)
+
+        # 0.6 计数器就绪标记过期 / 重建失败时重新对账
+        await asyncio.to_thread(self.db.reconcile_metric_counters, False)
+
         # 1. 同步发现新情报 (Discovery Phase)
         discovered_items = []
         for source in self.sources:
@@ -107,9 +138,9 @@ class AlphaEngine:
             except Exception as e:
                 logger.error(f"数据源发现异常: {e}")
 
-        # 2. 初始入库并标记为 PENDING
-        for item in discovered_items:
-            await asyncio.to_thread(self.db.save_raw_intelligence, item)
+        # 2. 初始入库并标记为 PENDING (整批一次写入)
+        if discovered_items:
+            await asyncio.to_thread(self.db.save_raw_intelligence_many, discovered_items)
 
         # 3. 补课机制：获取所有未完成分析的记录 (PENDING/FAILED)
         pending_records = await asyncio.to_thread(self.db.get_pending_intelligence, limit=20)
@@ -123,17 +154,30 @@ class AlphaEngine:
         crawler = AsyncRichCrawler()
         enriched_items = await crawler.batch_crawl(pending_records)
 
-        # 5. 并行并发 AI 分析
-        logger.info(f"🚀 并行分析中 (并发数: 5, 任务数: {len(enriched_items)})...")
+        # 4.5 压缩全文提示词 (去导航/链接/样板与重复段落, 按黄金/宏观相关度截断到 token 预算)
+        if settings.PROMPT_COMPACTION_ENABLED:
+            await asyncio.to_thread(self.prompt_compactor.compact_items, enriched_items)
+
+        # 5. 整批语义去重 (一次批量编码, 在线程中执行, 同批近似条目亦可识别)
+        verdicts = await asyncio.to_thread(
+            self.deduplicator.check_batch,
+            [item.get('content') for item in enriched_items],
+            [item.get('id') for item in enriched_items],
+        )
+
+        # 6. 并行并发 AI 分析
+        logger.info(f"🚀 批量并行分析中 (批大小: {self.analyzer.max_batch}, 任务数: {len(enriched_items)})...")
         tasks = []
-        for item in enriched_items:
-            tasks.append(self._process_single_item_async(item))
+        for item, verdict in zip(enriched_items, verdicts):
+            tasks.append(self._process_single_item_async(item, verdict))
         
         await asyncio.gather(*tasks)
+        logger.info(f"📈 LLM 调用统计: {provider_stats()} | 调度: {self.analyzer.stats} | 缓存: {self.analysis_cache.stats()}")
+        logger.info(f"✂️ 提示词压缩: {self.prompt_compactor.stats()}")
         logger.info("<<< 本轮流式扫描完成。")
 
-    async def _process_single_item_async(self, raw_data):
-        """单条情报的异步处理状态机"""
+    async def _process_single_item_async(self, raw_data, verdict=None):
+        """单条情报的异步处理状态机 (verdict: 批量去重结果 (is_duplicate, vector))"""
         source_id = raw_data.get('source_id') or raw_data.get('id')
         
         async with self.ai_semaphore:
@@ -144,23 +188,24 @@ class AlphaEngine:
                 # 1. 注入上下文 (同步方法转异步)
                 context_str = await asyncio.to_thread(self._enrich_market_context, raw_data)
                 
-                # 2. 语义去重 (BERT级别)
-                if self.deduplicator.is_duplicate(raw_data.get('content')):
+                # 2. 语义去重 (BERT级别, 通常已在批量阶段完成)
+                if verdict is None:
+                    verdict = (await asyncio.to_thread(
+                        self.deduplicator.check_batch, [raw_data.get('content')], [raw_data.get('id')]
+                    ))[0]
+                is_dup, vector = verdict
+                if is_dup:
                     logger.info(f"🚫 语义重复，标记为已过滤: {source_id}")
                     await asyncio.to_thread(self.db.update_intelligence_status, source_id, 'COMPLETED', 'Deduplicated')
                     return
 
-                # 3. AI 分析 (异步)
+                # 3. AI 分析 (异步, 与同轮其他条目合批; 批量缺失时单条回退)
                 logger.info(f"🤖 正在分析({raw_data.get('extraction_method', 'UNKNOWN')}): {source_id}")
-                try:
-                    analysis_result = await self.primary_llm.analyze_async(raw_data)
-                except Exception as e:
-                    logger.warning(f"Primary LLM failed for {source_id}, trying fallback: {e}")
-                    analysis_result = await self.fallback_llm.analyze_async(raw_data)
+                analysis_result = await self.analyzer.analyze(raw_data)
 
                 # 4. 存储分析结果并标记为 COMPLETED
                 if analysis_result:
-                    analysis_result['embedding'] = self.deduplicator.last_vector
+                    analysis_result['embedding'] = vector
                     await asyncio.to_thread(self.db.update_intelligence_analysis, source_id, analysis_result, raw_data)
 
                     # 5. 交易逻辑与分发
@@ -196,9 +241,11 @@ class AlphaEngine:
         """注入多维度市场背景数据 (DXY, GVZ, COT)"""
         now = datetime.now(pytz.utc)
         
-        # 1. 实时行情快照
-        dxy = self.db.get_market_snapshot("DX-Y.NYB", now)
-        gvz = self.db.get_market_snapshot("^GVZ", now)
+        # 1. 实时行情快照 (共享宏观快照, 本轮已刷新)
+        market = self.db.get_market_context()
+        dxy = market['values'].get("DX-Y.NYB")
+        gvz = market['values'].get("^GVZ")
+        as_of = market['as_of'].strftime('%H:%M UTC') if market.get('as_of') else '获取中'
         
         # 2. 持仓数据 (Dimension B)
         cot = self.db.get_latest_indicator("COT_GOLD_NET", now)
@@ -214,7 +261,7 @@ class AlphaEngine:
             fed_context = "降息周期/鸽派 (Dovish)" if fed['value'] > 0 else "加息周期/鹰派 (Hawkish)" if fed['value'] < 0 else "中性 (Neutral)"
 
         context = f"""
-[当前市场环境快照]:
+[当前市场环境快照 (截至 {as_of})]:
 - 美元指数 (DXY): {dxy if dxy else '获取中'}
 - 黄金波动率 (GVZ): {gvz if gvz else '获取中'} (指数 > 25 表示恐慌/流动性枯竭风险)
 - 基金持仓拥挤度 (COT): {cot_info}
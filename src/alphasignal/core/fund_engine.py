@@ -1,27 +1,73 @@
 import os
 import threading
+import time
 import akshare as ak
+import numpy as np
 import pandas as pd
 import json
 import redis
-from datetime import datetime, timedelta
-from src.alphasignal.core.database import IntelligenceDB
+from datetime import datetime
+from src.alphasignal.core.database import IntelligenceDB, get_db
+from src.alphasignal.core.market_snapshot import MarketSnapshot, join_snapshots, value_holdings
+from src.alphasignal.core.holdings_matrix import HoldingsMatrix
+from src.alphasignal.config import settings
+from src.alphasignal.providers.market.tencent_quotes import get_quote_client, stock_secid, parent_secid
+from src.alphasignal.services.quote_book import get_quote_book
+from src.alphasignal.infra.cache.single_flight import SingleFlight, RedisLock
 from src.alphasignal.core.logger import logger
 from src.alphasignal.utils.market_calendar import is_market_open, was_market_open_last_night
 from src.alphasignal.utils import format_iso8601
 
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_fund_engine():
+    """Return the process-wide FundEngine (shared DB handle and Redis connection pool)."""
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = FundEngine()
+    return _shared_engine
+
+
 class FundEngine:
     def __init__(self, db: IntelligenceDB = None):
-        self.db = db if db else IntelligenceDB()
+        self.db = db if db else get_db()
         
         # Init Redis
         redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
         try:
             self.redis = redis.from_url(redis_url, decode_responses=True)
+            # Raw-bytes client for binary payloads (market snapshots)
+            self.redis_bin = redis.from_url(redis_url)
             # Lightweight check (optional)
         except Exception as e:
             logger.warning(f"Redis connection failed: {e}")
             self.redis = None
+            self.redis_bin = None
+
+        # Decoded market snapshots, reused until the Redis snapshot version changes
+        self._snapshots = {}
+        self._snapshot_lock = threading.Lock()
+
+        # Sparse funds × securities holdings matrix, rebuilt when fund_holdings changes
+        self._holdings_matrix = None
+        self._holdings_checked_at = 0.0
+        self._holdings_lock = threading.Lock()
+
+        # Per-fund holdings for batch valuation: fund_code -> (report_date, holdings)
+        self._holdings_cache = {}
+        self._holdings_cache_fp = None
+        self._holdings_cache_lock = threading.Lock()
+
+        # Request coalescing: concurrent misses for a fund share one computation
+        # (in-process flights + a Redis lock across workers)
+        self._flight = SingleFlight()
+        self._locks = RedisLock(self.redis, prefix="lock:valuation:")
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
 
     def update_fund_holdings(self, fund_code):
         """Fetch latest holdings from Market Provider and save to DB."""
@@ -72,6 +118,9 @@ class FundEngine:
                 
             # Save to DB
             self.db.save_fund_holdings(fund_code, holdings)
+            self.invalidate_holdings_matrix()
+            with self._holdings_cache_lock:
+                self._holdings_cache.pop(fund_code, None)
             return holdings
             
         except Exception as e:
@@ -175,6 +224,34 @@ class FundEngine:
                 
         return None, 0.95
 
+    def _resolve_relationship(self, fund_code, fund_name=None):
+        """Shadow/proxy parent for a fund: fund_relationships first, then the ETF-feeder and index-proxy heuristics."""
+        rel = self.db.get_fund_relationship(fund_code)
+        if rel:
+            return rel
+        return self._heuristic_relationship(fund_code, fund_name)
+
+    def _resolve_relationships(self, fund_codes, fund_name_map):
+        """Batch form of _resolve_relationship: one fund_relationships query, heuristics only for unmapped funds."""
+        rels = self.db.get_fund_relationships_batch(fund_codes)
+        for f_code in fund_codes:
+            if f_code not in rels:
+                rel = self._heuristic_relationship(f_code, fund_name_map.get(f_code))
+                if rel:
+                    rels[f_code] = rel
+        return rels
+
+    def _heuristic_relationship(self, fund_code, fund_name):
+        # 1. Try shadow ETF heuristic
+        p_code = self._identify_shadow_etf(fund_code, fund_name)
+        if p_code:
+            return {"parent_code": p_code, "ratio": 0.95, "relation_type": "ETF_FEEDER"}
+        # 2. Try index proxy heuristic
+        p_code, ratio = self._identify_index_proxy(fund_code, fund_name)
+        if p_code:
+            return {"parent_code": p_code, "ratio": ratio, "relation_type": "INDEX_PROXY"}
+        return None
+
     def _get_fund_name(self, fund_code):
         """Fetch Fund Name with Redis Cache and Local DB fallback."""
         if self.redis:
@@ -275,15 +352,291 @@ class FundEngine:
             logger.error(f"Industry map fetch failed: {e}")
             return {}
 
+    def _get_holdings_matrix(self):
+        """
+        Shared HoldingsMatrix over every fund in fund_holdings.
+        The table fingerprint is checked at most every HOLDINGS_MATRIX_CHECK_SECONDS;
+        the matrix is only rebuilt when it changed.
+        """
+        import time
+        if self._holdings_matrix is not None and time.time() - self._holdings_checked_at < settings.HOLDINGS_MATRIX_CHECK_SECONDS:
+            return self._holdings_matrix
+
+        with self._holdings_lock:
+            matrix = self._holdings_matrix
+            if matrix is not None and time.time() - self._holdings_checked_at < settings.HOLDINGS_MATRIX_CHECK_SECONDS:
+                return matrix
+
+            fingerprint = self.db.get_holdings_fingerprint()
+            self._holdings_checked_at = time.time()
+            if matrix is not None and (fingerprint is None or fingerprint == matrix.fingerprint):
+                return matrix
+            if fingerprint is None:
+                return None
+
+            started = time.perf_counter()
+            matrix = HoldingsMatrix.from_rows(self.db.get_all_fund_holdings(), fingerprint=fingerprint)
+            logger.info(f"🧮 Holdings matrix rebuilt: {matrix.shape[0]} funds × {matrix.shape[1]} securities "
+                        f"({matrix.weights.nnz} holdings) in {(time.perf_counter() - started) * 1000:.0f}ms")
+            self._holdings_matrix = matrix
+            return matrix
+
+    def _get_holdings_batch(self, fund_codes):
+        """
+        Holdings for many funds: {fund_code: holdings}, funds without holdings absent.
+        Served from an in-process cache keyed by each fund's report date: when the
+        fund_holdings fingerprint moves, cached funds are revalidated with one
+        report-date query and only those whose report changed are reloaded.
+        """
+        matrix = self._get_holdings_matrix()
+        fingerprint = matrix.fingerprint if matrix is not None else None
+        with self._holdings_cache_lock:
+            cache = self._holdings_cache
+            if fingerprint != self._holdings_cache_fp:
+                if cache:
+                    dates = self.db.get_holdings_report_dates(list(cache))
+                    if dates is None:
+                        cache.clear()
+                    else:
+                        for code in [c for c, (d, _) in cache.items() if dates.get(c) != d]:
+                            del cache[code]
+                self._holdings_cache_fp = fingerprint
+            found = {c: cache[c][1] for c in fund_codes if c in cache}
+
+        missing = [c for c in fund_codes if c not in found]
+        if missing:
+            loaded = self.db.get_fund_holdings_batch(missing)
+            with self._holdings_cache_lock:
+                for code, rows in loaded.items():
+                    cache[code] = (max((r.get('report_date') or '' for r in rows), default=''), rows)
+            found.update(loaded)
+        return found
+
+    def invalidate_holdings_matrix(self):
+        """Force a fingerprint check on next use (call after holdings were written)."""
+        self._holdings_checked_at = 0.0
+
+    def _fetch_quotes(self, secids):
+        """Quotes from the shared QuoteBook; only secids it does not carry yet go upstream (and get tracked)."""
+        book = get_quote_book()
+        quotes, missing = book.get_quotes(secids)
+        if missing:
+            book.track(missing)
+            quotes.merge(get_quote_client().fetch(missing))
+        return quotes
+
+    def _ensure_sector_index(self, matrix):
+        """Build the matrix's sector index once; False (nothing cached) if the industry map is unavailable."""
+        if not matrix.has_sector_index:
+            industry_map = self._get_industry_map(list(matrix.sec_codes))
+            if not industry_map:
+                logger.warning("Industry map unavailable, skipping sector attribution")
+                return False
+            matrix.build_sector_index(industry_map)
+        return True
+
+    SNAPSHOT_TTL = 60
+
+    def _get_market_snapshot(self, market_type):
+        """
+        Full-market spot snapshot ('a' or 'hk') as a code-indexed MarketSnapshot.
+        Redis holds one packed binary payload per refresh (market:snapshot:{m}:{version})
+        plus a version pointer; the decoded copy is reused in-process until that
+        pointer moves, so a cache hit costs a single GET of the version string.
+        """
+        import time
+        version_key = f"market:snapshot:{market_type}:version"
+        snap = self._snapshots.get(market_type)
+
+        current = None
+        if self.redis:
+            try:
+                current = self.redis.get(version_key)
+            except Exception as e:
+                logger.warning(f"Snapshot version check failed: {e}")
+        def reusable(s):
+            if not s: return False
+            if current is None:
+                return time.time() - s.built_at < self.SNAPSHOT_TTL
+            return s.version == current
+
+        if reusable(snap):
+            return snap
+
+        with self._snapshot_lock:
+            snap = self._snapshots.get(market_type)
+            if reusable(snap):
+                return snap
+
+            if current and self.redis_bin:
+                try:
+                    blob = self.redis_bin.get(f"market:snapshot:{market_type}:{current}")
+                    if blob:
+                        snap = MarketSnapshot.from_bytes(blob)
+                        self._snapshots[market_type] = snap
+                        return snap
+                except Exception as e:
+                    logger.warning(f"Snapshot cache decode failed ({market_type}): {e}")
+
+            if market_type == 'a':
+                df = ak.stock_zh_a_spot_em()
+            else:
+                df = ak.stock_hk_spot_em()
+            snap = MarketSnapshot.from_frame(market_type, df)
+
+            # Cache for 60s: payload first, then flip the version pointer
+            if self.redis_bin and len(snap):
+                try:
+                    pipe = self.redis_bin.pipeline()
+                    pipe.setex(f"market:snapshot:{market_type}:{snap.version}", self.SNAPSHOT_TTL + 5, snap.to_bytes())
+                    pipe.setex(version_key, self.SNAPSHOT_TTL, snap.version)
+                    pipe.execute()
+                except Exception as e:
+                    logger.warning(f"Snapshot cache write failed ({market_type}): {e}")
+
+            self._snapshots[market_type] = snap
+            return snap
+
+    # --- Valuation cache & request coalescing ---
+
+    @staticmethod
+    def _valuation_key(fund_code, summary=False):
+        return f"fund:valuation:summary:{fund_code}" if summary else f"fund:valuation:{fund_code}"
+
+    def _cache_valuation(self, fund_code, result, summary=False):
+        """Fresh copy for VALUATION_CACHE_SECONDS plus a longer-lived stale copy for stale-while-revalidate."""
+        if not self.redis:
+            return
+        key = self._valuation_key(fund_code, summary)
+        payload = json.dumps(result)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(key, settings.VALUATION_CACHE_SECONDS, payload)
+            pipe.setex(f"{key}:stale", settings.VALUATION_STALE_SECONDS, payload)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Valuation cache write failed ({fund_code}): {e}")
+
+    def _cached_valuations(self, fund_codes, summary=False):
+        """
+        Returns (fresh, stale) dicts keyed by fund code. Summary requests also accept
+        full valuations (a superset); full requests never accept summary entries.
+        """
+        fresh, stale = {}, {}
+        if not self.redis or not fund_codes:
+            return fresh, stale
+        modes = (False, True) if summary else (False,)
+        keys = []
+        for mode in modes:
+            keys += [self._valuation_key(c, mode) for c in fund_codes]
+        try:
+            raw = self.redis.mget(keys + [f"{k}:stale" for k in keys])
+        except Exception as e:
+            logger.warning(f"Valuation cache read failed: {e}")
+            return fresh, stale
+        n = len(fund_codes)
+        for block, target in ((raw[:len(keys)], fresh), (raw[len(keys):], stale)):
+            for i, payload in enumerate(block):
+                code = fund_codes[i % n]
+                if payload and code not in target:
+                    try:
+                        target[code] = json.loads(payload)
+                    except ValueError:
+                        pass
+        return fresh, stale
+
+    def _await_peer_valuations(self, fund_codes, summary):
+        """Poll the cache for valuations another worker holds the lock for; returns what arrived in time."""
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+        pending, results = list(fund_codes), {}
+        while pending and time.monotonic() < deadline:
+            time.sleep(0.1)
+            fresh, _ = self._cached_valuations(pending, summary)
+            results.update(fresh)
+            pending = [c for c in pending if c not in fresh]
+        return results
+
+    def _coalesced_valuation(self, fund_codes, summary, compute):
+        """
+        Single-flight wrapper around `compute(codes) -> {code: result}`: codes already
+        being computed by another thread are waited on, codes locked by another worker
+        are read from the cache once it writes them, and only the rest are computed here.
+        Anything that does not arrive within SINGLE_FLIGHT_WAIT_SECONDS is computed directly.
+        """
+        owned, waiting = self._flight.claim([(c, summary) for c in fund_codes])
+        results = {}
+        if owned:
+            codes = [k[0] for k in owned]
+            try:
+                tokens = self._locks.acquire_many(
+                    [f"summary:{c}" if summary else c for c in codes], settings.SINGLE_FLIGHT_WAIT_SECONDS
+                )
+                mine = [c for c in codes if (f"summary:{c}" if summary else c) in tokens]
+                try:
+                    if mine:
+                        results.update(compute(mine))
+                finally:
+                    self._locks.release_many(tokens)
+                contended = [c for c in codes if c not in results and c not in mine]
+                if contended:
+                    results.update(self._await_peer_valuations(contended, summary))
+                    late = [c for c in contended if c not in results]
+                    if late:
+                        results.update(compute(late))
+            except BaseException as e:
+                self._flight.resolve(owned, {}, e)
+                raise
+            self._flight.resolve(owned, {(c, summary): r for c, r in results.items()})
+
+        if waiting:
+            shared = SingleFlight.wait(waiting, settings.SINGLE_FLIGHT_WAIT_SECONDS)
+            results.update({k[0]: v for k, v in shared.items()})
+            late = [k[0] for k in waiting if k not in shared]
+            if late:
+                results.update(compute(late))
+        return results
+
+    def _revalidate(self, fund_codes, summary, compute):
+        """Refresh stale valuations in the background; at most one refresh per fund at a time."""
+        with self._revalidating_lock:
+            codes = [c for c in fund_codes if (c, summary) not in self._revalidating]
+            self._revalidating.update((c, summary) for c in codes)
+        if not codes:
+            return
+
+        def run():
+            try:
+                self._coalesced_valuation(codes, summary, compute)
+            except Exception as e:
+                logger.error(f"Background revalidation failed: {e}")
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.difference_update((c, summary) for c in codes)
+
+        threading.Thread(target=run, name="valuation-revalidate", daemon=True).start()
+
+    def _batch_compute(self, summary):
+        def compute(codes):
+            return {r.get('fund_code'): r for r in self._compute_batch_valuation(codes, summary)}
+        return compute
+
+    def _realtime_compute(self, codes):
+        return {c: self._compute_realtime_valuation(c) for c in codes}
+
     def calculate_realtime_valuation(self, fund_code):
         """Calculate live estimated NAV growth based on holdings (Source: Market Data)."""
-        # 0. Check Cache (Fund Valuation Result)
-        if self.redis:
-            cached_val = self.redis.get(f"fund:valuation:{fund_code}")
-            if cached_val:
-                logger.info(f"⚡️ Using cached valuation for {fund_code}")
-                return json.loads(cached_val)
-        
+        # 0. Check Cache (Fund Valuation Result); serve the stale copy while a refresh runs
+        fresh, stale = self._cached_valuations([fund_code])
+        if fund_code in fresh:
+            logger.info(f"⚡️ Using cached valuation for {fund_code}")
+            return fresh[fund_code]
+        if fund_code in stale:
+            self._revalidate([fund_code], False, self._realtime_compute)
+            return stale[fund_code]
+        return self._coalesced_valuation([fund_code], False, self._realtime_compute).get(fund_code) \
+            or {"error": "Valuation unavailable"}
+
+    def _compute_realtime_valuation(self, fund_code):
         # --- NEW: Shadow Mapping Logic ---
         # 1. Check if this is a feeder fund with a mapped shadow ETF
         fund_name = self._get_fund_name(fund_code)
@@ -302,71 +655,57 @@ class FundEngine:
             logger.info(f"🕶️ Using {rel_type} for {fund_code}: Parent {parent_code}")
             
             # Fetch parent ETF/Index price (using efficient SecID logic)
-            secid = None
-            if parent_code.startswith(('5', '9', '000', 'sh')): 
-                if parent_code.startswith('sh'): secid = parent_code
-                else: secid = f"sh{parent_code}"
-            elif parent_code.startswith(('sz', 'hk')):
-                secid = parent_code
-            else: 
-                secid = f"sz{parent_code}"
+            secid = parent_secid(parent_code)
             
             try:
-                import requests
-                url = f"http://qt.gtimg.cn/q={secid}"
-                res = requests.get(url, timeout=3)
-                content = res.content.decode('gbk', errors='ignore')
-                
-                if '=' in content:
-                    val_part = content.split('=', 1)[1].strip('"')
-                    parts = val_part.split('~')
-                    if len(parts) > 32:
-                        price = float(parts[3])
-                        pct = float(parts[32])
-                        est_growth = pct * ratio
+                q = self._fetch_quotes([secid]).get(secid)
+                if q:
+                    real_name = q['name']
+                    price = q['price']
+                    pct = q['change_pct']
+                    est_growth = pct * ratio
+                    
+                    # --- Dynamic Auto-Calibration for Shadow/Proxy ---
+                    dynamic_bias = self.db.get_recent_bias(fund_code, days=7)
+                    calibration_note = ""
+                    if abs(dynamic_bias) > 0.001:
+                        est_growth -= dynamic_bias
+                        calibration_note = f" (Auto-Calibrated {(-dynamic_bias):+.2f}%)"
+
+                    # --- FX Compensation for Shadow ---
+                    fx_note = ""
+                    if "QDII" in fund_name or "(QDII)" in fund_name:
+                        currency = "USD/CNY"
+                        if any(k in fund_name for k in ["恒生", "港", "HK", "H股"]):
+                            currency = "HKD/CNY"
+                        elif any(k in fund_name for k in ["日", "东京", "东证"]):
+                            currency = "JPY/CNY"
                         
-                        # --- Dynamic Auto-Calibration for Shadow/Proxy ---
-                        dynamic_bias = self.db.get_recent_bias(fund_code, days=7)
-                        calibration_note = ""
-                        if abs(dynamic_bias) > 0.001:
-                            est_growth -= dynamic_bias
-                            calibration_note = f" (Auto-Calibrated {(-dynamic_bias):+.2f}%)"
-
-                        # --- FX Compensation for Shadow ---
-                        fx_note = ""
-                        if "QDII" in fund_name or "(QDII)" in fund_name:
-                            currency = "USD/CNY"
-                            if any(k in fund_name for k in ["恒生", "港", "HK", "H股"]):
-                                currency = "HKD/CNY"
-                            elif any(k in fund_name for k in ["日", "东京", "东证"]):
-                                currency = "JPY/CNY"
-                            
-                            fx_change = self.db.get_fx_rate_change(currency)
-                            fx_impact = fx_change * 0.9
-                            est_growth += fx_impact
-                            fx_note = f" (FX {currency} {fx_impact:+.2f}%)"
+                        fx_change = self.db.get_fx_rate_change(currency)
+                        fx_impact = fx_change * 0.9
+                        est_growth += fx_impact
+                        fx_note = f" (FX {currency} {fx_impact:+.2f}%)"
 
-                        result = {
-                            "fund_code": fund_code,
-                            "fund_name": fund_name,
-                            "status": "active",
-                            "estimated_growth": round(est_growth, 4),
-                            "total_weight": ratio * 100,
-                            "components": [{
-                                "code": parent_code,
-                                "name": real_name,
-                                "price": price,
-                                "change_pct": pct,
-                                "impact": est_growth,
-                                "weight": ratio * 100
-                            }],
-                            "sector_attribution": {},
-                            "timestamp": format_iso8601(datetime.now()),
-                            "source": f"{rel_type} ({parent_code}){calibration_note}{fx_note}"
-                        }
-                        if self.redis:
-                            self.redis.setex(f"fund:valuation:{fund_code}", 180, json.dumps(result))
-                        return result
+                    result = {
+                        "fund_code": fund_code,
+                        "fund_name": fund_name,
+                        "status": "active",
+                        "estimated_growth": round(est_growth, 4),
+                        "total_weight": ratio * 100,
+                        "components": [{
+                            "code": parent_code,
+                            "name": real_name,
+                            "price": price,
+                            "change_pct": pct,
+                            "impact": est_growth,
+                            "weight": ratio * 100
+                        }],
+                        "sector_attribution": {},
+                        "timestamp": format_iso8601(datetime.now()),
+                        "source": f"{rel_type} ({parent_code}){calibration_note}{fx_note}"
+                    }
+                    self._cache_valuation(fund_code, result)
+                    return result
             except Exception as e:
                 logger.error(f"Shadow/Proxy price fetch failed: {e}")
         
@@ -374,7 +713,7 @@ class FundEngine:
         p_code, ratio = self._identify_index_proxy(fund_code, fund_name)
         if p_code:
             # Re-run valuation with the new relationship
-            return self.calculate_realtime_valuation(fund_code)
+            return self._compute_realtime_valuation(fund_code)
         # --- END Shadow Mapping & Index Proxy ---
 
         # Force disable proxy for reliability with Market Data
@@ -415,12 +754,10 @@ class FundEngine:
             # 2. Identify Markets (A-Share vs HK)
             need_ashare = False
             need_hk = False
-            holding_codes = set()
             
             for h in holdings:
                 code = h.get('stock_code') or h.get('code')
                 if not code: continue
-                holding_codes.add(code)
                 if len(code) == 6 or (len(code) == 5 and code.startswith("0") and not code.startswith("00")): 
                     need_ashare = True
                 elif len(code) == 5:
@@ -428,67 +765,19 @@ class FundEngine:
                 else:
                     need_ashare = True
 
-            # 3. Fetch Market Snapshots (with short caching)
-            def get_market_snapshot(market_type):
-                cache_key = f"market:snapshot:{market_type}"
-                if self.redis:
-                    c = self.redis.get(cache_key)
-                    if c: return pd.read_json(c)
-                
-                if market_type == 'a':
-                    df = ak.stock_zh_a_spot_em()
-                else:
-                    df = ak.stock_hk_spot_em()
-                
-                # Cache for 60s
-                if self.redis and not df.empty:
-                    self.redis.setex(cache_key, 60, df.to_json())
-                return df
-
-            quote_map = {} 
-            
-            # Fetch A-Shares
-            if need_ashare:
+            # 3. Fetch Market Snapshots (indexed by code once per refresh) and join holdings
+            snapshots = []
+            for market_type, needed in (('a', need_ashare), ('hk', need_hk)):
+                if not needed: continue
                 try:
-                    df_a = get_market_snapshot('a')
-                    # Normalize columns
-                    code_col = next((c for c in df_a.columns if '代码' in c), None)
-                    price_col = next((c for c in df_a.columns if '最新价' in c), None)
-                    change_col = next((c for c in df_a.columns if '涨跌幅' in c), None)
-                    
-                    if code_col and price_col and change_col:
-                        for _, row in df_a.iterrows():
-                            c_code = str(row[code_col])
-                            if c_code in holding_codes:
-                                try:
-                                    quote_map[c_code] = {
-                                        'price': float(row[price_col]),
-                                        'change_pct': float(row[change_col])
-                                    }
-                                except: pass
+                    snapshots.append(self._get_market_snapshot(market_type))
                 except Exception as e:
-                    logger.error(f"Failed to fetch A-share snapshot: {e}")
+                    label = "A-share" if market_type == 'a' else "HK-share"
+                    logger.error(f"Failed to fetch {label} snapshot: {e}")
 
-            # Fetch HK-Shares
-            if need_hk:
-                try:
-                    df_hk = get_market_snapshot('hk')
-                    code_col = next((c for c in df_hk.columns if '代码' in c), None)
-                    price_col = next((c for c in df_hk.columns if '最新价' in c), None)
-                    change_col = next((c for c in df_hk.columns if '涨跌幅' in c), None)
-                    
-                    if code_col and price_col and change_col:
-                        for _, row in df_hk.iterrows():
-                            c_code = str(row[code_col])
-                            if c_code in holding_codes:
-                                try:
-                                    quote_map[c_code] = {
-                                        'price': float(row[price_col]),
-                                        'change_pct': float(row[change_col])
-                                    }
-                                except: pass
-                except Exception as e:
-                    logger.error(f"Failed to fetch HK-share snapshot: {e}")
+            holding_codes = [h.get('stock_code') or h.get('code') for h in holdings]
+            prices, pcts, found = join_snapshots(snapshots, [c or "" for c in holding_codes])
+            quote_pos = {c: i for i, c in enumerate(holding_codes) if c}
 
             # 3.5 Check for ETF Feeder Fund Logic
             # If holdings contain very few stocks or weight is low, check if it's an ETF feeder
@@ -525,7 +814,10 @@ class FundEngine:
                 try:
                     # Reuse quote_map logic, but we need to ensure we fetched this ETF
                     # If we missed it in A-share snapshot (unlikely if it's in holdings), fetch it now
-                    etf_quote = quote_map.get(target_etf)
+                    i = quote_pos.get(target_etf)
+                    etf_quote = None
+                    if i is not None and found[i]:
+                        etf_quote = {'price': float(prices[i]), 'change_pct': float(pcts[i])}
                     
                     if not etf_quote:
                          # Try single fetch
@@ -560,76 +852,18 @@ class FundEngine:
                             "source": "ETF Feeder Penetration"
                         }
                          # Save and return immediately
-                        if self.redis:
-                            self.redis.setex(f"fund:valuation:{fund_code}", 180, json.dumps(result))
+                        self._cache_valuation(fund_code, result)
                         return result
                 except Exception as e:
                     logger.error(f"Feeder calc failed: {e}")
 
             # 4. Calculate Valuation & Sector Attribution
-            total_impact = 0.0
-            total_weight = 0.0
-            components = []
-            
-            # Init Sector Map
-            sector_stats = {} 
-            
-            # Bulk fetch industry mapping
-            holding_codes = [h.get('stock_code') or h.get('code') for h in holdings]
             industry_map = self._get_industry_map(holding_codes)
-            
-            for h in holdings:
-                code = h.get('stock_code') or h.get('code')
-                weight = h['weight']
-                name = h.get('stock_name') or h.get('name') or code
-                
-                quote = quote_map.get(code)
-                current_impact = 0.0
-                
-                if quote:
-                    price = quote['price']
-                    pct = quote['change_pct']
-                    impact = pct * (weight / 100.0)
-                    current_impact = impact
-                    
-                    total_impact += impact
-                    total_weight += weight
-                    
-                    components.append({
-                        "code": code,
-                        "name": name,
-                        "price": price,
-                        "change_pct": pct,
-                        "impact": impact,
-                        "weight": weight
-                    })
-                else:
-                    components.append({
-                        "code": code,
-                        "name": name,
-                        "price": 0.0,
-                        "change_pct": 0.0,
-                        "impact": 0.0,
-                        "weight": weight,
-                        "note": "No Quote"
-                    })
-                
-                # Sector Aggregation
-                ind_info = industry_map.get(code, {'l1': "其他", 'l2': "其他"})
-                l1 = ind_info.get('l1') or "其他"
-                l2 = ind_info.get('l2') or "其他"
-                
-                if l1 not in sector_stats:
-                    sector_stats[l1] = {"impact": 0.0, "weight": 0.0, "sub": {}}
-                
-                sector_stats[l1]["impact"] += current_impact
-                sector_stats[l1]["weight"] += weight
-                
-                if l2 not in sector_stats[l1]["sub"]:
-                    sector_stats[l1]["sub"][l2] = {"impact": 0.0, "weight": 0.0}
-                
-                sector_stats[l1]["sub"][l2]["impact"] += current_impact
-                sector_stats[l1]["sub"][l2]["weight"] += weight
+            weights = [h['weight'] for h in holdings]
+            names = [h.get('stock_name') or h.get('name') or c for h, c in zip(holdings, holding_codes)]
+            total_impact, total_weight, components, sector_stats = value_holdings(
+                holding_codes, names, weights, prices, pcts, found, industry_map=industry_map
+            )
 
             # 5. Normalize
             final_est = 0.0
@@ -682,9 +916,8 @@ class FundEngine:
                 self.db.save_fund_valuation(fund_code, final_est, result)
             except: pass
             
-            # Set Cache (180s)
-            if self.redis:
-                self.redis.setex(f"fund:valuation:{fund_code}", 180, json.dumps(result))
+            # Set Cache (fresh + stale copy)
+            self._cache_valuation(fund_code, result)
             
             # --- V1 Production Broadcast ---
             try:
@@ -731,20 +964,25 @@ class FundEngine:
         # Default fallback
         return "R3"
 
-    def _get_confidence_level(self, fund_code, current_weight, fund_meta):
+    def _get_confidence_level(self, fund_code, current_weight, fund_meta, calibration=None):
         """
         Mature Confidence Engine: Calculates a weighted score based on multiple dimensions.
         Accuracy (60%) + Coverage (30%) + Freshness/Type (10%)
         Includes Portfolio Drift Detection (3-day consistency check).
+        calibration: prefetched entry from db.get_calibration_batch (skips the per-fund queries).
         """
         # 1. Accuracy Score (60 points max)
-        perf = self.db.get_fund_performance_metrics(fund_code, days=7)
+        if calibration is None:
+            perf = self.db.get_fund_performance_metrics(fund_code, days=7)
+            recent_history = self.db.get_recent_tracking_statuses(fund_code, limit=3)
+        else:
+            perf = {'avg_mae': calibration.get('avg_mae')}
+            recent_history = calibration.get('recent', [])
         mae = perf['avg_mae']
         acc_score = 0
         reasons = []
         
         # --- NEW: Portfolio Drift Detection ---
-        recent_history = self.db.get_recent_tracking_statuses(fund_code, limit=3)
         is_suspected_rebalance = False
         if len(recent_history) >= 3:
             # If all last 3 statuses are NOT 'S' (Precise)
@@ -812,13 +1050,32 @@ class FundEngine:
             "reasons": reasons
         }
 
-    def calculate_batch_valuation(self, fund_codes: list, summary: bool = False):
+    def calculate_batch_valuation(self, fund_codes: list, summary: bool = False, use_cache: bool = True):
         """
         Calculate valuations for multiple funds in a single batch request using efficient Market API.
         summary: If True, skip components and sector stats for speed.
+        use_cache: If False, always recompute (quote-tick revaluation, snapshots).
+        Cache misses are coalesced across concurrent requests; a stale cached value is
+        served while its refresh runs in the background.
         """
-        import requests
-        
+        if not use_cache:
+            return self._compute_batch_valuation(fund_codes, summary)
+
+        codes = list(dict.fromkeys(fund_codes))
+        found, stale = self._cached_valuations(codes, summary)
+        misses = [c for c in codes if c not in found]
+        if misses:
+            compute = self._batch_compute(summary)
+            refresh = [c for c in misses if c in stale]
+            if refresh:
+                self._revalidate(refresh, summary, compute)
+                found.update({c: stale[c] for c in refresh})
+            blocking = [c for c in misses if c not in stale]
+            if blocking:
+                found.update(self._coalesced_valuation(blocking, summary, compute))
+        return [found[c] for c in fund_codes if c in found]
+
+    def _compute_batch_valuation(self, fund_codes: list, summary: bool = False):
         # 0. Pre-fetch Fund Metadata in Bulk (Avoid serial DB/API calls)
         fund_meta_map = {}
         fund_name_map = {}
@@ -858,39 +1115,18 @@ class FundEngine:
         stock_map = {} # code -> market_id needed
         
         # --- NEW: Batch Relationship Check ---
-        shadow_map = {} # fund_code -> relationship object
-        for f_code in fund_codes:
-            rel = self.db.get_fund_relationship(f_code)
-            if not rel:
-                # 1. Try shadow ETF heuristic
-                p_code = self._identify_shadow_etf(f_code, fund_name_map.get(f_code))
-                if p_code: 
-                    rel = {"parent_code": p_code, "ratio": 0.95, "relation_type": "ETF_FEEDER"}
-                else:
-                    # 2. Try index proxy heuristic
-                    p_code, ratio = self._identify_index_proxy(f_code, fund_name_map.get(f_code))
-                    if p_code:
-                        rel = {"parent_code": p_code, "ratio": ratio, "relation_type": "INDEX_PROXY"}
-            
-            if rel:
-                shadow_map[f_code] = rel
-                # Add parent ETF/Index to stock_map for batch quoting
-                p_code = rel['parent_code']
-                secid = None
-                if p_code.startswith(('5', '9', '000', 'sh')): 
-                    if p_code.startswith('sh'): secid = p_code
-                    else: secid = f"sh{p_code}"
-                elif p_code.startswith(('sz', 'hk')):
-                    secid = p_code
-                else: 
-                    secid = f"sz{p_code}"
-                stock_map[p_code] = secid
-
-        # Collect holdings for NON-shadow funds
+        shadow_map = self._resolve_relationships(fund_codes, fund_name_map) # fund_code -> relationship object
+        for rel in shadow_map.values():
+            # Add parent ETF/Index to stock_map for batch quoting
+            p_code = rel['parent_code']
+            stock_map[p_code] = parent_secid(p_code)
+
+        # Collect holdings for NON-shadow funds (one query for whatever the holdings cache lacks)
+        holdings_map = self._get_holdings_batch([f for f in fund_codes if f not in shadow_map])
         for f_code in fund_codes:
             if f_code in shadow_map: continue
             
-            holdings = self.db.get_fund_holdings(f_code)
+            holdings = holdings_map.get(f_code)
             if not holdings:
                 # Start background update and mark as syncing
                 sync_key = f"syncing:holdings:{f_code}"
@@ -910,20 +1146,7 @@ class FundEngine:
                 if not s_code: continue
                 
                 # Determine SecID for Market API
-                # Logic: sh6xxxx, sz0xxxx/3xxxx, bj8xxxx/4xxxx, hk0xxxx, usXXXX
-                secid = None
-                if s_code.isdigit():
-                    if len(s_code) == 6:
-                        if s_code.startswith('6') or s_code.startswith('9'): secid = f"sh{s_code}"
-                        elif s_code.startswith('0') or s_code.startswith('3'): secid = f"sz{s_code}"
-                        elif s_code.startswith('8') or s_code.startswith('4'): secid = f"bj{s_code}"
-                        else: secid = f"sz{s_code}" # Fallback
-                    elif len(s_code) == 5:
-                        secid = f"hk{s_code}"
-                else:
-                    # Non-numeric codes are treated as US stocks
-                    secid = f"us{s_code}"
-                    
+                secid = stock_secid(s_code)
                 if secid:
                     stock_map[s_code] = secid
 
@@ -940,78 +1163,42 @@ class FundEngine:
                 "error": "No holdings"
             } for f in fund_codes]
 
-        # 2. Batch Fetch Quotes (Market Node)
-        secids_list = list(set(stock_map.values()))
-        chunk_size = 60 # Handle more, but keep safe
-        quotes = {} # code -> {price, change_pct}
-        
-        for i in range(0, len(secids_list), chunk_size):
-            chunk = secids_list[i:i+chunk_size]
-            url = f"http://qt.gtimg.cn/q={','.join(chunk)}"
-            
-            try:
-                # Market Node doesn't need complex headers
-                res = requests.get(url, timeout=3)
-                # Response is GBK
-                content = res.content.decode('gbk', errors='ignore')
-                
-                # Parse: v_sh600519="1~Name~Code~Price~LastClose~Open~...~...~PCT~..."
-                for line in content.split(';'):
-                    line = line.strip()
-                    if not line: continue
-                    
-                    # line: v_sh600519="1~..."
-                    if '=' not in line: continue
-                    
-                    key_part, val_part = line.split('=', 1)
-                    # key_part: v_sh600519 -> code is sh600519 (remove v_)
-                    actual_market_code = key_part.replace('v_', '').strip()
-                    
-                    val_part = val_part.strip('"')
-                    parts = val_part.split('~')
-                    
-                    if len(parts) > 32:
-                        try:
-                            # Price and Percentage
-                            real_name = parts[1]
-                            price = float(parts[3])
-                            pct = float(parts[32])
-                            
-                            # Store by both pure code and market code for maximum compatibility
-                            t_code = parts[2] # e.g. 600519 or NVDA.OQ
-                            quotes[t_code] = {'price': price, 'change_pct': pct, 'name': real_name}
-                            quotes[actual_market_code] = {'price': price, 'change_pct': pct, 'name': real_name}
-                            
-                            # --- US Stock Compatibility ---
-                            # US stocks from Tencent API often have suffixes like .OQ (Nasdaq), .N (NYSE)
-                            # but holdings DB often just stores the base code 'NVDA'
-                            if '.' in t_code and actual_market_code.startswith('us'):
-                                base_us_code = t_code.split('.')[0]
-                                quotes[base_us_code] = {'price': price, 'change_pct': pct, 'name': real_name}
-                            
-                            # General market-prefix removal for fallback (sh600519 -> 600519)
-                            if len(actual_market_code) > 2 and actual_market_code[:2] in ['sh', 'sz', 'hk', 'us']:
-                                base_code = actual_market_code[2:]
-                                if base_code not in quotes:
-                                    quotes[base_code] = {'price': price, 'change_pct': pct, 'name': real_name}
-                        except: 
-                            pass
-            except Exception as e:
-                logger.error(f"Batch quote fetch failed: {e}")
+        # 2. Batch Fetch Quotes (shared quote book; upstream only for secids it lacks)
+        quotes = self._fetch_quotes(stock_map.values()) # code -> Quote (price, change_pct, name)
 
         # 3. Calculate Valuations
         results = []
+        calibration = self.db.get_calibration_batch(fund_codes, days=7) # bias + confidence inputs, one query
         tz_cn = datetime.now().astimezone().replace(tzinfo=None) # simple local time
         
-        # Pre-fetch industry mappings (Skip if summary)
+        # Holdings-based funds are valued together: one sparse mat-vec over the holdings matrix
+        matrix_vals = {}  # f_code -> (estimated growth, covered weight, sector stats)
+        std_codes = [f for f in fund_codes if f not in shadow_map and all_holdings.get(f)]
+        matrix = self._get_holdings_matrix() if std_codes else None
+        if matrix is not None:
+            rows = matrix.fund_rows(std_codes)
+            # Skip rows that are stale against the holdings just read (synced or re-weighted since the last rebuild)
+            hit = np.array([matrix.row_matches(r, all_holdings[f]) for f, r in zip(std_codes, rows)], dtype=bool)
+            if hit.any():
+                sel_codes = [c for c, h in zip(std_codes, hit) if h]
+                sel_rows = rows[hit]
+                pcts, found = matrix.quote_vector_from_map(quotes)
+                growth, covered = matrix.valuate(pcts, found, sel_rows)
+                sectors = [{} for _ in sel_codes]
+                if not summary and self._ensure_sector_index(matrix):
+                    sectors = matrix.sector_attribution(pcts, found, sel_rows)
+                for k, f_code in enumerate(sel_codes):
+                    matrix_vals[f_code] = (float(growth[k]), float(covered[k]), sectors[k])
+
+        # Pre-fetch industry mappings for funds outside the matrix (Skip if summary)
         industry_map = {}
         if not summary:
             all_stock_codes = []
-            for f_code, holdings in all_holdings.items():
-                if holdings:
-                    for h in holdings:
-                        s_code = h.get('stock_code') or h.get('code')
-                        if s_code: all_stock_codes.append(s_code)
+            for f_code in std_codes:
+                if f_code in matrix_vals: continue
+                for h in all_holdings[f_code]:
+                    s_code = h.get('stock_code') or h.get('code')
+                    if s_code: all_stock_codes.append(s_code)
             industry_map = self._get_industry_map(list(set(all_stock_codes)))
 
         for f_code in fund_codes:
@@ -1027,7 +1214,7 @@ class FundEngine:
                     est_growth = q['change_pct'] * ratio
                     
                     # --- Dynamic Auto-Calibration for Shadow/Proxy Batch ---
-                    dynamic_bias = self.db.get_recent_bias(f_code, days=7)
+                    dynamic_bias = calibration.get(f_code, {}).get('bias', 0.0)
                     calibration_note = ""
                     if abs(dynamic_bias) > 0.001:
                         est_growth -= dynamic_bias
@@ -1049,7 +1236,7 @@ class FundEngine:
                         fx_note = f" (FX {currency} {fx_impact:+.2f}%)"
 
                     # Get Confidence & Risk Level
-                    confidence = self._get_confidence_level(f_code, ratio * 100, fund_meta_map.get(f_code, {}))
+                    confidence = self._get_confidence_level(f_code, ratio * 100, fund_meta_map.get(f_code, {}), calibration.get(f_code, {}))
                     risk_level = self._infer_risk_level(fund_meta_map.get(f_code, {}))
 
                     res_obj = {
@@ -1070,8 +1257,7 @@ class FundEngine:
                         "timestamp": format_iso8601(datetime.now()),
                         "source": f"{'Shadow' if rel_type == 'ETF_FEEDER' else 'Proxy'} Batch ({p_code}){calibration_note}{fx_note}"
                     }
-                    if self.redis:
-                        self.redis.setex(f"fund:valuation:{f_code}", 180, json.dumps(res_obj))
+                    self._cache_valuation(f_code, res_obj, summary)
                     results.append(res_obj)
                     continue
 
@@ -1107,65 +1293,33 @@ class FundEngine:
                 })
                 continue
                 
-            total_impact = 0.0
-            total_weight = 0.0
+            in_matrix = f_code in matrix_vals
             components = []
             sector_stats = {}
-            
-            for h in holdings:
-                code = h.get('stock_code') or h.get('code')
-                name = h.get('stock_name') or h.get('name') or code
-                weight = h['weight']
-                
-                q = quotes.get(code)
-                current_impact = 0.0
-                if q:
-                    price = q['price']
-                    pct = q['change_pct']
-                    impact = pct * (weight / 100.0)
-                    current_impact = impact
-                    total_impact += impact
-                    total_weight += weight
-                    
-                    if not summary:
-                        components.append({
-                            "code": code, "name": name, "price": price, 
-                            "change_pct": pct, "impact": impact, "weight": weight
-                        })
-                else:
-                    if not summary:
-                        components.append({
-                            "code": code, "name": name, "price": 0, 
-                            "change_pct": 0, "impact": 0, "weight": weight, "note": "No Quote"
-                        })
-                
-                # Sector Aggregation (Skip if summary)
-                if not summary:
-                    ind_info = industry_map.get(code, {'l1': "其他", 'l2': "其他"})
-                    l1 = ind_info.get('l1') or "其他"
-                    l2 = ind_info.get('l2') or "其他"
-                    
-                    if l1 not in sector_stats:
-                        sector_stats[l1] = {"impact": 0.0, "weight": 0.0, "sub": {}}
-                    
-                    sector_stats[l1]["impact"] += current_impact
-                    sector_stats[l1]["weight"] += weight
-                    
-                    if l2 not in sector_stats[l1]["sub"]:
-                        sector_stats[l1]["sub"][l2] = {"impact": 0.0, "weight": 0.0}
-                    
-                    sector_stats[l1]["sub"][l2]["impact"] += current_impact
-                    sector_stats[l1]["sub"][l2]["weight"] += weight
-            
-            final_est = 0.0
-            if total_weight > 0:
-                final_est = total_impact * (100 / total_weight)
-                
+            if not (summary and in_matrix):
+                codes = [h.get('stock_code') or h.get('code') for h in holdings]
+                names = [h.get('stock_name') or h.get('name') or c for h, c in zip(holdings, codes)]
+                qs = [quotes.get(c) for c in codes]
+                found = np.array([q is not None for q in qs], dtype=bool)
+                prices = np.array([q['price'] if q else 0.0 for q in qs])
+                pcts = np.array([q['change_pct'] if q else 0.0 for q in qs])
+                total_impact, total_weight, components, sector_stats = value_holdings(
+                    codes, names, [h['weight'] for h in holdings], prices, pcts, found,
+                    industry_map=None if (summary or in_matrix) else industry_map,
+                    with_components=not summary
+                )
+                final_est = 0.0
+                if total_weight > 0:
+                    final_est = total_impact * (100 / total_weight)
+
+            if in_matrix:
+                final_est, total_weight, sector_stats = matrix_vals[f_code]
+
             # Get cached name
             fund_name = fund_name_map.get(f_code, f_code)
             
             # --- Dynamic Auto-Calibration ---
-            dynamic_bias = self.db.get_recent_bias(f_code, days=7)
+            dynamic_bias = calibration.get(f_code, {}).get('bias', 0.0)
             calibration_note = ""
             if abs(dynamic_bias) > 0.001:
                 final_est -= dynamic_bias
@@ -1186,7 +1340,7 @@ class FundEngine:
                 fx_note = f" (FX {currency} {fx_impact:+.2f}%)"
 
             # Get Confidence & Risk Level
-            confidence = self._get_confidence_level(f_code, total_weight, fund_meta_map.get(f_code, {}))
+            confidence = self._get_confidence_level(f_code, total_weight, fund_meta_map.get(f_code, {}), calibration.get(f_code, {}))
             risk_level = self._infer_risk_level(fund_meta_map.get(f_code, {}))
 
             res_obj = {
@@ -1204,8 +1358,7 @@ class FundEngine:
             }
             
             # Update cache
-            if self.redis:
-                self.redis.setex(f"fund:valuation:{f_code}", 180, json.dumps(res_obj))
+            self._cache_valuation(f_code, res_obj, summary)
                 
             results.append(res_obj)
             
@@ -1358,7 +1511,7 @@ class FundEngine:
         logger.info(f"📸 Starting 15:00 Valuation Snapshot for {len(codes)} funds...")
         
         # We can use batch valuation for speed
-        valuations = self.calculate_batch_valuation(codes)
+        valuations = self.calculate_batch_valuation(codes, use_cache=False)
         
         trade_date = datetime.now().date()
         
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import defaultdict
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.providers.market.tencent_quotes import stock_secid, parent_secid
+
+
+class ReverseIndex:
+    """
+    Security (Tencent secid) -> watched funds whose valuation depends on it.
+    Funds with a shadow/index-proxy parent are valued off the parent only, so
+    they are indexed under the parent and not under their holdings.
+    """
+
+    def __init__(self, links=()):
+        parents = {}
+        holdings = defaultdict(set)
+        for fund_code, code, kind in links:
+            if not fund_code or not code:
+                continue
+            if kind == 'parent':
+                parents[fund_code] = code
+            else:
+                holdings[fund_code].add(code)
+
+        self._funds = defaultdict(set)
+        for fund_code, code in parents.items():
+            self._funds[parent_secid(code)].add(fund_code)
+        for fund_code, codes in holdings.items():
+            if fund_code in parents:
+                continue
+            for code in codes:
+                secid = stock_secid(code)
+                if secid:
+                    self._funds[secid].add(fund_code)
+        self.fund_count = len(parents.keys() | holdings.keys())
+
+    def affected(self, secids):
+        funds = set()
+        for secid in secids:
+            funds |= self._funds.get(secid, set())
+        return funds
+
+    def __len__(self):
+        return len(self._funds)
+
+
+class IncrementalRevaluer:
+    """
+    QuoteBook listener: on each tick only funds holding a security whose quote
+    changed are revalued, and only results whose estimate moved are republished
+    on `fund_updates`. Quiet funds cost nothing until their constituents move.
+    """
+
+    def __init__(self, engine=None, rebuild_interval=None):
+        self._engine = engine
+        self.rebuild_interval = rebuild_interval if rebuild_interval is not None else settings.REVALUATION_INDEX_REFRESH
+        self.index = None
+        self._built_at = 0.0
+        self._published = {}  # fund_code -> last published estimated_growth
+        self._lock = threading.Lock()
+        self._stats = {"ticks": 0, "changed_secids": 0, "revalued": 0, "published": 0, "unchanged": 0, "last_tick_ms": 0.0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from src.alphasignal.core.fund_engine import get_fund_engine
+            self._engine = get_fund_engine()
+        return self._engine
+
+    def _watchlist_links(self):
+        """Holding links plus each watched fund's parent, resolved exactly as the valuation path does."""
+        db = self.engine.db
+        links = list(db.get_watchlist_links())
+        fund_codes = db.get_watchlist_all_codes()
+        try:
+            names = db.get_fund_names(fund_codes)
+        except Exception as e:
+            logger.warning(f"Fund names unavailable for reverse index: {e}")
+            names = {}
+        relationships = self.engine._resolve_relationships(fund_codes, names)
+        links.extend((f_code, rel['parent_code'], 'parent') for f_code, rel in relationships.items())
+        return links
+
+    def rebuild(self):
+        started = time.perf_counter()
+        self.index = ReverseIndex(self._watchlist_links())
+        self._built_at = time.time()
+        logger.info(f"🔁 Reverse index rebuilt: {len(self.index)} securities -> {self.index.fund_count} funds "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def on_tick(self, quotes, changed):
+        """QuoteBook listener: `changed` are the secids whose price/pct moved since the last poll."""
+        with self._lock:
+            if self.index is None or time.time() - self._built_at > self.rebuild_interval:
+                self.rebuild()
+            self._stats["ticks"] += 1
+            self._stats["changed_secids"] += len(changed)
+            funds = self.index.affected(changed)
+            if not funds:
+                return []
+
+            started = time.perf_counter()
+            results = self.engine.calculate_batch_valuation(sorted(funds), use_cache=False)
+            published = []
+            for res in results:
+                f_code = res.get('fund_code')
+                if 'error' in res or res.get('status') == 'syncing':
+                    continue
+                if self._published.get(f_code) == res['estimated_growth']:
+                    self._stats["unchanged"] += 1
+                    continue
+                self._published[f_code] = res['estimated_growth']
+                published.append(res)
+
+            self._publish(published)
+            self._stats["revalued"] += len(results)
+            self._stats["published"] += len(published)
+            self._stats["last_tick_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return published
+
+    def _publish(self, results):
+        if not results:
+            return
+        from src.alphasignal.infra.stream.broadcaster import hub
+        for res in results:
+            try:
+                hub.publish_sync("fund_updates", res)
+            except Exception as e:
+                logger.warning(f"fund_updates publish failed: {e}")
+                return
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s["indexed_securities"] = len(self.index) if self.index else 0
+        return s
+
+
+_revaluer = None
+_revaluer_lock = threading.Lock()
+
+
+def get_revaluer() -> IncrementalRevaluer:
+    global _revaluer
+    if _revaluer is None:
+        with _revaluer_lock:
+            if _revaluer is None:
+                _revaluer = IncrementalRevaluer()
+    return _revaluer
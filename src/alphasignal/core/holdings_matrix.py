@@ -0,0 +1,148 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.alphasignal.core.market_snapshot import UNKNOWN_SECTOR
+
+
+class HoldingsMatrix:
+    """
+    Sparse funds × securities weight matrix built from `fund_holdings`.
+
+    Estimated growth for every fund is one sparse mat-vec against the quote vector:
+        impact  = W @ (pct * found) / 100
+        covered = W @ found                      (weight of holdings that have a quote)
+        growth  = impact * 100 / covered
+    L1/L2 sector attribution is a second product against a securities × sector
+    indicator matrix. Weights are stored in percent, as in `fund_holdings.weight`.
+    """
+
+    def __init__(self, fund_codes, sec_codes, weights, fingerprint=None):
+        self.fund_codes = list(fund_codes)
+        self.sec_codes = np.asarray(sec_codes, dtype=object)
+        self.weights = sparse.csr_matrix(weights, dtype=np.float64)
+        self.fingerprint = fingerprint
+        self.built_at = time.time()
+        self._fund_index = pd.Index(self.fund_codes)
+        self._sec_index = pd.Index(self.sec_codes)
+        self._sector_index = None  # (l1 indicator, pair indicator, l1 labels, pair labels)
+
+    @classmethod
+    def from_rows(cls, rows, fingerprint=None):
+        """Build from (fund_code, stock_code, weight) rows."""
+        rows = [r for r in rows if r[0] and r[1]]
+        if not rows:
+            return cls([], [], sparse.csr_matrix((0, 0)), fingerprint)
+        funds = np.array([r[0] for r in rows], dtype=object)
+        secs = np.array([r[1] for r in rows], dtype=object)
+        vals = np.array([float(r[2] or 0.0) for r in rows])
+        f_idx, fund_codes = pd.factorize(funds)
+        s_idx, sec_codes = pd.factorize(secs)
+        w = sparse.coo_matrix((vals, (f_idx, s_idx)), shape=(len(fund_codes), len(sec_codes))).tocsr()
+        return cls(list(fund_codes), list(sec_codes), w, fingerprint)
+
+    @property
+    def shape(self):
+        return self.weights.shape
+
+    def __contains__(self, fund_code):
+        return fund_code in self._fund_index
+
+    def fund_rows(self, fund_codes):
+        """Row index per fund code (-1 when the fund is not in the matrix)."""
+        return self._fund_index.get_indexer(list(fund_codes))
+
+    def row_matches(self, row, holdings):
+        """True if matrix row `row` holds exactly these holdings (same securities and weights)."""
+        if row < 0:
+            return False
+        start, end = self.weights.indptr[row], self.weights.indptr[row + 1]
+        current = dict(zip(self.sec_codes[self.weights.indices[start:end]], self.weights.data[start:end]))
+        expected = {}
+        for h in holdings:
+            code = h.get('stock_code') or h.get('code')
+            if code:
+                expected[code] = expected.get(code, 0.0) + float(h.get('weight') or 0.0)
+        return current.keys() == expected.keys() and all(
+            abs(current[c] - w) < 1e-9 for c, w in expected.items())
+
+    # --- Quote vectors (aligned with sec_codes) ---
+
+    def quote_vector_from_map(self, quotes):
+        """
+        quotes: {code: {'change_pct': ...}} as built by the batch quote fetcher, or a
+        QuoteIndex (matched on any alias). Scattered through the code -> column index,
+        so the cost scales with the quotes given, not the securities universe.
+        """
+        pcts = np.zeros(len(self.sec_codes))
+        found = np.zeros(len(self.sec_codes), dtype=bool)
+        pairs = list(quotes.items())
+        if not pairs:
+            return pcts, found
+        cols = self._sec_index.get_indexer([code for code, _ in pairs])
+        hit = np.flatnonzero(cols >= 0)
+        pcts[cols[hit]] = [pairs[i][1]['change_pct'] for i in hit]
+        found[cols[hit]] = True
+        return pcts, found
+
+    # --- Products ---
+
+    def _select(self, rows):
+        return self.weights if rows is None else self.weights[np.asarray(rows)]
+
+    def valuate(self, pcts, found, rows=None):
+        """Returns (growth, covered_weight) arrays for `rows` (all funds when None)."""
+        w = self._select(rows)
+        eff = np.where(found, pcts, 0.0)
+        impact = w @ eff / 100.0
+        covered = w @ found.astype(np.float64)
+        growth = np.divide(impact * 100.0, covered, out=np.zeros_like(impact), where=covered > 0)
+        return growth, covered
+
+    def build_sector_index(self, industry_map):
+        """Securities × sector indicator matrices from {code: {'l1', 'l2'}}."""
+        infos = [industry_map.get(c) or {} for c in self.sec_codes]
+        l1 = np.array([i.get('l1') or UNKNOWN_SECTOR for i in infos], dtype=object)
+        l2 = np.array([i.get('l2') or UNKNOWN_SECTOR for i in infos], dtype=object)
+        n = len(self.sec_codes)
+        l1_codes, l1_names = pd.factorize(l1)
+        l2_codes, l2_names = pd.factorize(l2)
+        pair_codes, pair_keys = pd.factorize(l1_codes * max(len(l2_names), 1) + l2_codes)
+        ones = np.ones(n)
+        l1_ind = sparse.csr_matrix((ones, (np.arange(n), l1_codes)), shape=(n, len(l1_names)))
+        pair_ind = sparse.csr_matrix((ones, (np.arange(n), pair_codes)), shape=(n, len(pair_keys)))
+        pair_labels = [(l1_names[k // len(l2_names)], l2_names[k % len(l2_names)]) for k in pair_keys]
+        self._sector_index = (l1_ind, pair_ind, list(l1_names), pair_labels)
+
+    @property
+    def has_sector_index(self):
+        return self._sector_index is not None
+
+    def sector_attribution(self, pcts, found, rows=None):
+        """
+        Per-fund {l1: {"impact", "weight", "sub": {l2: {...}}}} for `rows`.
+        Sector weight counts every holding; impact only quoted ones.
+        """
+        if self._sector_index is None:
+            raise RuntimeError("build_sector_index() must be called first")
+        l1_ind, pair_ind, l1_labels, pair_labels = self._sector_index
+        w = self._select(rows)
+        eff = np.where(found, pcts, 0.0) / 100.0
+        wi = w @ sparse.diags(eff)
+
+        l1_w = (w @ l1_ind).toarray()
+        l1_i = (wi @ l1_ind).toarray()
+        pair_w = (w @ pair_ind).toarray()
+        pair_i = (wi @ pair_ind).toarray()
+
+        out = []
+        for r in range(w.shape[0]):
+            stats = {}
+            for j in np.flatnonzero(l1_w[r]):
+                stats[l1_labels[j]] = {"impact": float(l1_i[r, j]), "weight": float(l1_w[r, j]), "sub": {}}
+            for j in np.flatnonzero(pair_w[r]):
+                a, b = pair_labels[j]
+                stats[a]["sub"][b] = {"impact": float(pair_i[r, j]), "weight": float(pair_w[r, j])}
+            out.append(stats)
+        return out
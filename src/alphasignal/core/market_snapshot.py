@@ -0,0 +1,194 @@
+import json
+import struct
+import time
+import numpy as np
+import pandas as pd
+
+UNKNOWN_SECTOR = "其他"
+
+# Binary cache layout: MAGIC | u32 header_len | JSON header | codes | names | float64 prices | float64 pcts
+_MAGIC = b"MSNP1"
+_SEP = "\n"
+
+
+class MarketSnapshot:
+    """
+    Columnar full-market quote snapshot (A-share or HK spot list).
+    The code -> row hash index is built once per refresh, so joining a fund's
+    holdings against 5,000+ quotes is a single vectorized lookup instead of iterrows().
+    """
+    __slots__ = ("market", "codes", "names", "prices", "pcts", "built_at", "version", "_index")
+
+    def __init__(self, market, codes, prices, pcts, names=None, built_at=None, version=None):
+        codes = np.asarray(codes, dtype=object)
+        # Keep the last row for duplicated codes so the index stays unique
+        keep = ~pd.Index(codes).duplicated(keep="last")
+        self.market = market
+        self.codes = codes[keep]
+        self.prices = np.asarray(prices, dtype=np.float64)[keep]
+        self.pcts = np.asarray(pcts, dtype=np.float64)[keep]
+        self.names = np.asarray(names, dtype=object)[keep] if names is not None else None
+        self.built_at = built_at if built_at is not None else time.time()
+        self.version = version if version is not None else str(int(self.built_at * 1000))
+        self._index = pd.Index(self.codes)
+
+    @classmethod
+    def from_frame(cls, market, df):
+        """Build from an akshare spot DataFrame ('代码' / '名称' / '最新价' / '涨跌幅' columns)."""
+        code_col = next((c for c in df.columns if '代码' in c), None)
+        price_col = next((c for c in df.columns if '最新价' in c), None)
+        change_col = next((c for c in df.columns if '涨跌幅' in c), None)
+        name_col = next((c for c in df.columns if '名称' in c), None)
+        if not (code_col and price_col and change_col):
+            raise ValueError(f"Unexpected snapshot columns for market '{market}': {list(df.columns)}")
+
+        return cls(
+            market,
+            df[code_col].astype(str).to_numpy(dtype=object),
+            pd.to_numeric(df[price_col], errors='coerce').to_numpy(dtype=np.float64),
+            pd.to_numeric(df[change_col], errors='coerce').to_numpy(dtype=np.float64),
+            names=df[name_col].astype(str).to_numpy(dtype=object) if name_col else None,
+        )
+
+    def __len__(self):
+        return len(self.codes)
+
+    def to_bytes(self):
+        """Compact columnar encoding for Redis (≈20 bytes/row vs. several hundred for df.to_json())."""
+        codes = _SEP.join(self.codes).encode("utf-8")
+        names = _SEP.join(self.names).encode("utf-8") if self.names is not None else b""
+        header = json.dumps({
+            "market": self.market, "n": len(self.codes), "built_at": self.built_at,
+            "version": self.version, "codes_len": len(codes), "names_len": len(names),
+            "has_names": self.names is not None,
+        }).encode("utf-8")
+        return b"".join([
+            _MAGIC, struct.pack("<I", len(header)), header, codes, names,
+            self.prices.astype("<f8").tobytes(), self.pcts.astype("<f8").tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Decode a to_bytes() payload; raises ValueError on foreign/corrupt data."""
+        if not blob or not blob.startswith(_MAGIC):
+            raise ValueError("not a MarketSnapshot payload")
+        off = len(_MAGIC)
+        (header_len,) = struct.unpack_from("<I", blob, off)
+        off += 4
+        meta = json.loads(blob[off:off + header_len])
+        off += header_len
+        n = meta["n"]
+        codes = blob[off:off + meta["codes_len"]].decode("utf-8").split(_SEP) if n else []
+        off += meta["codes_len"]
+        names = None
+        if meta["has_names"]:
+            names = blob[off:off + meta["names_len"]].decode("utf-8").split(_SEP) if n else []
+        off += meta["names_len"]
+        prices = np.frombuffer(blob, dtype="<f8", count=n, offset=off)
+        pcts = np.frombuffer(blob, dtype="<f8", count=n, offset=off + 8 * n)
+        if len(codes) != n:
+            raise ValueError("corrupt MarketSnapshot payload")
+        return cls(meta["market"], codes, prices, pcts, names=names,
+                   built_at=meta["built_at"], version=meta["version"])
+
+    def lookup(self, codes):
+        """
+        Vectorized join of `codes` against the snapshot.
+        Returns (prices, pcts, found) arrays aligned with `codes`; suspended
+        stocks (NaN price/change) count as not found.
+        """
+        pos = self._index.get_indexer(codes)
+        found = pos >= 0
+        prices = np.full(len(pos), np.nan)
+        pcts = np.full(len(pos), np.nan)
+        prices[found] = self.prices[pos[found]]
+        pcts[found] = self.pcts[pos[found]]
+        found &= np.isfinite(prices) & np.isfinite(pcts)
+        return prices, pcts, found
+
+    def get(self, code):
+        """Single-code lookup: {'price', 'change_pct'} or None."""
+        prices, pcts, found = self.lookup([code])
+        if not found[0]:
+            return None
+        return {'price': float(prices[0]), 'change_pct': float(pcts[0])}
+
+
+def join_snapshots(snapshots, codes):
+    """Look `codes` up across several snapshots; later snapshots win on overlap (A-share, then HK)."""
+    n = len(codes)
+    prices = np.full(n, np.nan)
+    pcts = np.full(n, np.nan)
+    found = np.zeros(n, dtype=bool)
+    for snap in snapshots:
+        p, c, f = snap.lookup(codes)
+        prices = np.where(f, p, prices)
+        pcts = np.where(f, c, pcts)
+        found |= f
+    return prices, pcts, found
+
+
+def aggregate_sectors(l1, l2, impacts, weights):
+    """
+    L1/L2 sector attribution in array form.
+    Returns {l1: {"impact", "weight", "sub": {l2: {"impact", "weight"}}}} in first-seen order.
+    """
+    if len(l1) == 0:
+        return {}
+    impacts = np.asarray(impacts, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    l1_codes, l1_names = pd.factorize(np.asarray(l1, dtype=object))
+    l2_codes, l2_names = pd.factorize(np.asarray(l2, dtype=object))
+    n1, n2 = len(l1_names), len(l2_names)
+
+    l1_impact = np.bincount(l1_codes, weights=impacts, minlength=n1)
+    l1_weight = np.bincount(l1_codes, weights=weights, minlength=n1)
+    pair_codes, pair_keys = pd.factorize(l1_codes * n2 + l2_codes)
+    pair_impact = np.bincount(pair_codes, weights=impacts, minlength=len(pair_keys))
+    pair_weight = np.bincount(pair_codes, weights=weights, minlength=len(pair_keys))
+
+    stats = {
+        l1_names[i]: {"impact": float(l1_impact[i]), "weight": float(l1_weight[i]), "sub": {}}
+        for i in range(n1)
+    }
+    for j, key in enumerate(pair_keys):
+        i, k = divmod(int(key), n2)
+        stats[l1_names[i]]["sub"][l2_names[k]] = {"impact": float(pair_impact[j]), "weight": float(pair_weight[j])}
+    return stats
+
+
+def value_holdings(codes, names, weights, prices, pcts, found, industry_map=None, with_components=True):
+    """
+    Weighted-impact valuation of one fund's holdings in array form.
+    Holdings without a quote keep their weight in the sector breakdown but add
+    no impact, and are excluded from total_weight (used for normalization).
+
+    Returns (total_impact, total_weight, components, sector_stats).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    impacts = np.where(found, pcts * weights / 100.0, 0.0)
+    total_impact = float(impacts.sum())
+    total_weight = float(weights[found].sum())
+
+    components = []
+    if with_components:
+        for i, code in enumerate(codes):
+            if found[i]:
+                components.append({
+                    "code": code, "name": names[i], "price": float(prices[i]),
+                    "change_pct": float(pcts[i]), "impact": float(impacts[i]), "weight": float(weights[i])
+                })
+            else:
+                components.append({
+                    "code": code, "name": names[i], "price": 0.0,
+                    "change_pct": 0.0, "impact": 0.0, "weight": float(weights[i]), "note": "No Quote"
+                })
+
+    sector_stats = {}
+    if industry_map is not None:
+        infos = [industry_map.get(c) or {} for c in codes]
+        l1 = [info.get('l1') or UNKNOWN_SECTOR for info in infos]
+        l2 = [info.get('l2') or UNKNOWN_SECTOR for info in infos]
+        sector_stats = aggregate_sectors(l1, l2, impacts, weights)
+
+    return total_impact, total_weight, components, sector_stats
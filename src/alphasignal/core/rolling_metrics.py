@@ -0,0 +1,234 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import redis
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+
+ITEMS = "items"     # every intelligence row, by news timestamp
+URGENT = "urgent"   # rows with urgency_score >= 5, by news timestamp
+
+
+class RollingCounters:
+    """
+    Time-bucketed intelligence counters behind the clustering / exhaustion scores.
+
+    Counts live in one Redis hash per series and hour (`metrics:counters:{series}:{hour}`,
+    field = bucket start epoch), each expiring `retention` after its hour ends, so
+    every worker sees the same numbers and nothing outlives the window. A lookup
+    only touches the hours it spans: each process keeps a local copy of those
+    hours, resynced every `sync_interval` seconds, plus its own increments.
+    Counters are only trusted once `reconcile()` has rebuilt them from the table
+    (the READY_KEY marker, itself expiring after `retention`); until then, while a
+    rebuild is in progress, and for timestamps outside the retained window,
+    callers fall back to SQL.
+    """
+
+    KEY = "metrics:counters:{}:{}"
+    READY_KEY = "metrics:counters:ready"
+    RECONCILE_LOCK = "metrics:counters:reconciling"
+    HOUR = 3600
+
+    def __init__(self, redis_client=None, bucket_seconds=60, retention_hours=None, sync_interval=None):
+        if redis_client is None:
+            try:
+                redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            except Exception as e:
+                logger.warning(f"RollingCounters Redis unavailable: {e}")
+        self.redis = redis_client
+        self.bucket = bucket_seconds
+        self.retention = (retention_hours if retention_hours is not None else settings.METRICS_COUNTER_RETENTION_HOURS) * 3600
+        self.sync_interval = sync_interval if sync_interval is not None else settings.METRICS_COUNTER_SYNC_SECONDS
+        self._lock = threading.Lock()
+        self._local = {ITEMS: {}, URGENT: {}}   # series -> {hour: {bucket: count}}
+        self._hour_synced = {}                  # (series, hour) -> last sync time
+        self._ready = False
+        self._ready_synced = 0.0
+
+    # --- Buckets ---
+
+    def _bucket(self, dt):
+        ts = dt.timestamp() if isinstance(dt, datetime) else float(dt)
+        return int(ts // self.bucket) * self.bucket
+
+    def _hour(self, bucket):
+        return bucket - bucket % self.HOUR
+
+    def _key(self, series, hour):
+        return self.KEY.format(series, hour)
+
+    def _expire_at(self, hour):
+        return int(hour + self.HOUR + self.retention)
+
+    def covers(self, start, end=None):
+        """Whether [start, end] lies inside the retained window."""
+        horizon = time.time() - self.retention + self.bucket
+        return start.timestamp() >= horizon and (end is None or end.timestamp() >= horizon)
+
+    # --- Sync ---
+
+    def _sync_hours(self, series, hours, force=False):
+        """Refresh the local copy of `hours` of `series` that are older than sync_interval (under the lock)."""
+        now = time.time()
+        stale = [h for h in hours if force or now - self._hour_synced.get((series, h), 0.0) >= self.sync_interval]
+        if not stale:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for h in stale:
+                pipe.hgetall(self._key(series, h))
+            results = pipe.execute()
+        except Exception as e:
+            logger.warning(f"RollingCounters sync failed: {e}")
+            self._ready = False
+            return
+        local = self._local[series]
+        for h, counts in zip(stale, results):
+            local[h] = {int(k): int(v) for k, v in counts.items()}
+            self._hour_synced[(series, h)] = now
+        # Drop hours that have left the window
+        horizon = self._hour(self._bucket(now - self.retention)) - self.HOUR
+        for h in [h for h in local if h < horizon]:
+            del local[h]
+            self._hour_synced.pop((series, h), None)
+
+    @property
+    def ready(self):
+        if self.redis is None:
+            return False
+        with self._lock:
+            if time.time() - self._ready_synced >= self.sync_interval:
+                try:
+                    self._ready = bool(self.redis.exists(self.READY_KEY))
+                except Exception as e:
+                    logger.warning(f"RollingCounters sync failed: {e}")
+                    self._ready = False
+                self._ready_synced = time.time()
+            return self._ready
+
+    # --- Updates ---
+
+    def record(self, series, times, delta=1):
+        """Add `delta` to the bucket of every timestamp in `times` (old timestamps are ignored)."""
+        if self.redis is None:
+            return
+        horizon = time.time() - self.retention
+        buckets = {}
+        for dt in times:
+            b = self._bucket(dt)
+            if b >= horizon:
+                buckets[b] = buckets.get(b, 0) + delta
+        if not buckets:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for b, n in buckets.items():
+                pipe.hincrby(self._key(series, self._hour(b)), b, n)
+            for h in {self._hour(b) for b in buckets}:
+                pipe.expireat(self._key(series, h), self._expire_at(h))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"RollingCounters record failed: {e}")
+            return
+        with self._lock:
+            local = self._local[series]
+            for b, n in buckets.items():
+                counts = local.setdefault(self._hour(b), {})
+                counts[b] = counts.get(b, 0) + n
+
+    # --- Reads ---
+
+    def count(self, series, start, end):
+        """Items of `series` with timestamp in [start, end], at bucket resolution."""
+        first, last = self._bucket(start), self._bucket(end)
+        hours = range(self._hour(first), self._hour(last) + 1, self.HOUR)
+        with self._lock:
+            self._sync_hours(series, hours)
+            local = self._local[series]
+            return sum(local.get(self._hour(b), {}).get(b, 0) for b in range(first, last + 1, self.bucket))
+
+    def metrics(self, dt):
+        """(clustering_score, exhaustion_score) as get_advanced_metrics defines them."""
+        hour = timedelta(hours=1)
+        return (
+            self.count(ITEMS, dt - hour, dt + hour),
+            float(self.count(URGENT, dt - timedelta(hours=24), dt)),
+        )
+
+    # --- Reconciliation ---
+
+    def reconcile(self, rows):
+        """
+        Replace the counters with authoritative per-bucket counts.
+        rows: iterable of (bucket start datetime, item count, urgent count).
+        Every hour is built under a temporary key and RENAMEd over the live one in a
+        single transaction, so readers never see a half-built state.
+        """
+        if self.redis is None:
+            return False
+        rebuilt = {ITEMS: {}, URGENT: {}}
+        for bucket_start, n_items, n_urgent in rows:
+            b = self._bucket(bucket_start)
+            for series, n in ((ITEMS, n_items), (URGENT, n_urgent)):
+                if n:
+                    counts = rebuilt[series].setdefault(self._hour(b), {})
+                    counts[b] = counts.get(b, 0) + int(n)
+
+        now = time.time()
+        first = self._hour(self._bucket(now - self.retention))
+        last = self._hour(self._bucket(now)) + self.HOUR
+        token = uuid.uuid4().hex
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for series, hours in rebuilt.items():
+                for h in range(first, max(last, max(hours, default=last)) + 1, self.HOUR):
+                    key = self._key(series, h)
+                    counts = hours.get(h)
+                    if counts:
+                        tmp = f"{key}:rebuild:{token}"
+                        pipe.hset(tmp, mapping=counts)
+                        pipe.expireat(tmp, self._expire_at(h))
+                        pipe.rename(tmp, key)
+                    else:
+                        pipe.delete(key)
+            pipe.set(self.READY_KEY, datetime.now(timezone.utc).isoformat(), ex=self.retention)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"RollingCounters reconcile failed: {e}")
+            return False
+        with self._lock:
+            self._local = {ITEMS: {}, URGENT: {}}
+            self._hour_synced.clear()
+            self._ready, self._ready_synced = True, time.time()
+        return True
+
+    def claim_reconcile(self, ttl=300):
+        """
+        Only one worker rebuilds at a time; returns False if another one is already on it.
+        The winner clears READY_KEY so every worker falls back to SQL until the rebuild lands.
+        """
+        if self.redis is None:
+            return False
+        try:
+            if not self.redis.set(self.RECONCILE_LOCK, "1", nx=True, ex=ttl):
+                return False
+            self.redis.delete(self.READY_KEY)
+            return True
+        except Exception:
+            return False
+
+
+_counters = None
+_counters_lock = threading.Lock()
+
+
+def get_rolling_counters() -> RollingCounters:
+    global _counters
+    if _counters is None:
+        with _counters_lock:
+            if _counters is None:
+                _counters = RollingCounters()
+    return _counters
@@ -0,0 +1,116 @@
+import time
+from collections import deque
+from itertools import combinations
+
+
+class SimhashIndex:
+    """
+    Multi-index (permuted-table) lookup over 64-bit SimHash fingerprints.
+
+    The fingerprint is cut into k + r blocks. Two fingerprints within Hamming
+    distance k differ in at most k blocks, so they agree exactly on at least r of
+    them (pigeonhole); one table is kept per r-block combination, keyed by those
+    blocks' bits. A query only verifies the entries sharing a key with it in some
+    table, instead of the whole history. With k=6, r=2 that is 28 tables keyed on
+    16 bits, i.e. a handful of candidates per table even at 1M entries.
+
+    Entries older than `window_seconds` are evicted as new ones arrive (and on
+    query), so the index only holds the dedupe window.
+    """
+
+    def __init__(self, k=6, r=2, bits=64, window_seconds=None):
+        self.k = k
+        self.bits = bits
+        self.window = window_seconds
+        n_blocks = k + r
+        # Block b covers [start, start + width); widths differ by at most one bit
+        blocks, start = [], 0
+        for b in range(n_blocks):
+            width = bits // n_blocks + (1 if b < bits % n_blocks else 0)
+            blocks.append((start, (1 << width) - 1, width))
+            start += width
+        self._tables = [(combo, {}) for combo in combinations(blocks, r)]
+        self._entries = {}       # entry id -> (fingerprint, timestamp, payload)
+        self._order = deque()    # (timestamp, entry id), insertion order
+        self._next_id = 0
+
+    @staticmethod
+    def _key(fp, combo):
+        key = 0
+        for shift, mask, width in combo:
+            key = (key << width) | ((fp >> shift) & mask)
+        return key
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, fp, timestamp=None, payload=None):
+        """Index fingerprint `fp` (an int); returns its entry id."""
+        ts = time.time() if timestamp is None else timestamp
+        self.evict(ts)
+        entry = self._next_id
+        self._next_id += 1
+        self._entries[entry] = (fp, ts, payload)
+        self._order.append((ts, entry))
+        for combo, table in self._tables:
+            table.setdefault(self._key(fp, combo), []).append(entry)
+        return entry
+
+    def remove(self, entry):
+        item = self._entries.pop(entry, None)
+        if item is None:
+            return
+        fp = item[0]
+        for combo, table in self._tables:
+            key = self._key(fp, combo)
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.remove(entry)
+                if not bucket:
+                    del table[key]
+
+    def evict(self, now=None):
+        """Drop entries older than the window (relative to `now`)."""
+        if self.window is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.window
+        evicted = 0
+        while self._order and self._order[0][0] < cutoff:
+            _, entry = self._order.popleft()
+            if entry in self._entries:
+                self.remove(entry)
+                evicted += 1
+        return evicted
+
+    def query(self, fp, k=None, limit=None):
+        """Entries within Hamming distance k of `fp`: [(distance, fingerprint, payload)], closest first."""
+        k = self.k if k is None else min(k, self.k)
+        self.evict()
+        seen, matches = set(), []
+        for combo, table in self._tables:
+            for entry in table.get(self._key(fp, combo), ()):
+                if entry in seen:
+                    continue
+                seen.add(entry)
+                other, _, payload = self._entries[entry]
+                distance = (fp ^ other).bit_count()
+                if distance <= k:
+                    matches.append((distance, other, payload))
+        matches.sort(key=lambda m: m[0])
+        return matches[:limit] if limit else matches
+
+    def contains_near(self, fp, k=None):
+        """True as soon as one entry within distance k is found."""
+        k = self.k if k is None else min(k, self.k)
+        self.evict()
+        for combo, table in self._tables:
+            for entry in table.get(self._key(fp, combo), ()):
+                if (fp ^ self._entries[entry][0]).bit_count() <= k:
+                    return True
+        return False
+
+    def clear(self):
+        for _, table in self._tables:
+            table.clear()
+        self._entries.clear()
+        self._order.clear()
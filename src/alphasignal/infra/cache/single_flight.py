@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+
+from src.alphasignal.core.logger import logger
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: concurrent callers for the same key share
+    one in-flight computation instead of each running it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def claim(self, keys):
+        """
+        Batch form of do(): returns (owned, waiting). The caller must compute the
+        owned keys and resolve() them; waiting keys are already in flight elsewhere.
+        """
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    owned[key] = self._calls[key] = _Call()
+                else:
+                    waiting[key] = call
+                    self.coalesced += 1
+        return owned, waiting
+
+    def resolve(self, owned, results, error=None):
+        """Publish results for claimed keys (missing keys resolve to None) and release them."""
+        with self._lock:
+            for key in owned:
+                self._calls.pop(key, None)
+        for key, call in owned.items():
+            call.result = results.get(key)
+            call.error = error
+            call.event.set()
+
+    @staticmethod
+    def wait(waiting, timeout):
+        """Collect results of calls claimed by other threads; keys that fail or time out are omitted."""
+        deadline = time.monotonic() + timeout
+        results = {}
+        for key, call in waiting.items():
+            if call.event.wait(max(0.0, deadline - time.monotonic())) and call.error is None and call.result is not None:
+                results[key] = call.result
+        return results
+
+
+class RedisLock:
+    """Short-lived cross-process lock (SET NX EX + compare-and-delete release)."""
+
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, redis_client, prefix="lock:"):
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def acquire(self, key, ttl):
+        """Returns a token when acquired, None when held elsewhere. Fails open (token) if Redis is down."""
+        return self.acquire_many([key], ttl).get(key)
+
+    def acquire_many(self, keys, ttl):
+        """Try every key in one round trip; returns {key: token} for the ones acquired."""
+        tokens = {key: uuid.uuid4().hex for key in keys}
+        if self.redis is None or not tokens:
+            return tokens
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, token in tokens.items():
+                pipe.set(self.prefix + key, token, nx=True, ex=max(1, int(ttl)))
+            acquired = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis lock unavailable: {e}")
+            return tokens
+        return {key: token for (key, token), ok in zip(tokens.items(), acquired) if ok}
+
+    def release(self, key, token):
+        self.release_many({key: token})
+
+    def release_many(self, tokens):
+        if self.redis is None or not tokens:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, token in tokens.items():
+                pipe.eval(self._RELEASE, 1, self.prefix + key, token)
+            pipe.execute()
+        except Exception:
+            pass
@@ -0,0 +1,345 @@
+import os
+import sys
+import time
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+
+
+# Helper frames skipped when recording where a connection was checked out
+_WRAPPER_FRAMES = {"get_connection", "_get_conn", "__enter__"}
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a raw psycopg2 connection checked out from PostgresPool.
+    Behaves like the raw connection, except close() hands it back to the pool,
+    so legacy `conn = db.get_connection(); ...; conn.close()` call sites keep working.
+    """
+    __slots__ = ("_raw", "_pool", "__weakref__")
+
+    def __init__(self, raw, pool):
+        self._raw = raw
+        self._pool = pool
+
+    def __getattr__(self, name):
+        raw = self._raw
+        if raw is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(raw, name)
+
+    @property
+    def closed(self):
+        return 1 if self._raw is None else self._raw.closed
+
+    def close(self):
+        """Return the connection to the pool (idempotent)."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(self, raw)
+
+    def discard(self):
+        """Close the physical connection instead of recycling it (e.g. after a protocol error)."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(self, raw, discard=True)
+
+    def __enter__(self):
+        # Same semantics as psycopg2: the block is a transaction, not a connection scope.
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+
+class PostgresPool:
+    """
+    Process-wide, thread-safe PostgreSQL connection pool.
+
+    - Sizing: at most `max_size` connections are checked out at once, `min_size`
+      idle connections are kept warm, callers block up to `timeout` seconds.
+    - Health checks: idle connections older than `health_check_interval` are pinged
+      before reuse; broken or expired (`max_lifetime`) connections are replaced.
+    - Checkout timing: wait time is tracked and slow checkouts are logged.
+    - Leak detection: connections held longer than `leak_threshold` are reported,
+      and connections dropped without close() are reclaimed when garbage collected.
+    """
+
+    SLOW_CHECKOUT_SECONDS = 0.5
+
+    def __init__(self, dsn_kwargs=None, min_size=1, max_size=20, timeout=10.0,
+                 health_check_interval=30.0, max_lifetime=1800.0, leak_threshold=60.0,
+                 connect=None):
+        self.dsn_kwargs = dsn_kwargs or {}
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+        self.leak_threshold = leak_threshold
+        self._connect_fn = connect or psycopg2.connect
+
+        self._lock = threading.RLock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle = deque()   # (raw, created_at, last_used)
+        self._in_use = {}      # id(proxy) -> [weakref, raw, created_at, checkout_at, site, reported]
+        self._pid = os.getpid()
+        self._closed = False
+        self._stats = {
+            "connects": 0, "checkouts": 0, "timeouts": 0, "discarded": 0,
+            "leaks_reclaimed": 0, "wait_total": 0.0, "wait_max": 0.0,
+        }
+
+    # --- Public API ---
+
+    def getconn(self, timeout=None):
+        """Check out a connection. Call .close() on the result to return it."""
+        self._check_fork()
+        if self._closed:
+            raise PoolError("connection pool is closed")
+
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            self.report_leaks()
+            raise PoolTimeout(f"no PostgreSQL connection available within {timeout}s (max_size={self.max_size})")
+
+        try:
+            raw, created_at = self._take_idle()
+            if raw is None:
+                raw, created_at = self._new_raw(), time.monotonic()
+        except Exception:
+            self._slots.release()
+            raise
+
+        proxy = PooledConnection(raw, self)
+        now = time.monotonic()
+        wait = time.perf_counter() - started
+        key = id(proxy)
+        ref = weakref.ref(proxy, lambda r, k=key: self._reclaim(k, r))
+        with self._lock:
+            self._in_use[key] = [ref, raw, created_at, now, self._caller_site(), False]
+            self._stats["checkouts"] += 1
+            self._stats["wait_total"] += wait
+            self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+
+        if wait > self.SLOW_CHECKOUT_SECONDS:
+            logger.warning(f"🐢 Slow DB pool checkout: waited {wait * 1000:.0f}ms ({len(self._in_use)}/{self.max_size} in use)")
+        return proxy
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager: check out, yield, always return (rolling back anything uncommitted)."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def warmup(self):
+        """Open `min_size` connections up front so the first requests skip the handshake."""
+        conns = []
+        try:
+            for _ in range(self.min_size):
+                conns.append(self.getconn())
+        except Exception as e:
+            logger.warning(f"DB pool warmup incomplete: {e}")
+        finally:
+            for c in conns:
+                c.close()
+
+    def report_leaks(self):
+        """Log connections that have been checked out longer than `leak_threshold`."""
+        now = time.monotonic()
+        leaked = []
+        with self._lock:
+            for rec in self._in_use.values():
+                held = now - rec[3]
+                if held > self.leak_threshold and not rec[5]:
+                    rec[5] = True
+                    leaked.append((held, rec[4]))
+        for held, site in leaked:
+            logger.warning(f"⚠️ Possible DB connection leak: held {held:.0f}s, checked out at {site}")
+        return len(leaked)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s.update({
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "wait_avg_ms": round(s["wait_total"] / s["checkouts"] * 1000, 3) if s["checkouts"] else 0.0,
+                "wait_max_ms": round(s["wait_max"] * 1000, 3),
+            })
+            del s["wait_total"], s["wait_max"]
+        return s
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._close_raw(self._idle.popleft()[0])
+
+    # --- Internals ---
+
+    def _new_raw(self):
+        raw = self._connect_fn(**self.dsn_kwargs)
+        with self._lock:
+            self._stats["connects"] += 1
+        return raw
+
+    def _take_idle(self):
+        """Pop a healthy idle connection (LIFO keeps the hot ones hot)."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None, None
+                raw, created_at, last_used = self._idle.pop()
+
+            if raw.closed or (self.max_lifetime and now - created_at > self.max_lifetime):
+                self._discard_raw(raw)
+                continue
+            if self.health_check_interval is not None and now - last_used > self.health_check_interval:
+                try:
+                    with raw.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    raw.rollback()
+                except Exception:
+                    self._discard_raw(raw)
+                    continue
+            return raw, created_at
+
+    def _release(self, proxy, raw, discard=False):
+        key = id(proxy)
+        with self._lock:
+            rec = self._in_use.pop(key, None)
+        if rec is None:
+            return
+        now = time.monotonic()
+        held = now - rec[3]
+        if held > self.leak_threshold and not rec[5]:
+            logger.warning(f"⚠️ DB connection held {held:.0f}s before release (checked out at {rec[4]})")
+
+        if not discard and not self._closed and not raw.closed:
+            try:
+                if raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    raw.rollback()
+                if raw.autocommit:
+                    raw.autocommit = False
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        if discard or (self.max_lifetime and now - rec[2] > self.max_lifetime):
+            self._discard_raw(raw)
+        else:
+            with self._lock:
+                self._idle.append((raw, rec[2], now))
+                self._trim_idle(now)
+        self._slots.release()
+
+    def _reclaim(self, key, ref):
+        """Weakref callback: a checked-out proxy was garbage collected without close()."""
+        with self._lock:
+            rec = self._in_use.get(key)
+            if rec is None or rec[0] is not ref:
+                return
+            del self._in_use[key]
+            self._stats["leaks_reclaimed"] += 1
+        logger.warning(f"⚠️ DB connection leaked (never closed), reclaimed. Checked out at {rec[4]}")
+        self._discard_raw(rec[1])
+        self._slots.release()
+
+    def _trim_idle(self, now):
+        # Caller holds the lock. Drop surplus connections idle for longer than a health-check period.
+        while len(self._idle) > self.min_size:
+            raw, _, last_used = self._idle[0]
+            if self.health_check_interval is None or now - last_used <= self.health_check_interval:
+                break
+            self._idle.popleft()
+            self._discard_raw(raw)
+
+    def _discard_raw(self, raw):
+        with self._lock:
+            self._stats["discarded"] += 1
+        self._close_raw(raw)
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        # Connections must never be shared across a fork (uvicorn/gunicorn workers).
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle.clear()
+                    self._in_use.clear()
+                    self._slots = threading.BoundedSemaphore(self.max_size)
+                    self._pid = os.getpid()
+
+    @staticmethod
+    def _caller_site():
+        try:
+            frame = sys._getframe(1)
+            while frame and (frame.f_code.co_filename == __file__ or frame.f_code.co_name in _WRAPPER_FRAMES):
+                frame = frame.f_back
+            if frame is None:
+                return "unknown"
+            return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        except Exception:
+            return "unknown"
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PostgresPool:
+    """Return the process-wide pool, creating it from settings on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PostgresPool(
+                    dsn_kwargs={
+                        "host": settings.POSTGRES_HOST,
+                        "port": settings.POSTGRES_PORT,
+                        "user": settings.POSTGRES_USER,
+                        "password": settings.POSTGRES_PASSWORD,
+                        "dbname": settings.POSTGRES_DB,
+                    },
+                    min_size=settings.POSTGRES_POOL_MIN_SIZE,
+                    max_size=settings.POSTGRES_POOL_MAX_SIZE,
+                    timeout=settings.POSTGRES_POOL_TIMEOUT,
+                    health_check_interval=settings.POSTGRES_POOL_HEALTH_CHECK_SECONDS,
+                    max_lifetime=settings.POSTGRES_POOL_MAX_LIFETIME,
+                    leak_threshold=settings.POSTGRES_POOL_LEAK_SECONDS,
+                )
+    return _pool
+
+
+def pg_connection(timeout=None):
+    """Shortcut: `with pg_connection() as conn:` on the shared pool."""
+    return get_pool().connection(timeout)
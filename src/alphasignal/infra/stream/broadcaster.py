@@ -12,6 +12,7 @@ class RealtimeHub:
     def __init__(self):
         self.redis_url = settings.REDIS_URL
         self.redis = None
+        self._sync_redis = None
 
     async def connect(self):
         if not self.redis:
@@ -23,6 +24,13 @@ class RealtimeHub:
         await self.connect()
         await self.redis.publish(channel, json.dumps(message))
 
+    def publish_sync(self, channel: str, message: dict):
+        """Publish from a worker thread (no event loop): uses a blocking client."""
+        if self._sync_redis is None:
+            import redis as redis_sync
+            self._sync_redis = redis_sync.from_url(self.redis_url, decode_responses=True)
+        self._sync_redis.publish(channel, json.dumps(message))
+
     async def subscribe(self, channel: str):
         """Generator for SSE endpoints to subscribe to Redis events."""
         await self.connect()
@@ -1,5 +1,14 @@
 from abc import ABC, abstractmethod
 
+# Bump whenever the analysis prompts or their JSON schema change: cached analyses are keyed on it
+ANALYSIS_PROMPT_VERSION = 1
+
+
+def prompt_content(raw_data):
+    """Article text for the prompt: the compacted full text (utils.prompt_compactor) when present."""
+    return raw_data.get('prompt_content') or raw_data.get('content')
+
+
 class BaseLLM(ABC):
     @abstractmethod
     def analyze(self, text):
@@ -1,31 +1,85 @@
 import json
-from openai import OpenAI
+import threading
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
 from src.alphasignal.config import settings
 from src.alphasignal.core.logger import logger
-from src.alphasignal.providers.llm.base import BaseLLM
+from src.alphasignal.providers.llm.base import BaseLLM, prompt_content
+from src.alphasignal.providers.llm.gemini import GeminiLLM
+from src.alphasignal.providers.llm.limits import LoopLocal, get_provider_limiter
+from src.alphasignal.utils.tokens import estimate_tokens
 
 class DeepSeekLLM(BaseLLM):
+    def __init__(self):
+        self.limiter = get_provider_limiter("deepseek")
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Native async client, one per event loop; its pool is sized to the provider concurrency
+        self._aio = LoopLocal(self._new_async_client)
+
+    @property
+    def client(self):
+        """Long-lived sync client (connection pool shared by every sync call)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = OpenAI(
+                        api_key=settings.DEEPSEEK_API_KEY,
+                        base_url=settings.DEEPSEEK_BASE_URL,
+                        timeout=settings.LLM_REQUEST_TIMEOUT,
+                    )
+        return self._client
+
+    def _new_async_client(self):
+        slots = self.limiter.concurrency
+        return AsyncOpenAI(
+            api_key=settings.DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL,
+            timeout=settings.LLM_REQUEST_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=slots, max_keepalive_connections=slots)
+            ),
+        )
+
+    def _create_kwargs(self, prompt):
+        return dict(
+            model=settings.DEEPSEEK_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            temperature=0.3
+        )
+
+    async def _complete_async(self, prompt, kind="single"):
+        aio = self._aio.get()
+        response = await self.limiter.call(
+            lambda: aio.chat.completions.create(**self._create_kwargs(prompt)),
+            tokens=estimate_tokens(prompt),
+            kind=kind,
+        )
+        return json.loads(response.choices[0].message.content)
+
     async def analyze_async(self, raw_data):
-        """异步版本的分析方法"""
-        import asyncio
-        return await asyncio.to_thread(self.analyze, raw_data)
+        """异步版本的分析方法 (原生异步请求, 受 provider 并发/速率限制)"""
+        try:
+            return await self._complete_async(self._get_prompt(raw_data))
+        except Exception as e:
+            logger.error(f"DeepSeek 分析失败: {e!r}")
+            raise e
+
+    async def analyze_batch_async(self, news_items):
+        try:
+            results = await self._complete_async(GeminiLLM._get_batch_prompt(self, news_items), kind="batch")
+            if len(results) != len(news_items):
+                logger.warning(f"批量分析返回数量不匹配: 期望 {len(news_items)}, 实际 {len(results)}")
+            return results
+        except Exception as e:
+            logger.error(f"DeepSeek 批量分析失败: {e!r}")
+            raise e
 
     def analyze(self, raw_data):
         try:
-            client = OpenAI(
-                api_key=settings.DEEPSEEK_API_KEY, 
-                base_url=settings.DEEPSEEK_BASE_URL
-            )
-            
             prompt = self._get_prompt(raw_data)
-            
-            response = client.chat.completions.create(
-                model=settings.DEEPSEEK_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-            
+            response = self.client.chat.completions.create(**self._create_kwargs(prompt))
             return json.loads(response.choices[0].message.content)
             
         except Exception as e:
@@ -35,21 +89,9 @@ class DeepSeekLLM(BaseLLM):
     def analyze_batch(self, news_items):
         """批量分析（与 Gemini 保持一致的接口）"""
         try:
-            client = OpenAI(
-                api_key=settings.DEEPSEEK_API_KEY, 
-                base_url=settings.DEEPSEEK_BASE_URL
-            )
-            
             # 使用与 Gemini 相同的批量 prompt
-            from src.alphasignal.providers.llm.gemini import GeminiLLM
-            prompt = GeminiLLM()._get_batch_prompt(news_items)
-            
-            response = client.chat.completions.create(
-                model=settings.DEEPSEEK_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
+            prompt = GeminiLLM._get_batch_prompt(self, news_items)
+            response = self.client.chat.completions.create(**self._create_kwargs(prompt))
             
             results = json.loads(response.choices[0].message.content)
             
@@ -71,7 +113,7 @@ class DeepSeekLLM(BaseLLM):
 输入信息：
 - 来源: {raw_data.get('source')}
 - 作者: {raw_data.get('author')}
-- 内容: {raw_data.get('content')}
+- 内容: {prompt_content(raw_data)}
 
 输出格式要求：请必须输出标准的 JSON 格式，不要包含 Markdown 代码块标记（如 ```json）。
 
@@ -1,34 +1,86 @@
 import json
+import threading
 from google import genai
 from src.alphasignal.config import settings
 from src.alphasignal.core.logger import logger
-from src.alphasignal.providers.llm.base import BaseLLM
+from src.alphasignal.providers.llm.base import BaseLLM, prompt_content
+from src.alphasignal.providers.llm.limits import LoopLocal, get_provider_limiter
+from src.alphasignal.utils.tokens import estimate_tokens
 
 class GeminiLLM(BaseLLM):
+    GENERATE_CONFIG = {
+        "temperature": 0.2,
+        "response_mime_type": "application/json",
+    }
+
+    def __init__(self):
+        self.limiter = get_provider_limiter("gemini")
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Native async client (client.aio), one per event loop, reused across requests
+        self._aio = LoopLocal(lambda: self._new_client().aio)
+
+    def _new_client(self):
+        return genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options={"timeout": int(settings.LLM_REQUEST_TIMEOUT * 1000)},
+        )
+
+    @property
+    def client(self):
+        """Long-lived sync client (connection pool shared by every sync call)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._new_client()
+        return self._client
+
+    @staticmethod
+    def _parse(text):
+        clean_text = text.replace("```json", "").replace("```", "").strip()
+        return json.loads(clean_text)
+
+    async def _generate_async(self, prompt, kind="single"):
+        aio = self._aio.get()
+        response = await self.limiter.call(
+            lambda: aio.models.generate_content(model=settings.GEMINI_MODEL, contents=prompt, config=self.GENERATE_CONFIG),
+            tokens=estimate_tokens(prompt),
+            kind=kind,
+        )
+        return response.text
+
     async def analyze_async(self, raw_data):
-        """异步版本的分析方法"""
-        import asyncio
-        return await asyncio.to_thread(self.analyze, raw_data)
+        """异步版本的分析方法 (原生异步请求, 受 provider 并发/速率限制)"""
+        try:
+            res = self._parse(await self._generate_async(self._get_prompt(raw_data)))
+            logger.debug(f"🤖 AI Raw Analysis (Single): {json.dumps(res, ensure_ascii=False)[:200]}...")
+            return res
+        except Exception as e:
+            logger.error(f"Gemini 分析失败: {e!r}")
+            raise e
+
+    async def analyze_batch_async(self, news_items):
+        try:
+            results = self._parse(await self._generate_async(self._get_batch_prompt(news_items), kind="batch"))
+            if len(results) != len(news_items):
+                logger.warning(f"批量分析返回数量不匹配: 期望 {len(news_items)}, 实际 {len(results)}")
+            logger.debug(f"🤖 AI Raw Analysis (Batch): Got {len(results)} results")
+            return results
+        except Exception as e:
+            logger.error(f"Gemini 批量分析失败: {e!r}")
+            raise e
 
     def analyze(self, raw_data):
         try:
-            client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            
-            config = {
-                "temperature": 0.2,
-                "response_mime_type": "application/json",
-            }
-            
             prompt = self._get_prompt(raw_data)
             
-            response = client.models.generate_content(
+            response = self.client.models.generate_content(
                 model=settings.GEMINI_MODEL,
                 contents=prompt,
-                config=config
+                config=self.GENERATE_CONFIG
             )
             
-            clean_text = response.text.replace("```json", "").replace("```", "").strip()
-            res = json.loads(clean_text)
+            res = self._parse(response.text)
             logger.debug(f"🤖 AI Raw Analysis (Single): {json.dumps(res, ensure_ascii=False)[:200]}...")
             return res
             
@@ -38,23 +90,15 @@ class GeminiLLM(BaseLLM):
 
     def analyze_batch(self, news_items):
         try:
-            client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            
-            config = {
-                "temperature": 0.2,
-                "response_mime_type": "application/json",
-            }
-            
             prompt = self._get_batch_prompt(news_items)
             
-            response = client.models.generate_content(
+            response = self.client.models.generate_content(
                 model=settings.GEMINI_MODEL,
                 contents=prompt,
-                config=config
+                config=self.GENERATE_CONFIG
             )
             
-            clean_text = response.text.replace("```json", "").replace("```", "").strip()
-            results = json.loads(clean_text)
+            results = self._parse(response.text)
             
             if len(results) != len(news_items):
                 logger.warning(f"批量分析返回数量不匹配: 期望 {len(news_items)}, 实际 {len(results)}")
@@ -72,7 +116,7 @@ class GeminiLLM(BaseLLM):
             news_list_str += f"""
 [新闻 {i}]
 - ID: {item.get('id')}
-- 内容: {item.get('content')}
+- 内容: {prompt_content(item)}
 - 市场背景: {item.get('context', '无')}
 ---
 """
@@ -117,7 +161,7 @@ JSON 数组，每个对象包含：
 输入信息：
 - 来源: {raw_data.get('source')}
 - 作者: {raw_data.get('author')}
-- 内容: {raw_data.get('content')}
+- 内容: {prompt_content(raw_data)}
 - 市场背景: {raw_data.get('context', '无')}
 
 输出格式要求：请必须输出标准的 JSON 格式，不要包含 Markdown 代码块标记（如 ```json）。
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from src.alphasignal.config import settings
+
+
+class LoopLocal:
+    """
+    One object per running event loop. Async HTTP clients and asyncio primitives
+    are bound to the loop they were first used on, and the engine runs each cycle
+    on a fresh loop; within a loop the object is created once and reused.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._values = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                value = self._values[loop] = self._factory()
+            return value
+
+
+class _Bucket:
+    """Token bucket refilled at `per_minute`/60 per second; reservations may go into debt (caller waits it out)."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute or 0)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n):
+        """Take n now; returns seconds to wait before the reservation is covered (0 if unlimited)."""
+        if self.capacity <= 0 or n <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.level -= min(n, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+
+class ProviderLimiter:
+    """
+    Per-provider admission control and metrics for async LLM requests:
+    at most `concurrency` requests in flight, `rpm` requests and `tpm` estimated
+    tokens per minute (0 = unlimited), and a per-request timeout. Latency is kept
+    for the last `window` successful requests of each kind ("single", "batch"), whose
+    percentiles also drive the hedging deadline in core.analysis_scheduler.
+    """
+
+    def __init__(self, name, concurrency=8, rpm=0, tpm=0, timeout=60.0, window=500):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self._slots = LoopLocal(lambda: asyncio.Semaphore(self.concurrency))
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._window = window
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {"requests": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "throttled_seconds": 0.0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counts[key] += n
+
+    @asynccontextmanager
+    async def request(self, tokens=0, kind="single"):
+        """Hold a slot (after rate-limit waits) for the duration of one request; records outcome and latency."""
+        async with self._slots.get():
+            wait = max(self._requests.reserve(1), self._tokens.reserve(tokens))
+            if wait > 0:
+                self._count("throttled_seconds", wait)
+                await asyncio.sleep(wait)
+            self._count("requests")
+            with self._lock:
+                self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                yield
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                raise
+            except asyncio.CancelledError:
+                # e.g. the losing side of a hedged request
+                self._count("cancelled")
+                raise
+            except Exception:
+                self._count("errors")
+                raise
+            else:
+                with self._lock:
+                    samples = self._latencies.setdefault(kind, deque(maxlen=self._window))
+                    samples.append(time.perf_counter() - started)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    async def call(self, make_coro, tokens=0, timeout=None, kind="single"):
+        """Await `make_coro()` under the limits, cancelled after `timeout` (default: the provider timeout)."""
+        async with self.request(tokens, kind):
+            return await asyncio.wait_for(make_coro(), timeout or self.timeout)
+
+    def samples(self, kind=None):
+        with self._lock:
+            if kind is not None:
+                return list(self._latencies.get(kind, ()))
+            return [s for samples in self._latencies.values() for s in samples]
+
+    def latency_percentiles(self, qs=(50, 95, 99), kind=None):
+        """{"p50": seconds, ...} over recent successful requests (of `kind`, or all); {} without samples."""
+        samples = self.samples(kind)
+        if not samples:
+            return {}
+        return {f"p{q}": float(v) for q, v in zip(qs, np.percentile(samples, qs))}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts, in_flight=self._in_flight, concurrency=self.concurrency)
+            kinds = list(self._latencies)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 2)
+        for kind in kinds:
+            stats.update({f"{kind}_{k}_ms": round(v * 1000, 1) for k, v in self.latency_percentiles(kind=kind).items()})
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(name) -> ProviderLimiter:
+    """Process-wide limiter for provider `name`, configured from {NAME}_MAX_CONCURRENCY / _RPM / _TPM."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                prefix = name.upper()
+                limiter = _limiters[name] = ProviderLimiter(
+                    name,
+                    concurrency=getattr(settings, f"{prefix}_MAX_CONCURRENCY", 8),
+                    rpm=getattr(settings, f"{prefix}_RPM", 0),
+                    tpm=getattr(settings, f"{prefix}_TPM", 0),
+                    timeout=settings.LLM_REQUEST_TIMEOUT,
+                )
+    return limiter
+
+
+def provider_stats():
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,108 @@
+import akshare as ak
+
+from src.alphasignal.config import settings
+from src.alphasignal.providers.market.shared_snapshot import SharedSnapshot, shared_instance
+
+# Pairs used for QDII FX compensation -> Sina FX spot row name
+FX_PAIRS = {
+    "USD/CNY": "美元人民币",
+    "HKD/CNY": "港元人民币",
+    "JPY/CNY": "日元人民币",
+    "EUR/CNY": "欧元人民币",
+}
+
+
+def parse_fx_frame(df):
+    """
+    ak.fx_spot_quote() frame -> {row name: daily change %}, plus FX_PAIRS aliases.
+    Column names vary across AkShare versions, so they are matched loosely.
+    """
+    name_col = next((c for c in df.columns if '名称' in c or '外汇' in c or '货币对' in c), None)
+    if not name_col:
+        return {}
+    change_col = next((c for c in df.columns if '涨跌幅' in c or '幅度' in c), None)
+    price_col = next((c for c in df.columns if '最新价' in c), None)
+    close_col = next((c for c in df.columns if '昨收' in c or '昨开' in c), None)  # Fallback heuristic
+
+    changes = {}
+    for _, row in df.iterrows():
+        name = str(row[name_col])
+        try:
+            if change_col:
+                changes[name] = float(row[change_col])
+            elif price_col and close_col:
+                price, close = float(row[price_col]), float(row[close_col])
+                if close > 0:
+                    changes[name] = (price - close) / close * 100
+        except (TypeError, ValueError):
+            continue
+
+    for pair, search_name in FX_PAIRS.items():
+        match = next((v for n, v in changes.items() if search_name in n), None)
+        if match is not None:
+            changes[pair] = match
+    return changes
+
+
+def parse_fx_prices(df):
+    """ak.fx_spot_quote() frame -> {row name: latest price} (e.g. 美元指数 for DXY)."""
+    name_col = next((c for c in df.columns if '名称' in c or '外汇' in c or '货币对' in c), None)
+    price_col = next((c for c in df.columns if '最新价' in c), None)
+    if not name_col or not price_col:
+        return {}
+    prices = {}
+    for _, row in df.iterrows():
+        try:
+            prices[str(row[name_col])] = float(row[price_col])
+        except (TypeError, ValueError):
+            continue
+    return prices
+
+
+class FxSnapshot(SharedSnapshot):
+    """
+    All FX spot changes and prices, fetched in one upstream call per refresh
+    interval and shared through Redis (`fx:snapshot`) so every process, every
+    QDII fund in a batch and the macro backdrop's DXY read the same snapshot.
+    Lookups are dict reads; a failed refresh keeps serving the previous snapshot.
+    """
+
+    REDIS_KEY = "fx:snapshot"
+
+    def __init__(self, ttl=None, fetcher=None):
+        super().__init__(settings.FX_SNAPSHOT_TTL if ttl is None else ttl)
+        self._fetch = fetcher or ak.fx_spot_quote
+        self._stats.update(fetches=0, lookups=0)
+
+    def _collect(self):
+        df = self._fetch()
+        self._stats["fetches"] += 1
+        changes = parse_fx_frame(df)
+        return {"changes": changes, "prices": parse_fx_prices(df)} if changes else None
+
+    def get_change(self, currency_pair="USD/CNY"):
+        """Daily change % for a pair (USD/CNY, HKD/CNY, JPY/CNY, EUR/CNY or a raw Sina row name); 0.0 if unknown."""
+        changes = self.data()[0].get("changes", {})
+        self._count("lookups")
+        value = changes.get(currency_pair)
+        if value is None:
+            value = changes.get(FX_PAIRS.get(currency_pair, currency_pair), 0.0)
+        return value
+
+    def get_price(self, *names):
+        """Latest price of the first row whose name contains one of `names` (case-insensitive); None if absent."""
+        prices = self.data()[0].get("prices", {})
+        self._count("lookups")
+        for name in names:
+            for row, price in prices.items():
+                if name.lower() in row.lower():
+                    return price
+        return None
+
+    def stats(self):
+        s = super().stats()
+        s["pairs"] = len(self._data.get("changes", {}))
+        return s
+
+
+get_fx_snapshot = shared_instance(FxSnapshot)
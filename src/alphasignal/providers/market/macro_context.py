@@ -0,0 +1,101 @@
+import time
+from datetime import datetime, timezone
+
+import akshare as ak
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.providers.market.fx_snapshot import get_fx_snapshot
+from src.alphasignal.providers.market.shared_snapshot import SharedSnapshot, shared_instance
+
+
+def _dxy():
+    # Read from the shared FX snapshot rather than a second ak.fx_spot_quote() call
+    price = get_fx_snapshot().get_price("美元指数", "USD Index")
+    return round(price, 3) if price is not None else None
+
+
+def _us10y():
+    df = ak.bond_zh_us_rate()
+    return round(float(df.iloc[-1]['10年']), 3) if not df.empty else None
+
+
+def _gold():
+    # London Gold spot from domestic sources
+    df = ak.gold_zh_spot_qhkd()
+    row = df[df['名称'].str.contains('伦敦金|London Gold', case=False, na=False)]
+    return round(float(row.iloc[0]['最新价']), 3) if not row.empty else None
+
+
+# Ticker -> fetcher. ^GVZ has no domestic source yet and always reads as None.
+SERIES = {
+    "DX-Y.NYB": _dxy,
+    "^TNX": _us10y,
+    "GC=F": _gold,
+    "^GVZ": None,
+}
+
+
+class MacroContext(SharedSnapshot):
+    """
+    Shared macro backdrop (DXY, US10Y, GVZ, gold) for intelligence ingestion.
+    Every series is fetched once per refresh (at most every MACRO_CONTEXT_TTL
+    seconds, and at the start of each polling cycle) and shared through Redis
+    (`macro:context`), so items ingested in the same cycle reuse one set of
+    upstream calls. A series that fails to refresh keeps its previous value, and
+    `as_of` is the fetch time of the oldest value; if no series refreshes, the
+    snapshot is left as it was.
+    """
+
+    REDIS_KEY = "macro:context"
+
+    def __init__(self, ttl=None, series=None):
+        super().__init__(settings.MACRO_CONTEXT_TTL if ttl is None else ttl)
+        self.series = series if series is not None else SERIES
+        self._stats.update(upstream_calls=0)
+
+    def _collect(self):
+        # Data: {"values": {ticker: value}, "at": {ticker: epoch of that value's fetch}}
+        values = dict(self._data.get("values", {}))
+        fetched_at = dict(self._data.get("at", {}))
+        refreshed = 0
+        for ticker, fetch in self.series.items():
+            if fetch is None:
+                values.setdefault(ticker, None)
+                continue
+            try:
+                self._stats["upstream_calls"] += 1
+                value = fetch()
+                if value is not None:
+                    values[ticker] = value
+                    fetched_at[ticker] = time.time()
+                    refreshed += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Macro series {ticker} refresh failed: {e}")
+        # Nothing new: keep the old snapshot (and its age) and back off
+        return {"values": values, "at": fetched_at} if refreshed else None
+
+    def refresh(self, force=False):
+        """Refetch every series if the snapshot is older than the TTL (or `force`). Returns snapshot()."""
+        super().refresh(force)
+        with self._lock:
+            return self._snapshot(self._data)
+
+    @staticmethod
+    def _snapshot(data):
+        fetched_at = data.get("at") or {}
+        # A partially refreshed snapshot is only as fresh as its oldest series
+        oldest = min(fetched_at.values()) if fetched_at else None
+        as_of = datetime.fromtimestamp(oldest, tz=timezone.utc) if oldest else None
+        return {"values": dict(data.get("values", {})), "as_of": as_of}
+
+    def snapshot(self):
+        """{"values": {ticker: value}, "as_of": UTC datetime of the oldest series value}."""
+        return self._snapshot(self.data()[0])
+
+    def get(self, ticker):
+        return self.snapshot()["values"].get(ticker)
+
+
+get_macro_context = shared_instance(MacroContext)
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import redis
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+
+
+class SharedSnapshot(ABC):
+    """
+    A dict of market data refreshed at most every `ttl` seconds and shared
+    between processes through Redis (`REDIS_KEY`, kept for 2×ttl). Subclasses
+    implement `_collect()`; if it fails or returns nothing, the previous data is
+    kept and the next attempt is held off for min(ttl, 10) seconds.
+    """
+
+    REDIS_KEY = None
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        try:
+            self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"{type(self).__name__} Redis unavailable: {e}")
+            self.redis = None
+        self._lock = threading.Lock()
+        self._data = {}
+        self._updated_at = 0.0
+        self._retry_at = 0.0
+        self._stats = {"refreshes": 0, "redis_hits": 0, "errors": 0}
+
+    @abstractmethod
+    def _collect(self):
+        """Fresh data from upstream (called under the lock), or None to keep the current data."""
+
+    def _stale(self):
+        now = time.time()
+        return now - self._updated_at > self.ttl and now >= self._retry_at
+
+    def _count(self, key, n=1):
+        """Stats update from outside the lock (refresh() paths already hold it)."""
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + n
+
+    def _load_shared(self):
+        if not self.redis:
+            return False
+        try:
+            raw = self.redis.get(self.REDIS_KEY)
+        except Exception as e:
+            logger.warning(f"{type(self).__name__} Redis read failed: {e}")
+            return False
+        if not raw:
+            return False
+        payload = json.loads(raw)
+        if time.time() - payload.get("at", 0) > self.ttl or not isinstance(payload.get("data"), dict):
+            return False
+        self._data, self._updated_at = payload["data"], payload["at"]
+        self._stats["redis_hits"] += 1
+        return True
+
+    def _publish(self):
+        if not self.redis:
+            return
+        try:
+            payload = json.dumps({"at": self._updated_at, "data": self._data}, ensure_ascii=False)
+            self.redis.setex(self.REDIS_KEY, max(int(self.ttl * 2), 1), payload)
+        except Exception as e:
+            logger.warning(f"{type(self).__name__} Redis write failed: {e}")
+
+    def refresh(self, force=False):
+        """Current data, refetched first if older than the TTL (or `force`)."""
+        with self._lock:
+            if not force and not self._stale():
+                return self._data
+            if not force and self._load_shared():
+                return self._data
+            try:
+                data = self._collect()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"{type(self).__name__} refresh failed: {e}")
+                data = None
+            if not data:
+                self._retry_at = time.time() + min(self.ttl, 10)
+                return self._data
+            self._data, self._updated_at = data, time.time()
+            self._stats["refreshes"] += 1
+            self._publish()
+            return self._data
+
+    def data(self):
+        """(data, updated_at), refreshing first when stale."""
+        if self._stale():
+            self.refresh()
+        with self._lock:
+            return self._data, self._updated_at
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s["age_s"] = round(time.time() - self._updated_at, 1) if self._updated_at else None
+        return s
+
+
+def shared_instance(factory):
+    """Getter for a lazily created, process-wide instance of `factory()`."""
+    instance = []
+    lock = threading.Lock()
+
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
@@ -0,0 +1,124 @@
+"""
+Fast parser for qt.gtimg.cn quote payloads.
+
+A response is a run of records like
+    v_sh600519="1~贵州茅台~600519~1500.00~1480.00~...~1.35~...";
+with 80+ '~'-separated fields. We only need name (1), code (2), price (3) and
+change pct (32), so each record is split at most 33 times straight from the GBK
+bytes; only the name is decoded. ';' can never be part of a GBK double-byte
+character, but '~' (0x7E) can be a trail byte, so a name that fails strict
+decoding is re-parsed from the decoded record.
+"""
+
+NAME, CODE, PRICE, PCT = 1, 2, 3, 32
+
+
+class Quote:
+    """Compact quote record. Supports q['price'] / q.get('name') for dict-style callers."""
+    __slots__ = ("secid", "code", "name", "price", "change_pct")
+
+    def __init__(self, secid, code, name, price, change_pct):
+        self.secid = secid
+        self.code = code
+        self.name = name
+        self.price = price
+        self.change_pct = change_pct
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {'price': self.price, 'change_pct': self.change_pct, 'name': self.name}
+
+    def __repr__(self):
+        return f"Quote({self.secid}, {self.price}, {self.change_pct:+.2f}%)"
+
+
+class QuoteIndex:
+    """
+    Quotes keyed through one alias index: market code (sh600519), Tencent code
+    (600519 / NVDA.OQ), US base code (NVDA) and prefix-stripped code all point at
+    the same Quote object.
+    """
+    __slots__ = ("_by_alias", "_quotes")
+
+    def __init__(self):
+        self._by_alias = {}
+        self._quotes = {}  # secid -> Quote
+
+    def add(self, q):
+        self._quotes[q.secid] = q
+        aliases = self._by_alias
+        aliases[q.secid] = q
+        aliases[q.code] = q
+        prefix = q.secid[:2]
+        if prefix == "us" and "." in q.code:
+            aliases[q.code.split(".", 1)[0]] = q
+        if len(q.secid) > 2 and prefix in ("sh", "sz", "hk", "us", "bj"):
+            aliases.setdefault(q.secid[2:], q)
+
+    def merge(self, other):
+        for q in other:
+            self.add(q)
+        return self
+
+    def get(self, code, default=None):
+        return self._by_alias.get(code, default)
+
+    def __getitem__(self, code):
+        return self._by_alias[code]
+
+    def __contains__(self, code):
+        return code in self._by_alias
+
+    def items(self):
+        """(alias, Quote) pairs: every code a quote can be looked up by."""
+        return self._by_alias.items()
+
+    def __iter__(self):
+        return iter(self._quotes.values())
+
+    def __len__(self):
+        return len(self._quotes)
+
+
+def parse_payload(payload, index=None):
+    """Parse raw GBK bytes into a QuoteIndex (malformed or empty records are skipped)."""
+    index = QuoteIndex() if index is None else index
+    if isinstance(payload, str):
+        payload = payload.encode("gbk", errors="ignore")
+
+    for rec in payload.split(b";"):
+        parts = rec.split(b"~", PCT + 1)
+        if len(parts) <= PCT:
+            continue
+        head = parts[0]
+        start = head.find(b"v_")
+        eq = head.find(b"=", start)
+        if start < 0 or eq < 0:
+            continue
+
+        try:
+            name = parts[NAME].decode("gbk")
+        except UnicodeDecodeError:
+            # '~' inside a double-byte character split the name: fall back to str parsing
+            text_parts = rec.decode("gbk", errors="ignore").split("~", PCT + 1)
+            if len(text_parts) <= PCT:
+                continue
+            parts = [text_parts[0], text_parts[NAME]] + [t.encode("ascii", errors="ignore") for t in text_parts[2:]]
+            name = text_parts[NAME]
+
+        try:
+            price = float(parts[PRICE])
+            pct = float(parts[PCT])
+        except ValueError:
+            continue
+        secid = head[start + 2:eq].strip().decode("latin-1")
+        index.add(Quote(secid, parts[CODE].decode("latin-1"), name, price, pct))
+    return index
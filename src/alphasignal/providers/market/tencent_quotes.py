@@ -0,0 +1,163 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.infra.cache.single_flight import SingleFlight
+from src.alphasignal.providers.market.tencent_parser import QuoteIndex, parse_payload
+
+QUOTE_URL = "http://qt.gtimg.cn/q="
+
+
+def stock_secid(code):
+    """Holding code -> Tencent secid: sh6xxxxx, sz0xxxxx/3xxxxx, bj8xxxxx/4xxxxx, hk0xxxx, usXXXX."""
+    if not code:
+        return None
+    if code.isdigit():
+        if len(code) == 6:
+            if code.startswith(('6', '9')): return f"sh{code}"
+            if code.startswith(('0', '3')): return f"sz{code}"
+            if code.startswith(('8', '4')): return f"bj{code}"
+            return f"sz{code}"  # Fallback
+        if len(code) == 5:
+            return f"hk{code}"
+        return None
+    # Non-numeric codes are treated as US stocks
+    return f"us{code}"
+
+
+def parent_secid(code):
+    """Shadow ETF / proxy index code -> Tencent secid (SH for 5xxxxx ETFs, 9xx/000xxx indices)."""
+    if not code:
+        return None
+    if code.startswith(('sh', 'sz', 'hk')):
+        return code
+    if code.startswith(('5', '9', '000')):
+        return f"sh{code}"
+    return f"sz{code}"
+
+
+class TencentQuoteClient:
+    """
+    Batch quote fetcher for qt.gtimg.cn.
+    Chunks are requested concurrently (capped at `concurrency`) over keep-alive
+    sessions (one per worker thread), each chunk retried on failure, so a batch
+    costs roughly one round trip instead of one per chunk. Identical chunks
+    requested concurrently by different callers share one upstream request.
+    """
+
+    def __init__(self, chunk_size=60, concurrency=8, timeout=3.0, retries=2, backoff=0.2):
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="quote-fetch")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._stats = {
+            "batches": 0, "chunks": 0, "requests": 0, "retries": 0, "failed_chunks": 0,
+            "chunk_ms_total": 0.0, "chunk_ms_max": 0.0, "last_batch_ms": 0.0, "batch_ms_max": 0.0,
+        }
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _fetch_chunk(self, chunk):
+        return self._flight.do(",".join(chunk), self._request_chunk, chunk)
+
+    def _request_chunk(self, chunk):
+        url = QUOTE_URL + ",".join(chunk)
+        started = time.perf_counter()
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(self.backoff * attempt)
+            try:
+                with self._lock:
+                    self._stats["requests"] += 1
+                res = self._session().get(url, timeout=self.timeout)
+                res.raise_for_status()
+                self._record_chunk(time.perf_counter() - started)
+                return res.content
+            except Exception as e:
+                last_error = e
+        with self._lock:
+            self._stats["failed_chunks"] += 1
+        logger.error(f"Batch quote fetch failed after {self.retries + 1} attempts ({len(chunk)} secids): {last_error}")
+        return None
+
+    def _record_chunk(self, elapsed):
+        ms = elapsed * 1000
+        with self._lock:
+            self._stats["chunks"] += 1
+            self._stats["chunk_ms_total"] += ms
+            self._stats["chunk_ms_max"] = max(self._stats["chunk_ms_max"], ms)
+
+    def fetch_raw(self, secids):
+        """Fetch all secids; returns the raw GBK payload of every chunk that succeeded."""
+        secids = list(dict.fromkeys(s for s in secids if s))
+        if not secids:
+            return []
+        chunks = [secids[i:i + self.chunk_size] for i in range(0, len(secids), self.chunk_size)]
+        started = time.perf_counter()
+        if len(chunks) == 1:
+            payloads = [self._fetch_chunk(chunks[0])]
+        else:
+            payloads = list(self._executor.map(self._fetch_chunk, chunks))
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["last_batch_ms"] = ms
+            self._stats["batch_ms_max"] = max(self._stats["batch_ms_max"], ms)
+        return [p for p in payloads if p]
+
+    def fetch(self, secids):
+        """Fetch and parse into a QuoteIndex (lookup by sh600519, 600519, NVDA.OQ or NVDA)."""
+        quotes = QuoteIndex()
+        for payload in self.fetch_raw(secids):
+            parse_payload(payload, quotes)
+        return quotes
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s["coalesced_chunks"] = self._flight.coalesced
+        s["chunk_ms_avg"] = round(s["chunk_ms_total"] / s["chunks"], 2) if s["chunks"] else 0.0
+        del s["chunk_ms_total"]
+        for k in ("chunk_ms_max", "last_batch_ms", "batch_ms_max"):
+            s[k] = round(s[k], 2)
+        return s
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_quote_client() -> TencentQuoteClient:
+    """Process-wide quote client (shared keep-alive connections and worker threads)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TencentQuoteClient(
+                    chunk_size=settings.QUOTE_FETCH_CHUNK_SIZE,
+                    concurrency=settings.QUOTE_FETCH_CONCURRENCY,
+                    timeout=settings.QUOTE_FETCH_TIMEOUT,
+                    retries=settings.QUOTE_FETCH_RETRIES,
+                )
+    return _client
@@ -0,0 +1,265 @@
+import json
+import threading
+import time
+import uuid
+
+import redis
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.providers.market.tencent_parser import Quote, QuoteIndex
+from src.alphasignal.providers.market.tencent_quotes import get_quote_client, stock_secid, parent_secid
+from src.alphasignal.utils.market_calendar import is_trading_session
+
+
+class QuoteBook:
+    """
+    Shared intraday quote book.
+
+    One background poller (elected through a Redis lease, so only one process polls)
+    fetches the union of secids that watched funds need — holdings, shadow/proxy
+    parents, plus anything FundEngine asked for and missed — on a fixed cadence
+    during trading hours. Latest quotes live in memory and in the Redis hash
+    `quotes:book`, so valuation requests in any process read quotes with no
+    upstream I/O and request rate is decoupled from upstream rate limits.
+    """
+
+    HASH_KEY = "quotes:book"
+    UPDATED_KEY = "quotes:book:updated_at"
+    EXTRA_KEY = "quotes:book:extra"
+    LEADER_KEY = "quotes:book:leader"
+
+    def __init__(self, db=None, client=None, interval=None, max_age=None, universe_refresh=None):
+        self._db = db
+        self.client = client or get_quote_client()
+        self.interval = interval if interval is not None else settings.QUOTE_BOOK_INTERVAL
+        self.max_age = max_age if max_age is not None else settings.QUOTE_BOOK_MAX_AGE
+        self.universe_refresh = universe_refresh if universe_refresh is not None else settings.QUOTE_BOOK_UNIVERSE_REFRESH
+        try:
+            self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"QuoteBook Redis unavailable: {e}")
+            self.redis = None
+
+        self._lock = threading.Lock()
+        self._quotes = QuoteIndex()
+        self._updated_at = 0.0
+        self._universe = set()
+        self._universe_at = 0.0
+        self._tracked = set()
+        self._listeners = []
+        self._token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"polls": 0, "errors": 0, "secids": 0, "last_poll_ms": 0.0, "reads": 0, "misses": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            from src.alphasignal.core.database import get_db
+            self._db = get_db()
+        return self._db
+
+    # --- Universe ---
+
+    def refresh_universe(self):
+        stocks, parents = self.db.get_quote_universe()
+        universe = {stock_secid(c) for c in stocks} | {parent_secid(c) for c in parents}
+        if self.redis:
+            try:
+                universe |= self.redis.smembers(self.EXTRA_KEY)
+            except Exception as e:
+                logger.warning(f"QuoteBook extra secids unavailable: {e}")
+        universe.discard(None)
+        # Request threads track() concurrently: the sets are only ever replaced, under the lock
+        with self._lock:
+            universe |= self._tracked
+            self._universe = universe
+            self._universe_at = time.time()
+        return universe
+
+    def track(self, secids):
+        """Add secids that a caller needed but the book did not have; picked up on the next poll."""
+        with self._lock:
+            secids = {s for s in secids if s} - self._universe
+            if not secids:
+                return
+            self._tracked = self._tracked | secids
+            self._universe = self._universe | secids
+        if self.redis:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.sadd(self.EXTRA_KEY, *secids)
+                pipe.expire(self.EXTRA_KEY, 86400 * 3)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"QuoteBook track failed: {e}")
+
+    # --- Polling ---
+
+    def poll_once(self):
+        with self._lock:
+            stale = not self._universe or time.time() - self._universe_at > self.universe_refresh
+        if stale:
+            self.refresh_universe()
+        with self._lock:
+            universe = list(self._universe)
+        if not universe:
+            return 0
+
+        started = time.perf_counter()
+        quotes = self.client.fetch(universe)
+        now = time.time()
+        with self._lock:
+            prev = self._quotes
+            changed = []
+            for q in quotes:
+                p = prev.get(q.secid)
+                if p is None or p.price != q.price or p.change_pct != q.change_pct:
+                    changed.append(q.secid)
+            self._quotes = quotes
+            self._updated_at = now
+            self._stats["polls"] += 1
+            self._stats["secids"] = len(quotes)
+            self._stats["last_poll_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        if self.redis and len(quotes):
+            try:
+                mapping = {q.secid: json.dumps([q.code, q.name, q.price, q.change_pct], ensure_ascii=False) for q in quotes}
+                pipe = self.redis.pipeline()
+                pipe.hset(self.HASH_KEY, mapping=mapping)
+                pipe.expire(self.HASH_KEY, 86400)
+                pipe.set(self.UPDATED_KEY, now, ex=86400)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"QuoteBook Redis publish failed: {e}")
+
+        for listener in self._listeners:
+            try:
+                listener(quotes, changed)
+            except Exception as e:
+                logger.error(f"QuoteBook listener failed: {e}")
+        return len(quotes)
+
+    def add_listener(self, fn):
+        """fn(quotes: QuoteIndex, changed: list of secids) is called after every poll."""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def _is_leader(self):
+        if not self.redis:
+            return True
+        try:
+            ttl = max(int(self.interval * 3), 5)
+            if self.redis.set(self.LEADER_KEY, self._token, nx=True, ex=ttl):
+                return True
+            if self.redis.get(self.LEADER_KEY) == self._token:
+                self.redis.expire(self.LEADER_KEY, ttl)
+                return True
+            return False
+        except Exception:
+            return True
+
+    def _in_session(self):
+        return any(is_trading_session(r) for r in ('CN', 'HK', 'US'))
+
+    def _run(self):
+        logger.info(f"📒 QuoteBook poller started (every {self.interval}s during trading hours)")
+        first = True
+        while not self._stop.is_set():
+            wait = self.interval
+            try:
+                if self._is_leader():
+                    if first or self._in_session():
+                        n = self.poll_once()
+                        if first:
+                            logger.info(f"📒 QuoteBook primed with {n} quotes")
+                        first = False
+                    else:
+                        wait = max(self.interval, 30)
+                else:
+                    wait = max(self.interval, 10)
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.error(f"QuoteBook poll failed: {e}")
+            self._stop.wait(wait)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="quote-book", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self.redis:
+            try:
+                if self.redis.get(self.LEADER_KEY) == self._token:
+                    self.redis.delete(self.LEADER_KEY)
+            except Exception:
+                pass
+
+    # --- Reads ---
+
+    def _fresh(self, updated_at):
+        if not updated_at:
+            return False
+        return time.time() - updated_at <= self.max_age or not self._in_session()
+
+    def get_quotes(self, secids):
+        """
+        Quotes for `secids` from the book (memory if this process polls, Redis otherwise).
+        Returns (QuoteIndex, missing secids). A stale book counts as missing entirely.
+        """
+        secids = [s for s in dict.fromkeys(secids) if s]
+        result = QuoteIndex()
+        with self._lock:
+            self._stats["reads"] += 1
+            local, local_at = self._quotes, self._updated_at
+
+        if self._fresh(local_at):
+            for s in secids:
+                q = local.get(s)
+                if q is not None:
+                    result.add(q)
+        elif self.redis and secids:
+            try:
+                updated_at = float(self.redis.get(self.UPDATED_KEY) or 0)
+                if self._fresh(updated_at):
+                    for s, raw in zip(secids, self.redis.hmget(self.HASH_KEY, secids)):
+                        if raw:
+                            code, name, price, pct = json.loads(raw)
+                            result.add(Quote(s, code, name, price, pct))
+            except Exception as e:
+                logger.warning(f"QuoteBook Redis read failed: {e}")
+
+        missing = [s for s in secids if s not in result]
+        if missing:
+            with self._lock:
+                self._stats["misses"] += len(missing)
+        return result, missing
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s["age_s"] = round(time.time() - self._updated_at, 1) if self._updated_at else None
+            s["universe"] = len(self._universe)
+        s["running"] = bool(self._thread and self._thread.is_alive())
+        return s
+
+
+_book = None
+_book_lock = threading.Lock()
+
+
+def get_quote_book() -> QuoteBook:
+    global _book
+    if _book is None:
+        with _book_lock:
+            if _book is None:
+                _book = QuoteBook()
+    return _book
@@ -1,3 +1,4 @@
+import pandas as pd
 import pandas_market_calendars as mcal
 from datetime import datetime, date, timedelta
 import threading
@@ -7,6 +8,7 @@ class MarketCalendar:
     _instance = None
     _lock = threading.Lock()
     _calendars = {}
+    _sessions = {}
 
     def __new__(cls):
         with cls._lock:
@@ -57,10 +59,38 @@ class MarketCalendar:
         schedule = cal.schedule(start_date=target_date, end_date=target_date)
         return not schedule.empty
 
+    def is_trading_session(self, region='CN', now=None, padding_minutes=5):
+        """
+        Whether `now` falls inside a regular session (exchange open -> close, padded
+        to catch the opening auction and closing prints). Lunch breaks count as open.
+        """
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        if now.tzinfo is None:
+            now = now.tz_localize('Asia/Shanghai')
+        now = now.tz_convert('UTC')
+
+        market_code = {'CN': 'SSE', 'US': 'NYSE', 'HK': 'HKEX'}.get(region, 'SSE')
+        cal = self._get_calendar(market_code)
+        if cal is None:
+            return now.tz_convert('Asia/Shanghai').weekday() < 5
+
+        # US sessions cross midnight in Beijing time: look at the neighbouring days too
+        day = now.date()
+        cached = self._sessions.get(market_code)
+        if cached is None or cached[0] != day:
+            cached = (day, cal.schedule(start_date=day - timedelta(days=1), end_date=day + timedelta(days=1)))
+            self._sessions[market_code] = cached
+        schedule = cached[1]
+        pad = pd.Timedelta(minutes=padding_minutes)
+        return bool(((schedule['market_open'] - pad <= now) & (now <= schedule['market_close'] + pad)).any())
+
 # Global helpers
 def is_market_open(region='CN', target_date=None):
     return MarketCalendar().is_trading_day(region, target_date)
 
+def is_trading_session(region='CN', now=None):
+    return MarketCalendar().is_trading_session(region, now)
+
 def was_market_open_last_night(region='US', target_date=None):
     """Specific for QDII: check if US/HK was open on the previous trading session relative to target_date."""
     if target_date is None:
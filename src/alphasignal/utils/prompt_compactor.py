@@ -0,0 +1,170 @@
+import re
+import threading
+
+from src.alphasignal.config import settings
+from src.alphasignal.core.logger import logger
+from src.alphasignal.utils.tokens import estimate_tokens
+
+# Terms that make a sentence worth keeping for a gold / macro read (matched case-insensitively)
+KEYWORDS = {
+    3.0: ["gold", "xau", "bullion", "黄金", "金价", "现货金", "期金"],
+    2.0: ["fed", "fomc", "powell", "rate cut", "rate hike", "interest rate", "inflation", "cpi", "pce",
+          "treasury", "yield", "dollar", "dxy", "central bank", "safe-haven", "safe haven", "etf", "comex",
+          "美联储", "降息", "加息", "利率", "通胀", "美元", "美债", "收益率", "央行", "避险", "购金"],
+    1.0: ["payroll", "nonfarm", "jobs", "unemployment", "gdp", "recession", "tariff", "sanction", "war",
+          "geopolitic", "oil", "silver", "ecb", "boj", "pboc", "非农", "就业", "失业", "衰退", "关税",
+          "制裁", "地缘", "战争", "原油", "白银"],
+}
+
+# Lines that are boilerplate as a whole: anchored at the line start and specific enough
+# that an ordinary sentence merely containing e.g. "recommended" or "注册" is kept
+_BOILERPLATE = re.compile(
+    r"^(title:|markdown content:|url source:|published time:|©|\(c\)\s|copyright\s*(©|\(c\)|\d{4})|"
+    r"all rights reserved|subscribe( to| now|$)|sign (up|in)\b|log ?in\b|newsletter|advertisement|sponsored\b|"
+    r"share (this|on)\b|follow us|read more|related (articles|stories|news|coverage)|"
+    r"recommended (for you|stories|articles|reading)|click here|download (the|our) app|"
+    r"(we|this (site|website)) uses? cookies|accept (all )?cookies|terms of (use|service)|privacy policy|"
+    r"免责声明|版权(所有|声明)|本文(来源|转载)|责任编辑|扫码|关注我们|相关阅读|相关新闻|推荐阅读|点击(查看|阅读)|"
+    r"(立即|免费)?(登录|注册|订阅)\s*([/|｜]|$)|(广告|分享|收藏)\s*$)",
+    re.IGNORECASE,
+)
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_URL = re.compile(r"https?://\S+")
+_RULE = re.compile(r"^[\s\-*_=#|>~`]*$")
+_LIST_MARK = re.compile(r"^\s*([-*+]|\d+[.)])\s+")
+_SENTENCE = re.compile(r"(?<=[.!?。！？；;])\s+|(?<=[。！？；])")
+_NUMBER = re.compile(r"\d")
+
+
+class PromptCompactor:
+    """
+    Shrinks crawled Markdown (Jina Reader output) to what the analysis prompt needs:
+    images, navigation and link lists, boilerplate lines and repeated paragraphs are
+    dropped, links become their text; if the result is still over `budget` estimated
+    tokens, sentences are ranked by gold/macro keyword relevance (plus figures and
+    lead position) and the best ones kept, in their original order.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = settings.PROMPT_CONTENT_TOKEN_BUDGET if budget is None else budget
+        self._keywords = [(weight, term) for weight, terms in KEYWORDS.items() for term in terms]
+        self._lock = threading.Lock()
+        self._stats = {"items": 0, "tokens_before": 0, "tokens_after": 0, "truncated": 0}
+
+    # --- Cleaning ---
+
+    def _clean_line(self, line):
+        """Line without markup noise, or None if the whole line is boilerplate / navigation."""
+        if _RULE.match(line):
+            return None
+        links = len(_LINK.findall(line))
+        line = _IMAGE.sub("", line)
+        text = _URL.sub("", _LINK.sub(r"\1", line)).strip()
+        bare = _LIST_MARK.sub("", text).strip()
+        # Link lists / nav bars: the line is (almost) nothing but link text
+        if links and (links >= 3 or len(bare) < 40 or _LIST_MARK.match(line)):
+            return None
+        if not bare or _BOILERPLATE.match(bare) and len(bare) < 160:
+            return None
+        return text
+
+    def clean(self, text):
+        paragraphs, seen, current = [], set(), []
+
+        def close():
+            if current:
+                para = " ".join(current)
+                key = re.sub(r"\W+", "", para).casefold()
+                if key and key not in seen:
+                    seen.add(key)
+                    paragraphs.append(para)
+                current.clear()
+
+        for raw_line in (text or "").splitlines():
+            if not raw_line.strip():
+                close()
+                continue
+            line = self._clean_line(raw_line)
+            if line is None:
+                continue
+            if line.lstrip().startswith("#"):
+                close()
+                current.append(line.lstrip("# ").strip())
+                close()
+            else:
+                current.append(line)
+        close()
+        return paragraphs
+
+    # --- Ranking ---
+
+    def _score(self, sentence, position):
+        lowered = sentence.casefold()
+        score = sum(weight for weight, term in self._keywords if term in lowered)
+        if _NUMBER.search(sentence):
+            score += 0.5
+        return score + max(0.0, 1.5 - 0.25 * position)   # lead sentences carry the story
+
+    def _select(self, paragraphs):
+        sentences = []
+        for p_index, para in enumerate(paragraphs):
+            for sentence in _SENTENCE.split(para):
+                sentence = sentence.strip()
+                if sentence:
+                    sentences.append((p_index, sentence))
+        ranked = sorted(range(len(sentences)), key=lambda i: -self._score(sentences[i][1], i))
+        keep, used = set(), 0
+        for i in ranked:
+            cost = estimate_tokens(sentences[i][1]) + 1
+            if used + cost > self.budget:
+                continue
+            keep.add(i)
+            used += cost
+        out, last_para = [], None
+        for i in sorted(keep):
+            p_index, sentence = sentences[i]
+            if p_index != last_para and out:
+                out.append("\n\n")
+            elif out:
+                out.append(" ")
+            out.append(sentence)
+            last_para = p_index
+        return "".join(out)
+
+    # --- Entry points ---
+
+    def compact(self, text):
+        """(compacted text, tokens before, tokens after)."""
+        before = estimate_tokens(text)
+        paragraphs = self.clean(text)
+        compacted = "\n\n".join(paragraphs)
+        truncated = estimate_tokens(compacted) > self.budget
+        if truncated:
+            compacted = self._select(paragraphs)
+        after = estimate_tokens(compacted)
+        with self._lock:
+            self._stats["items"] += 1
+            self._stats["tokens_before"] += before
+            self._stats["tokens_after"] += after
+            self._stats["truncated"] += int(truncated)
+        return compacted, before, after
+
+    def compact_items(self, items):
+        """Set `prompt_content` on crawled full-text items (content itself is left intact for dedupe / cache)."""
+        for item in items:
+            if item.get('extraction_method') != "JINA_READER" or not item.get('content'):
+                continue
+            compacted, before, after = self.compact(item['content'])
+            if compacted:
+                item['prompt_content'] = compacted
+                item['prompt_tokens_saved'] = before - after
+                logger.debug(f"✂️ {item.get('source_id') or item.get('id')}: {before} → {after} tokens")
+        return items
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        if stats["tokens_before"]:
+            stats["saved_pct"] = round(100 * (1 - stats["tokens_after"] / stats["tokens_before"]), 1)
+        return stats
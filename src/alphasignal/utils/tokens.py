@@ -0,0 +1,13 @@
+import re
+
+# CJK ideographs, kana and hangul: roughly one token per character for current tokenizers
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+
+def estimate_tokens(text) -> int:
+    """Cheap upper-leaning token estimate: 1 per CJK character, 1 per 4 other characters."""
+    if not text:
+        return 0
+    text = str(text)
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
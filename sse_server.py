@@ -12,10 +12,15 @@ from typing import List, AsyncGenerator
 from fastapi import FastAPI, Request, Depends
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from contextlib import asynccontextmanager
 from src.alphasignal.config import settings
+from src.alphasignal.infra.database.pool import get_pool
+from src.alphasignal.providers.market.tencent_quotes import get_quote_client
+from src.alphasignal.services.quote_book import get_quote_book
+from src.alphasignal.providers.market.fx_snapshot import get_fx_snapshot
+from src.alphasignal.providers.market.macro_context import get_macro_context
+from src.alphasignal.core.fund_revaluation import get_revaluer
 from src.alphasignal.auth.router import router as auth_router
 from src.alphasignal.auth.dependencies import get_current_user
 from src.alphasignal.auth.models import User
@@ -64,13 +69,7 @@ async def database_poller():
     # 1. Init: Find the current max ID to start polling from
     # We don't want to broadcast old history to everyone on startup
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            dbname=settings.POSTGRES_DB
-        )
+        conn = get_pool().getconn()
         cursor = conn.cursor()
         cursor.execute("SELECT COALESCE(MAX(id), 0) FROM intelligence")
         global_last_id = cursor.fetchone()[0]
@@ -88,13 +87,7 @@ async def database_poller():
             #     await asyncio.sleep(2)
             #     continue
 
-            conn = psycopg2.connect(
-                 host=settings.POSTGRES_HOST,
-                 port=settings.POSTGRES_PORT,
-                 user=settings.POSTGRES_USER,
-                 password=settings.POSTGRES_PASSWORD,
-                 dbname=settings.POSTGRES_DB
-            )
+            conn = get_pool().getconn()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             cursor.execute(
@@ -131,11 +124,20 @@ async def database_poller():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: warm the pool and run the schema bootstrap once, off the request path
+    from src.alphasignal.core.database import get_db
+    await asyncio.to_thread(get_pool().warmup)
+    await asyncio.to_thread(get_db)
+    if settings.QUOTE_BOOK_ENABLED:
+        # Quote ticks only revalue (and republish) funds whose constituents moved
+        get_quote_book().add_listener(get_revaluer().on_tick)
+        get_quote_book().start()
     task = asyncio.create_task(database_poller())
     yield
     # Shutdown
     task.cancel()
+    if settings.QUOTE_BOOK_ENABLED:
+        await asyncio.to_thread(get_quote_book().stop)
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -180,17 +182,18 @@ app.include_router(api_v1_router)
 @app.get("/api/funds/{code}/valuation")
 async def get_fund_valuation(code: str):
     """Get real-time estimated valuation for a fund."""
-    from src.alphasignal.core.fund_engine import FundEngine
+    from src.alphasignal.core.fund_engine import get_fund_engine
     
-    engine = FundEngine()
+    engine = get_fund_engine()
     # Use efficient batch method even for single fund
     try:
-        results = engine.calculate_batch_valuation([code])
+        # Off the event loop: valuation may wait on a peer computing the same funds
+        results = await asyncio.to_thread(engine.calculate_batch_valuation, [code])
         if results:
             # Enrich with stats
-            from src.alphasignal.core.database import IntelligenceDB
-            db = IntelligenceDB()
-            stats_map = db.get_fund_stats([code])
+            from src.alphasignal.core.database import get_db
+            db = get_db()
+            stats_map = await asyncio.to_thread(db.get_fund_stats, [code])
             if code in stats_map:
                 results[0]['stats'] = stats_map[code]
             
@@ -207,13 +210,13 @@ async def get_fund_valuation(code: str):
         return {"error": "Valuation failed"}
     except AttributeError:
         # Fallback
-        return engine.calculate_realtime_valuation(code)
+        return await asyncio.to_thread(engine.calculate_realtime_valuation, code)
 
 @app.post("/api/funds/{code}/refresh")
 async def refresh_fund_holdings(code: str):
     """Force refresh of fund holdings (e.g. new quarter released)."""
-    from src.alphasignal.core.fund_engine import FundEngine
-    engine = FundEngine()
+    from src.alphasignal.core.fund_engine import get_fund_engine
+    engine = get_fund_engine()
     holdings = engine.update_fund_holdings(code)
     return {"status": "ok", "holdings_count": len(holdings)}
 
@@ -232,17 +235,18 @@ async def get_batch_valuations(codes: str, mode: str = "full"):
     if not code_list:
         return {"data": []}
 
-    from src.alphasignal.core.fund_engine import FundEngine
-    engine = FundEngine()
+    from src.alphasignal.core.fund_engine import get_fund_engine
+    engine = get_fund_engine()
     
     # Use optimized batch valuation
     try:
-        results = engine.calculate_batch_valuation(code_list, summary=(mode == "summary"))
+        # Off the event loop: valuation may wait on a peer computing the same funds
+        results = await asyncio.to_thread(engine.calculate_batch_valuation, code_list, summary=(mode == "summary"))
         
         # Enrich with stats
-        from src.alphasignal.core.database import IntelligenceDB
-        db = IntelligenceDB()
-        stats_map = db.get_fund_stats(code_list)
+        from src.alphasignal.core.database import get_db
+        db = get_db()
+        stats_map = await asyncio.to_thread(db.get_fund_stats, code_list)
         
         for res in results:
             f_code = res.get('fund_code')
@@ -265,7 +269,7 @@ async def get_batch_valuations(codes: str, mode: str = "full"):
         results = []
         for code in code_list[:20]:
             try:
-                val = engine.calculate_realtime_valuation(code)
+                val = await asyncio.to_thread(engine.calculate_realtime_valuation, code)
                 results.append(val)
             except Exception as e:
                 results.append({"fund_code": code, "error": str(e)})
@@ -276,8 +280,8 @@ async def get_batch_valuations(codes: str, mode: str = "full"):
 @app.get("/api/funds/{code}/history")
 async def get_fund_history(code: str, limit: int = 30):
     """Get historical valuation vs official performance for a fund."""
-    from src.alphasignal.core.database import IntelligenceDB
-    db = IntelligenceDB()
+    from src.alphasignal.core.database import get_db
+    db = get_db()
     history = db.get_valuation_history(code, limit)
     # Ensure date objects are serializable and match iOS model
     formatted_history = []
@@ -300,16 +304,16 @@ async def get_fund_history(code: str, limit: int = 30):
 @app.post("/api/admin/funds/snapshot")
 async def trigger_snapshot():
     """Admin: Manually trigger 15:00 valuation snapshot."""
-    from src.alphasignal.core.fund_engine import FundEngine
-    engine = FundEngine()
+    from src.alphasignal.core.fund_engine import get_fund_engine
+    engine = get_fund_engine()
     engine.take_all_funds_snapshot()
     return {"status": "snapshot_triggered"}
 
 @app.post("/api/admin/funds/reconcile")
 async def trigger_reconcile(date: str = None):
     """Admin: Manually trigger official NAV reconciliation."""
-    from src.alphasignal.core.fund_engine import FundEngine
-    engine = FundEngine()
+    from src.alphasignal.core.fund_engine import get_fund_engine
+    engine = get_fund_engine()
     target_date = None
     if date:
         from datetime import datetime
@@ -330,24 +334,24 @@ class WatchlistItem(BaseModel):
 @app.get("/api/admin/funds/monitor")
 async def get_fund_monitor_stats(current_user: User = Depends(get_current_user)):
     """Admin: Get reconciliation performance, health, and accuracy heatmap stats."""
-    from src.alphasignal.core.database import IntelligenceDB
-    db = IntelligenceDB()
+    from src.alphasignal.core.database import get_db
+    db = get_db()
     stats = db.get_reconciliation_stats()
     stats['heatmap'] = db.get_heatmap_stats() # Inject heatmap data
     return stats
 
 @app.get("/api/watchlist")
 async def get_watchlist(current_user: User = Depends(get_current_user)):
-    from src.alphasignal.core.database import IntelligenceDB
-    db = IntelligenceDB()
+    from src.alphasignal.core.database import get_db
+    db = get_db()
     rows = db.get_watchlist(str(current_user.id))
     # Simplify response
     return {"data": [{"code": r['fund_code'], "name": r['fund_name']} for r in rows]}
 
 @app.post("/api/watchlist")
 async def add_to_watchlist(item: WatchlistItem, current_user: User = Depends(get_current_user)):
-    from src.alphasignal.core.database import IntelligenceDB
-    db = IntelligenceDB()
+    from src.alphasignal.core.database import get_db
+    db = get_db()
     success = db.add_to_watchlist(item.code, item.name, str(current_user.id))
     
     # Broadcast to SSE clients
@@ -366,8 +370,8 @@ async def add_to_watchlist(item: WatchlistItem, current_user: User = Depends(get
 
 @app.delete("/api/watchlist/{code}")
 async def remove_from_watchlist(code: str, current_user: User = Depends(get_current_user)):
-    from src.alphasignal.core.database import IntelligenceDB
-    db = IntelligenceDB()
+    from src.alphasignal.core.database import get_db
+    db = get_db()
     success = db.remove_from_watchlist(code, str(current_user.id))
     
     # Broadcast to SSE clients
@@ -465,7 +469,7 @@ async def search_funds(q: str = "", limit: int = 20):
     Returns:
         List of matching funds with code, name, type, and company
     """
-    from src.alphasignal.core.fund_engine import FundEngine
+    from src.alphasignal.core.fund_engine import get_fund_engine
     
     if not q or len(q.strip()) == 0:
         return {"results": [], "total": 0}
@@ -473,7 +477,7 @@ async def search_funds(q: str = "", limit: int = 20):
     # Limit max results to 50
     limit = min(limit, 50)
     
-    engine = FundEngine()
+    engine = get_fund_engine()
     results = engine.search_funds(q.strip(), limit)
     
     return {
@@ -492,14 +496,9 @@ async def get_backtest_stats(request: Request):
     min_score = int(request.query_params.get('min_score', 8))
     sentiment_type = request.query_params.get('sentiment', 'bearish') # 'bearish' or 'bullish'
     
+    conn = None
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            dbname=settings.POSTGRES_DB
-        )
+        conn = get_pool().getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         # Determine columns based on window
@@ -871,6 +870,9 @@ async def get_backtest_stats(request: Request):
     except Exception as e:
         print(f"[API] Stats error: {e}")
         return {"error": str(e)}
+    finally:
+        if conn is not None:
+            conn.close()
 
 @app.get("/api/alerts/24h")
 async def get_24h_alerts_count():
@@ -878,13 +880,7 @@ async def get_24h_alerts_count():
     Get the count of high-urgency (score 8+) alerts in the last 24 hours.
     """
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            dbname=settings.POSTGRES_DB
-        )
+        conn = get_pool().getconn()
         cursor = conn.cursor()
         
         query = """
@@ -947,13 +943,7 @@ async def intelligence_stream(request: Request):
         # This is the ONLY time this client queries the DB directly
         since_id_param = request.query_params.get('since_id')
         try:
-            conn = psycopg2.connect(
-                host=settings.POSTGRES_HOST,
-                port=settings.POSTGRES_PORT,
-                user=settings.POSTGRES_USER,
-                password=settings.POSTGRES_PASSWORD,
-                dbname=settings.POSTGRES_DB
-            )
+            conn = get_pool().getconn()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             if since_id_param:
@@ -1019,13 +1009,7 @@ async def intelligence_stream(request: Request):
 async def get_intelligence_history(limit: int = 50, since_id: int = None):
     """Fetch intelligence history."""
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            dbname=settings.POSTGRES_DB
-        )
+        conn = get_pool().getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         if since_id:
@@ -1094,13 +1078,7 @@ async def get_market_data(symbol: str = "GC=F", range: str = "1d", interval: str
 async def get_intelligence_item(item_id: int):
     """Fetch a single intelligence item by ID."""
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            dbname=settings.POSTGRES_DB
-        )
+        conn = get_pool().getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         cursor.execute("SELECT * FROM intelligence WHERE id = %s", (item_id,))
         item = cursor.fetchone()
@@ -1116,7 +1094,16 @@ async def get_intelligence_item(item_id: int):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "AlphaSignal SSE (Broadcast Mode)"}
+    return {
+        "status": "ok",
+        "service": "AlphaSignal SSE (Broadcast Mode)",
+        "db_pool": get_pool().stats(),
+        "quote_fetch": get_quote_client().stats(),
+        "quote_book": get_quote_book().stats(),
+        "revaluation": get_revaluer().stats(),
+        "fx_snapshot": get_fx_snapshot().stats(),
+        "macro_context": get_macro_context().stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
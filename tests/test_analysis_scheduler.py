@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from src.alphasignal.core.analysis_scheduler import AnalysisScheduler
+
+
+class _FakeLLM:
+    def __init__(self, drop=(), fail_batch=False):
+        self.batches, self.singles = [], []
+        self.drop, self.fail_batch = set(drop), fail_batch
+
+    async def analyze_batch_async(self, items):
+        self.batches.append([i['id'] for i in items])
+        if self.fail_batch:
+            raise RuntimeError("quota")
+        # json_object mode: array wrapped in an object, ids echoed as strings
+        return {"results": [{"news_id": str(i['id']), "summary": f"batch {i['id']}"}
+                            for i in items if i['id'] not in self.drop]}
+
+    async def analyze_async(self, raw_data):
+        self.singles.append(raw_data['id'])
+        return {"summary": f"single {raw_data['id']}"}
+
+
+def _run(scheduler, items):
+    async def go():
+        return await asyncio.gather(*(scheduler.analyze(item) for item in items))
+    return asyncio.run(go())
+
+
+def test_groups_by_size_and_only_missing_items_go_single():
+    primary, fallback = _FakeLLM(drop={3}), _FakeLLM()
+    scheduler = AnalysisScheduler(primary, fallback, max_batch=4, max_tokens=10_000, max_wait=0.05, concurrency=2)
+    results = _run(scheduler, [{'id': i, 'content': 'gold'} for i in range(1, 7)])
+
+    assert primary.batches == [[1, 2, 3, 4], [5, 6]]
+    assert primary.singles == [3] and not fallback.batches
+    assert [r['summary'] for r in results] == ["batch 1", "batch 2", "single 3", "batch 4", "batch 5", "batch 6"]
+    assert scheduler.stats["batched_items"] == 5 and scheduler.stats["single_items"] == 1
+
+
+def test_token_budget_splits_and_failed_batch_uses_fallback_provider():
+    primary, fallback = _FakeLLM(fail_batch=True), _FakeLLM()
+    scheduler = AnalysisScheduler(primary, fallback, max_batch=10, max_tokens=50, max_wait=0.05, concurrency=1)
+    items = [{'id': i, 'content': 'x' * 80} for i in range(1, 6)]   # ~20 tokens each
+    results = _run(scheduler, items)
+
+    assert primary.batches == fallback.batches == [[1, 2], [3, 4]]
+    assert primary.singles == [5]   # the lone tail item skips the batch prompt
+    assert [r['summary'] for r in results] == ["batch 1", "batch 2", "batch 3", "batch 4", "single 5"]
+
+
+class _FakeDB:
+    def __init__(self):
+        self.rows = {}
+
+    def get_cached_analysis(self, content_hash, version):
+        return self.rows.get((content_hash, version))
+
+    def save_cached_analysis(self, content_hash, version, result):
+        self.rows[(content_hash, version)] = result
+        return True
+
+
+def test_cache_reuses_results_across_ids_and_coalesces_in_flight_copies():
+    from src.alphasignal.core.analysis_cache import AnalysisCache
+
+    body = "Gold jumped 2% after the <b>Fed</b> signalled two cuts this year, " * 3
+    db = _FakeDB()
+    cache = AnalysisCache(db, redis_client=None, min_chars=40, version="test")
+    primary, fallback = _FakeLLM(), _FakeLLM()
+    scheduler = AnalysisScheduler(primary, fallback, max_batch=4, max_wait=0.05, cache=cache)
+
+    # Same story syndicated under three ids (whitespace/markup differ) + one short headline
+    items = [{'id': 1, 'content': body}, {'id': 2, 'content': "  " + body.upper()},
+             {'id': 3, 'content': body.replace(" ", "\n")}, {'id': 4, 'content': "Gold up"}]
+    first = _run(scheduler, items)
+    sent = sorted(primary.singles + [i for batch in primary.batches for i in batch])
+    assert sent == [1, 4]   # the three copies reach the LLM once
+    assert first[0]['summary'] == first[1]['summary'] == first[2]['summary'] != first[3]['summary']
+    assert scheduler.stats["coalesced"] == 2 and len(db.rows) == 1
+
+    # A retry of the same content later on: served from the backing table, no LLM call
+    again = _run(scheduler, [{'id': 9, 'content': body}])
+    assert again[0]['summary'] == first[0]['summary'] and 'news_id' not in again[0]
+    assert sorted(primary.singles + [i for batch in primary.batches for i in batch]) == [1, 4]
+    assert cache.stats()["db_hits"] == 1 and scheduler.stats["cache_hits"] == 1
+
+
+def test_slow_primary_is_hedged_after_its_latency_percentile(monkeypatch):
+    from collections import deque
+
+    from src.alphasignal.config import settings
+    from src.alphasignal.providers.llm.limits import ProviderLimiter
+
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 5)
+
+    class _Slow(_FakeLLM):
+        def __init__(self):
+            super().__init__()
+            self.limiter = ProviderLimiter("slow")
+            self.limiter._latencies["single"] = deque([0.02] * 9 + [0.05])   # p95 ~= 0.04s
+            self.cancelled = 0
+
+        async def analyze_async(self, raw_data):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+
+    primary, fallback = _Slow(), _FakeLLM()
+    scheduler = AnalysisScheduler(primary, fallback, max_batch=4, max_wait=0.01, hedge=True)
+    assert 0.02 < scheduler.hedge_deadline("single") < 0.05
+    assert scheduler.hedge_deadline("batch") == settings.LLM_HEDGE_MAX_SECONDS   # no batch samples yet
+
+    started = time.monotonic()
+    results = _run(scheduler, [{'id': 7, 'content': 'gold'}])
+    assert time.monotonic() - started < 1
+    assert results == [{"summary": "single 7"}] and fallback.singles == [7]
+    assert primary.cancelled == 1
+    assert scheduler.stats["hedges"] == 1 and scheduler.stats["fallback_wins"] == 1
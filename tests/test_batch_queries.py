@@ -0,0 +1,60 @@
+from src.alphasignal.core.fund_engine import FundEngine
+from src.alphasignal.infra.cache.single_flight import RedisLock
+from src.alphasignal.providers.market.tencent_parser import Quote, QuoteIndex
+
+N = 200
+
+
+def _engine(mocker):
+    codes = [f"F{i:03d}" for i in range(N)]
+    holdings = {c: [{"stock_code": "600519", "stock_name": "茅台", "weight": 5.0, "report_date": "2025-09-30"},
+                    {"stock_code": "00700", "stock_name": "腾讯", "weight": 3.0, "report_date": "2025-09-30"}]
+                for c in codes}
+    db = mocker.MagicMock()
+    db.get_fund_metadata_batch.side_effect = lambda cs: {c: {"name": f"基金{c}", "type": "股票型"} for c in cs}
+    db.get_fund_relationships_batch.return_value = {"F000": {"parent_code": "510300", "ratio": 0.95,
+                                                             "relation_type": "ETF_FEEDER"}}
+    db.get_fund_holdings_batch.side_effect = lambda cs: {c: holdings[c] for c in cs}
+    db.get_calibration_batch.return_value = {"F001": {"bias": 0.1, "avg_mae": 0.1, "sample_count": 5, "recent": []}}
+    db.get_holdings_fingerprint.return_value = "400:x"
+    db.get_all_fund_holdings.return_value = [(c, h["stock_code"], h["weight"]) for c in codes for h in holdings[c]]
+
+    engine = FundEngine(db=db)
+    engine.redis = None
+    engine._locks = RedisLock(None)
+    quotes = QuoteIndex()
+    for secid, code, pct in (("sh600519", "600519", 2.0), ("hk00700", "00700", -1.0), ("sh510300", "510300", 1.0)):
+        quotes.add(Quote(secid, code, code, 10.0, pct))
+    mocker.patch.object(engine, "_fetch_quotes", return_value=quotes)
+    return engine, db, codes
+
+
+def test_batch_valuation_query_count_is_constant(mocker):
+    engine, db, codes = _engine(mocker)
+
+    results = engine.calculate_batch_valuation(codes, use_cache=False)
+    assert len(results) == N
+    cold = len(db.method_calls)
+    assert cold <= 6
+
+    db.reset_mock()
+    results = engine.calculate_batch_valuation(codes, use_cache=False)
+    # metadata + relationships + calibration; holdings come from the in-process cache
+    assert sorted(name for name, _, _ in db.method_calls) == [
+        "get_calibration_batch", "get_fund_metadata_batch", "get_fund_relationships_batch"]
+    by_code = {r["fund_code"]: r for r in results}
+    assert by_code["F000"]["estimated_growth"] == 0.95
+    assert by_code["F002"]["estimated_growth"] == round((5 * 2.0 - 3 * 1.0) / 8, 4)
+    assert by_code["F001"]["estimated_growth"] == round((5 * 2.0 - 3 * 1.0) / 8 - 0.1, 4)
+
+
+def test_holdings_cache_reloads_only_changed_report_dates(mocker):
+    engine, db, codes = _engine(mocker)
+    engine.calculate_batch_valuation(codes[:3], use_cache=False)
+
+    db.get_holdings_fingerprint.return_value = "401:y"
+    db.get_holdings_report_dates.return_value = {"F001": "2025-09-30", "F002": "2025-12-31"}
+    engine.invalidate_holdings_matrix()
+    db.get_fund_holdings_batch.reset_mock()
+    engine._get_holdings_batch(codes[1:3])
+    db.get_fund_holdings_batch.assert_called_once_with(["F002"])
@@ -0,0 +1,32 @@
+import pytest
+from src.alphasignal.core import database
+from src.alphasignal.core.database import IntelligenceDB
+
+
+@pytest.fixture(autouse=True)
+def reset_schema_flag(monkeypatch):
+    monkeypatch.setattr(database, "_schema_ready", False)
+
+
+def test_schema_bootstrap_runs_once_per_process(mocker):
+    init = mocker.patch.object(IntelligenceDB, "_init_db", return_value=True)
+    for _ in range(5):
+        IntelligenceDB(auto_migrate=True)
+    assert init.call_count == 1
+
+
+def test_failed_bootstrap_is_retried(mocker):
+    init = mocker.patch.object(IntelligenceDB, "_init_db", side_effect=[False, True, True])
+    IntelligenceDB(auto_migrate=True)
+    IntelligenceDB(auto_migrate=True)
+    IntelligenceDB(auto_migrate=True)
+    assert init.call_count == 2
+
+
+def test_auto_migrate_disabled_and_forced(mocker):
+    init = mocker.patch.object(IntelligenceDB, "_init_db", return_value=True)
+    db = IntelligenceDB(auto_migrate=False)
+    assert init.call_count == 0
+    db.ensure_schema(force=True)
+    db.ensure_schema(force=True)
+    assert init.call_count == 2
@@ -0,0 +1,117 @@
+import gc
+import pytest
+import psycopg2.extensions
+from src.alphasignal.infra.database.pool import PostgresPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+        self.conn.in_tx = True
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.in_tx = False
+        self.broken = False
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.in_tx:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        if self.broken:
+            raise Exception("connection lost")
+        self.rollbacks += 1
+        self.in_tx = False
+
+    def commit(self):
+        self.in_tx = False
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def made():
+    return []
+
+
+@pytest.fixture
+def pool(made):
+    def connect(**kwargs):
+        conn = FakeConn()
+        made.append(conn)
+        return conn
+    return PostgresPool(min_size=1, max_size=2, timeout=0.05, health_check_interval=0, connect=connect)
+
+
+def test_connections_are_reused(pool, made):
+    for _ in range(10):
+        conn = pool.getconn()
+        conn.cursor().execute("SELECT 1")
+        conn.commit()
+        conn.close()
+    assert len(made) == 1
+    assert pool.stats()["checkouts"] == 10
+
+
+def test_close_is_idempotent_and_rolls_back(pool, made):
+    conn = pool.getconn()
+    conn.cursor().execute("UPDATE x SET y = 1")
+    conn.close()
+    conn.close()
+    assert made[0].rollbacks >= 1
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+def test_exhaustion_times_out(pool):
+    a, b = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    a.close()
+    c = pool.getconn()
+    c.close()
+    b.close()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_broken_idle_connection_is_replaced(pool, made):
+    conn = pool.getconn()
+    conn.close()
+    made[0].broken = True
+    with pool.connection() as fresh:
+        assert fresh._raw is made[1]
+    assert pool.stats()["discarded"] == 1
+
+
+def test_leaked_connection_is_reclaimed(pool):
+    def leak():
+        pool.getconn()  # never closed
+    leak()
+    gc.collect()
+    stats = pool.stats()
+    assert stats["leaks_reclaimed"] == 1
+    assert stats["in_use"] == 0
+    # Slot is free again
+    a, b = pool.getconn(), pool.getconn()
+    a.close()
+    b.close()
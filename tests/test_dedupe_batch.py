@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src.alphasignal.core.deduplication import NewsDeduplicator
+from src.alphasignal.core.embedding_backends import EmbeddingBackend
+
+
+class _TopicModel(EmbeddingBackend):
+    """Maps each text to the unit vector of the first known topic word it contains."""
+    name = "topics"
+    TOPICS = ["gold", "fed", "oil", "yen"]
+
+    def __init__(self):
+        super().__init__("topics")
+        self.calls = []
+
+    def _load(self):
+        return object()
+
+    def _encode(self, model, texts, batch_size):
+        self.calls.append(list(texts))
+        out = []
+        for text in texts:
+            v = np.full(len(self.TOPICS), 0.01, dtype=np.float32)
+            v[next(i for i, t in enumerate(self.TOPICS) if t in text.lower())] = 1.0
+            out.append(v)
+        return np.stack(out)
+
+
+def _dedup(model):
+    return NewsDeduplicator(window_hours=24, capacity=100, backend=model)
+
+
+def test_batch_encodes_once_and_catches_in_batch_duplicates():
+    model = _TopicModel()
+    d = _dedup(model)
+    contents = [
+        "Gold rallies as central banks keep buying bullion through the quarter",
+        "Gold rallies as central banks keep buying bullion through the quarter",   # exact repeat
+        "Bullion demand lifts GOLD prices while miners report record output",     # same topic, new wording
+        "Fed officials signal patience on rate cuts amid sticky services inflation",
+        "",
+    ]
+    verdicts = d.check_batch(contents, record_ids=[1, 2, 3, 4, 5])
+
+    assert [dup for dup, _ in verdicts] == [False, True, True, False, False]
+    # Exact repeat is dropped by SimHash before encoding; one model call for the rest
+    assert len(model.calls) == 1 and len(model.calls[0]) == 3
+    assert verdicts[0][1] is not None and verdicts[4][1] is None
+    assert [rid for rid, _ in d.most_similar(verdicts[3][1], k=2)] == [4, 1]
+
+
+def test_batch_sees_prior_history_and_single_item_path():
+    model = _TopicModel()
+    d = _dedup(model)
+    [(dup, vector)] = d.check_batch(["Oil slides after OPEC+ agrees to lift output from next month"])
+    assert not dup and vector is not None
+    verdicts = d.check_batch(["Crude oil benchmarks extend losses on supply worries", "Yen weakens past 150 per dollar"])
+    assert [dup for dup, _ in verdicts] == [True, False]
+    assert d.is_duplicate("Traders dump oil futures as inventories swell") is True
+
+
+def test_failed_backend_disables_semantic_stage_only():
+    class _Broken(EmbeddingBackend):
+        name = "broken"
+
+        def _load(self):
+            raise OSError("model files missing")
+
+        def _encode(self, model, texts, batch_size):
+            raise AssertionError("never loaded")
+
+    d = NewsDeduplicator(window_hours=24, capacity=100, backend=_Broken("x"))
+    d.warm_up(background=False)
+    assert d.model is False
+    verdicts = d.check_batch(["Gold rallies on safe-haven demand", "Gold rallies on safe-haven demand"])
+    assert verdicts == [(False, None), (True, None)]
+
+
+def test_incomplete_backend_fails_at_construction():
+    class _NoEncode(EmbeddingBackend):
+        def _load(self):
+            return object()
+
+    with pytest.raises(TypeError):
+        _NoEncode("x")
@@ -0,0 +1,36 @@
+import time
+
+import numpy as np
+
+from src.alphasignal.core.embedding_buffer import EmbeddingRingBuffer
+
+
+def test_matches_cosine_and_top_k():
+    rng = np.random.default_rng(5)
+    vecs = rng.normal(size=(300, 32))
+    buf = EmbeddingRingBuffer(capacity=1000)
+    for i, v in enumerate(vecs):
+        buf.add(v * rng.uniform(0.5, 3), record_id=f"r{i}")
+
+    probe = vecs[42] + rng.normal(scale=0.05, size=32)
+    norm = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    cos = norm @ (probe / np.linalg.norm(probe))
+    assert buf.any_above(probe, 0.9) == bool((cos > 0.9).any())
+    assert not buf.any_above(rng.normal(size=32), 0.99)
+
+    top = buf.top_k(probe, k=3)
+    assert [rid for rid, _ in top] == [f"r{i}" for i in np.argsort(-cos)[:3]]
+    assert abs(top[0][1] - cos.max()) < 1e-5
+
+
+def test_ring_overwrites_oldest_and_window_hides_expired():
+    buf = EmbeddingRingBuffer(capacity=3, window_seconds=100)
+    now = time.time()
+    basis = np.eye(4)
+    buf.add(basis[0], "a", now - 500)   # expired
+    buf.add(basis[1], "b", now)
+    buf.add(basis[2], "c", now)
+    assert len(buf) == 2 and not buf.any_above(basis[0], 0.5)
+    buf.add(basis[3], "d", now)         # overwrites "a"
+    assert [rid for rid, _ in buf.top_k(basis[3], k=1)] == ["d"]
+    assert sorted(buf.similarities(basis[1])[0]) == ["b", "c", "d"]
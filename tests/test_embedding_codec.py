@@ -0,0 +1,46 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from src.alphasignal.core.embedding_buffer import EmbeddingRingBuffer
+from src.alphasignal.core.embedding_codec import (
+    EmbeddingFormatError, decode_embedding, decode_legacy, encode_embedding, is_encoded, read_header,
+)
+
+
+def test_roundtrip_is_zero_copy_and_smaller_than_pickle():
+    vec = np.random.default_rng(1).normal(size=384).astype(np.float32)
+    blob = encode_embedding(vec, "mini-lm")
+    assert is_encoded(blob) and read_header(blob) == (1, 384, "mini-lm")
+    assert len(blob) < len(pickle.dumps(vec))
+
+    view = memoryview(blob)   # what psycopg2 hands back for BYTEA
+    out, model = decode_embedding(view)
+    assert model == "mini-lm" and np.array_equal(out, vec)
+    assert not out.flags.owndata and not out.flags.writeable
+    with pytest.raises(EmbeddingFormatError):
+        decode_embedding(blob[:-4])
+
+
+def test_legacy_pickles_decode_but_only_as_ndarrays():
+    vec = np.arange(8, dtype=np.float64)
+    assert np.array_equal(decode_legacy(pickle.dumps(vec)), vec.astype(np.float32))
+    assert not is_encoded(pickle.dumps(vec))
+    with pytest.raises(pickle.UnpicklingError):
+        decode_legacy(pickle.dumps(os.getcwd))
+
+
+def test_bulk_load_matches_incremental_adds():
+    rng = np.random.default_rng(2)
+    vecs = rng.normal(size=(7, 16))
+    one, bulk = EmbeddingRingBuffer(capacity=5), EmbeddingRingBuffer(capacity=5)
+    for i, v in enumerate(vecs):
+        one.add(v, record_id=i, timestamp=1e12 + i)
+    bulk.add_many(vecs[:2], [0, 1], [1e12, 1e12 + 1])
+    bulk.add_many([decode_embedding(encode_embedding(v))[0] for v in vecs[2:]], range(2, 7), 1e12 + np.arange(2, 7))
+
+    probe = vecs[4]
+    assert one.top_k(probe, k=5) == pytest.approx(bulk.top_k(probe, k=5))
+    assert sorted(bulk.similarities(probe)[0]) == [2, 3, 4, 5, 6]
@@ -0,0 +1,62 @@
+from src.alphasignal.core.fund_revaluation import IncrementalRevaluer, ReverseIndex
+
+LINKS = [
+    ("F1", "600519", "holding"), ("F1", "00700", "holding"),
+    ("F2", "600519", "holding"), ("F2", "300750", "holding"),
+    ("F3", "600036", "holding"), ("F3", "510300", "parent"),   # shadow fund: parent only
+]
+HOLDINGS = [link for link in LINKS if link[2] == 'holding']
+
+
+def test_reverse_index_maps_securities_to_funds():
+    index = ReverseIndex(LINKS)
+    assert index.fund_count == 3
+    assert index.affected(["sh600519"]) == {"F1", "F2"}
+    assert index.affected(["hk00700", "sz300750"]) == {"F1", "F2"}
+    assert index.affected(["sh510300"]) == {"F3"}
+    assert index.affected(["sh600036", "sz000001"]) == set()
+
+
+def test_tick_revalues_only_affected_funds_and_publishes_moves(mocker):
+    engine = mocker.MagicMock()
+    engine.db.get_watchlist_links.return_value = HOLDINGS
+    engine.db.get_watchlist_all_codes.return_value = ["F1", "F2", "F3"]
+    engine._resolve_relationships.return_value = {"F3": {"parent_code": "510300"}}
+    growth = {"F1": 1.0, "F2": 0.5, "F3": 0.2}
+    engine.calculate_batch_valuation.side_effect = lambda codes, use_cache=True: [
+        {"fund_code": c, "estimated_growth": growth[c]} for c in codes
+    ]
+    publish = mocker.patch("src.alphasignal.infra.stream.broadcaster.hub.publish_sync")
+    revaluer = IncrementalRevaluer(engine=engine, rebuild_interval=300)
+
+    revaluer.on_tick(None, ["hk00700"])
+    engine.calculate_batch_valuation.assert_called_once_with(["F1"], use_cache=False)
+    assert publish.call_count == 1
+
+    # F1 unchanged, F2 new: only F2 is republished
+    revaluer.on_tick(None, ["sh600519"])
+    assert engine.calculate_batch_valuation.call_args[0][0] == ["F1", "F2"]
+    assert [c.args[1]["fund_code"] for c in publish.call_args_list] == ["F1", "F2"]
+
+    # Nothing watched moved: no valuation work at all
+    revaluer.on_tick(None, ["sz000001"])
+    assert engine.calculate_batch_valuation.call_count == 2
+    assert revaluer.stats()["unchanged"] == 1
+
+
+def test_heuristic_parent_funds_are_indexed_under_their_parent(mocker):
+    from src.alphasignal.core.fund_engine import FundEngine
+
+    db = mocker.MagicMock()
+    db.get_watchlist_links.return_value = HOLDINGS + [("F4", "000001", "holding")]
+    db.get_watchlist_all_codes.return_value = ["F1", "F2", "F3", "F4"]
+    db.get_fund_names.return_value = {"F4": "天弘沪深300指数C"}
+    db.get_fund_relationships_batch.return_value = {"F3": {"parent_code": "510300"}}
+    engine = FundEngine(db=db)
+    revaluer = IncrementalRevaluer(engine=engine, rebuild_interval=300)
+
+    revaluer.rebuild()
+    # F4 has no stored relationship; the index-proxy heuristic prices it off 沪深300
+    assert revaluer.index.affected(["sh000300"]) == {"F4"}
+    assert revaluer.index.affected(["sz000001"]) == set()
+    assert revaluer.index.affected(["sh510300"]) == {"F3"}
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from src.alphasignal.providers.market.fx_snapshot import FxSnapshot, parse_fx_frame
+
+
+def _frame():
+    return pd.DataFrame({
+        "货币对": ["美元人民币", "港元人民币", "日元人民币", "欧元人民币", "美元指数"],
+        "最新价": [7.2, 0.92, 0.048, 7.8, 104.0],
+        "涨跌幅": [0.1, 0.05, -0.3, 0.2, -0.1],
+    })
+
+
+def test_one_upstream_call_serves_every_lookup():
+    calls = []
+    snap = FxSnapshot(ttl=60, fetcher=lambda: calls.append(1) or _frame())
+    snap.redis = None
+
+    changes = [snap.get_change(pair) for pair in ["USD/CNY", "HKD/CNY", "JPY/CNY"] * 14]
+    assert len(calls) == 1
+    assert changes[:3] == [0.1, 0.05, -0.3]
+    assert snap.get_change("EUR/CNY") == 0.2 and snap.get_change("XXX/CNY") == 0.0
+    assert snap.stats()["fetches"] == 1
+
+
+def test_failed_refresh_keeps_previous_snapshot():
+    frames = [_frame()]
+
+    def fetch():
+        if not frames:
+            raise ConnectionError("sina down")
+        return frames.pop()
+
+    snap = FxSnapshot(ttl=0, fetcher=fetch)
+    snap.redis = None
+    assert snap.get_change("USD/CNY") == 0.1
+    assert snap.get_change("USD/CNY") == 0.1  # refresh failed, previous values served
+    assert snap.stats()["errors"] == 1
+
+
+def test_parse_falls_back_to_price_and_close():
+    df = pd.DataFrame({"外汇名称": ["美元人民币"], "最新价": [7.27], "昨收": [7.2]})
+    assert round(parse_fx_frame(df)["USD/CNY"], 4) == round(0.07 / 7.2 * 100, 4)
+
+
+def test_macro_dxy_reuses_the_fx_snapshot_fetch(mocker):
+    from src.alphasignal.providers.market import macro_context
+
+    calls = []
+    snap = FxSnapshot(ttl=60, fetcher=lambda: calls.append(1) or _frame())
+    snap.redis = None
+    mocker.patch.object(macro_context, "get_fx_snapshot", return_value=snap)
+
+    assert snap.get_change("USD/CNY") == 0.1
+    assert macro_context._dxy() == 104.0 and snap.get_price("USD Index", "美元指数") == 104.0
+    assert len(calls) == 1 and snap.stats()["lookups"] == 3
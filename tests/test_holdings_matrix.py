@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.alphasignal.core.holdings_matrix import HoldingsMatrix
+from src.alphasignal.core.market_snapshot import value_holdings
+
+ROWS = [
+    ("F1", "600519", 9.0), ("F1", "00700", 8.0), ("F1", "601318", 5.0),
+    ("F2", "600519", 4.0), ("F2", "300750", 6.0),
+    ("F3", "999999", 3.0),
+]
+QUOTES = {"600519": {"price": 1500.0, "change_pct": 2.0},
+          "00700": {"price": 300.0, "change_pct": -1.5},
+          "300750": {"price": 200.0, "change_pct": 3.5}}
+INDUSTRY = {"600519": {"l1": "食品饮料", "l2": "白酒"}, "300750": {"l1": "电力设备", "l2": "电池"},
+            "601318": {"l1": "非银金融", "l2": "保险"}, "00700": {"l1": "传媒", "l2": None}}
+
+
+def test_matrix_matches_per_fund_valuation():
+    m = HoldingsMatrix.from_rows(ROWS, fingerprint="fp1")
+    assert m.shape == (3, 5)
+    pcts, found = m.quote_vector_from_map(QUOTES)
+    growth, covered = m.valuate(pcts, found)
+    m.build_sector_index(INDUSTRY)
+    sectors = m.sector_attribution(pcts, found, m.fund_rows(["F2", "F1"]))
+
+    for f_code in ("F1", "F2", "F3"):
+        rows = [r for r in ROWS if r[0] == f_code]
+        codes = [r[1] for r in rows]
+        found_f = np.array([c in QUOTES for c in codes])
+        pcts_f = np.array([QUOTES[c]["change_pct"] if c in QUOTES else 0.0 for c in codes])
+        impact, weight, _, exp_sectors = value_holdings(
+            codes, codes, [r[2] for r in rows], pcts_f, pcts_f, found_f, industry_map=INDUSTRY)
+        i = m.fund_rows([f_code])[0]
+        assert np.isclose(covered[i], weight)
+        assert np.isclose(growth[i], impact * 100 / weight if weight else 0.0)
+        if f_code in ("F1", "F2"):
+            got = sectors[["F2", "F1"].index(f_code)]
+            assert got.keys() == exp_sectors.keys()
+            for l1, s in exp_sectors.items():
+                assert np.isclose(got[l1]["impact"], s["impact"])
+                assert np.isclose(got[l1]["weight"], s["weight"])
+                assert got[l1]["sub"].keys() == s["sub"].keys()
+
+    assert m.fund_rows(["F9"])[0] == -1
+
+
+def test_engine_rebuilds_matrix_only_when_fingerprint_changes(mocker):
+    from src.alphasignal.core.fund_engine import FundEngine
+
+    db = mocker.MagicMock()
+    db.get_holdings_fingerprint.side_effect = ["fp1", "fp1", "fp2"]
+    db.get_all_fund_holdings.side_effect = [ROWS, ROWS[:2]]
+    engine = FundEngine(db=db)
+
+    first = engine._get_holdings_matrix()
+    assert engine._get_holdings_matrix() is first  # within check interval: no DB hit
+    engine.invalidate_holdings_matrix()
+    assert engine._get_holdings_matrix() is first  # fingerprint unchanged
+    engine.invalidate_holdings_matrix()
+    second = engine._get_holdings_matrix()
+    assert second is not first and second.shape == (1, 2)
+    assert db.get_all_fund_holdings.call_count == 2
+
+
+def test_row_matches_detects_reweighted_holdings():
+    m = HoldingsMatrix.from_rows(ROWS)
+    row = m.fund_rows(["F2"])[0]
+    same = [{"stock_code": "300750", "weight": 6.0}, {"stock_code": "600519", "weight": 4.0}]
+    reweighted = [{"stock_code": "600519", "weight": 7.0}, {"stock_code": "300750", "weight": 3.0}]
+    assert m.row_matches(row, same)
+    assert not m.row_matches(row, reweighted)          # same holding count, different weights
+    assert not m.row_matches(row, same[:1])
+    assert not m.row_matches(-1, same)
+
+
+def test_sector_index_not_cached_from_empty_industry_map(mocker):
+    from src.alphasignal.core.fund_engine import FundEngine
+
+    engine = FundEngine(db=mocker.MagicMock())
+    m = HoldingsMatrix.from_rows(ROWS)
+    industry = mocker.patch.object(engine, "_get_industry_map", side_effect=[{}, INDUSTRY])
+    assert engine._ensure_sector_index(m) is False and not m.has_sector_index
+    assert engine._ensure_sector_index(m) is True and m.has_sector_index
+    assert engine._ensure_sector_index(m) is True and industry.call_count == 2
+
+
+def test_quote_vector_scatters_quote_index_aliases():
+    from src.alphasignal.providers.market.tencent_parser import Quote, QuoteIndex
+
+    m = HoldingsMatrix.from_rows(ROWS)
+    index = QuoteIndex()
+    index.add(Quote("sh600519", "600519", "茅台", 1500.0, 2.0))
+    index.add(Quote("hk00700", "00700", "腾讯", 300.0, -1.5))
+    index.add(Quote("sz000001", "000001", "平安银行", 10.0, 0.5))   # not in the matrix
+    pcts, found = m.quote_vector_from_map(index)
+    expected_pcts, expected_found = m.quote_vector_from_map(
+        {"600519": {"change_pct": 2.0}, "00700": {"change_pct": -1.5}})
+    assert np.array_equal(found, expected_found) and np.allclose(pcts, expected_pcts)
+    assert found.sum() == 2 and pcts[list(m.sec_codes).index("00700")] == -1.5
+    assert not m.quote_vector_from_map({})[1].any()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from src.alphasignal.providers.llm.limits import LoopLocal, ProviderLimiter
+
+
+def test_concurrency_timeouts_and_latency_stats():
+    limiter = ProviderLimiter("test", concurrency=2, timeout=0.2)
+    peak = {"now": 0, "max": 0}
+
+    async def work(delay):
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+        try:
+            await asyncio.sleep(delay)
+            return delay
+        finally:
+            peak["now"] -= 1
+
+    async def go():
+        ok = await asyncio.gather(*(limiter.call(lambda: work(0.02)) for _ in range(6)))
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.call(lambda: work(1.0))
+        return ok
+
+    assert asyncio.run(go()) == [0.02] * 6
+    stats = limiter.stats()
+    assert peak["max"] == 2
+    assert stats["requests"] == 7 and stats["timeouts"] == 1 and stats["in_flight"] == 0
+    assert 15 <= stats["single_p50_ms"] <= stats["single_p99_ms"] < 200
+
+
+def test_rpm_throttles_and_loop_local_clients_follow_the_loop():
+    limiter = ProviderLimiter("test", concurrency=10, rpm=600)   # 10 req/s, burst 600
+    limiter._requests.level = 1                                   # start with the bucket drained
+
+    async def go():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.call(lambda: asyncio.sleep(0)) for _ in range(4)))
+        return time.monotonic() - started
+
+    assert asyncio.run(go()) >= 0.25   # 3 requests over budget at 10/s
+    assert limiter.stats()["throttled_seconds"] > 0
+
+    clients = LoopLocal(object)
+
+    async def grab():
+        return clients.get(), clients.get()
+
+    a1, a2 = asyncio.run(grab())
+    b1, _ = asyncio.run(grab())
+    assert a1 is a2 and a1 is not b1
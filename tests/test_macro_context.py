@@ -0,0 +1,58 @@
+from src.alphasignal.providers.market.macro_context import MacroContext
+
+
+def _context(values, ttl=60):
+    calls = {k: 0 for k in values}
+
+    def fetcher(ticker):
+        def fetch():
+            calls[ticker] += 1
+            value = values[ticker]
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return fetch
+
+    ctx = MacroContext(ttl=ttl, series={**{k: fetcher(k) for k in values}, "^GVZ": None})
+    ctx.redis = None
+    return ctx, calls
+
+
+def test_items_in_one_cycle_share_one_fetch_per_series():
+    ctx, calls = _context({"DX-Y.NYB": 104.2, "^TNX": 4.25, "GC=F": 2650.5})
+    for _ in range(50):
+        assert ctx.get("DX-Y.NYB") == 104.2 and ctx.get("GC=F") == 2650.5 and ctx.get("^GVZ") is None
+    assert calls == {"DX-Y.NYB": 1, "^TNX": 1, "GC=F": 1}
+    assert ctx.snapshot()["as_of"] is not None
+
+
+def test_failed_series_keeps_previous_value():
+    values = {"DX-Y.NYB": 104.2, "^TNX": 4.25, "GC=F": 2650.5}
+    ctx, calls = _context(values, ttl=0)
+    ctx.refresh()
+    values["^TNX"] = ConnectionError("timeout")
+    values["DX-Y.NYB"] = 104.5
+    snap = ctx.refresh()
+    assert snap["values"]["^TNX"] == 4.25 and snap["values"]["DX-Y.NYB"] == 104.5
+    assert ctx.stats()["errors"] == 1
+
+
+def test_total_failure_keeps_snapshot_age_and_partial_reports_oldest(mocker):
+    values = {"DX-Y.NYB": 104.2, "^TNX": 4.25, "GC=F": 2650.5}
+    ctx, calls = _context(values, ttl=0)
+    clock = mocker.patch("src.alphasignal.providers.market.macro_context.time.time", return_value=1000.0)
+    first = ctx.refresh()
+    assert first["as_of"].timestamp() == 1000.0
+
+    # Every series fails: nothing is republished as fresh
+    for k in values:
+        values[k] = ConnectionError("down")
+    clock.return_value = 2000.0
+    assert ctx.refresh(force=True) == first and ctx.stats()["refreshes"] == 1
+
+    # Only one series recovers: as_of stays at the oldest value's fetch time
+    values["GC=F"] = 2660.0
+    clock.return_value = 3000.0
+    snap = ctx.refresh(force=True)
+    assert snap["values"]["GC=F"] == 2660.0 and snap["values"]["^TNX"] == 4.25
+    assert snap["as_of"].timestamp() == 1000.0
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from src.alphasignal.core.market_snapshot import MarketSnapshot, join_snapshots, value_holdings
+
+
+def _legacy_valuation(holdings, quote_map, industry_map):
+    """Reference: the original per-row loop from calculate_realtime_valuation."""
+    total_impact, total_weight, sector_stats = 0.0, 0.0, {}
+    for h in holdings:
+        code, weight = h['code'], h['weight']
+        quote = quote_map.get(code)
+        impact = 0.0
+        if quote:
+            impact = quote['change_pct'] * (weight / 100.0)
+            total_impact += impact
+            total_weight += weight
+        info = industry_map.get(code, {})
+        l1, l2 = info.get('l1') or "其他", info.get('l2') or "其他"
+        s1 = sector_stats.setdefault(l1, {"impact": 0.0, "weight": 0.0, "sub": {}})
+        s1["impact"] += impact
+        s1["weight"] += weight
+        s2 = s1["sub"].setdefault(l2, {"impact": 0.0, "weight": 0.0})
+        s2["impact"] += impact
+        s2["weight"] += weight
+    return total_impact, total_weight, sector_stats
+
+
+def test_snapshot_lookup_and_valuation_match_legacy_loop():
+    df_a = pd.DataFrame({
+        '代码': ['600519', '000001', '300750', '601318', '600519'],
+        '名称': ['茅台', '平安银行', '宁德时代', '中国平安', '茅台'],
+        '最新价': [1500.0, 10.0, 200.0, None, 1510.0],
+        '涨跌幅': [1.0, -2.0, 3.5, None, 2.0],
+    })
+    df_hk = pd.DataFrame({'代码': ['00700'], '名称': ['腾讯'], '最新价': [300.0], '涨跌幅': [-1.5]})
+    snaps = [MarketSnapshot.from_frame('a', df_a), MarketSnapshot.from_frame('hk', df_hk)]
+    assert len(snaps[0]) == 4  # duplicated code collapsed, last row wins
+
+    holdings = [
+        {'code': '600519', 'weight': 9.0},
+        {'code': '00700', 'weight': 8.0},
+        {'code': '601318', 'weight': 5.0},   # suspended -> no quote
+        {'code': '300750', 'weight': 6.0},
+        {'code': '999999', 'weight': 2.0},   # unknown
+    ]
+    industry_map = {
+        '600519': {'l1': '食品饮料', 'l2': '白酒'},
+        '300750': {'l1': '电力设备', 'l2': '电池'},
+        '601318': {'l1': '非银金融', 'l2': '保险'},
+        '00700': {'l1': '传媒', 'l2': None},
+    }
+    codes = [h['code'] for h in holdings]
+    prices, pcts, found = join_snapshots(snaps, codes)
+    assert found.tolist() == [True, True, False, True, False]
+    assert snaps[0].get('600519') == {'price': 1510.0, 'change_pct': 2.0}
+
+    total_impact, total_weight, components, sectors = value_holdings(
+        codes, codes, [h['weight'] for h in holdings], prices, pcts, found, industry_map=industry_map
+    )
+
+    quote_map = {c: {'change_pct': float(pcts[i])} for i, c in enumerate(codes) if found[i]}
+    exp_impact, exp_weight, exp_sectors = _legacy_valuation(holdings, quote_map, industry_map)
+    assert np.isclose(total_impact, exp_impact)
+    assert total_weight == exp_weight
+    assert list(sectors) == list(exp_sectors)
+    for l1, s in exp_sectors.items():
+        assert np.isclose(sectors[l1]["impact"], s["impact"])
+        assert sectors[l1]["weight"] == s["weight"]
+        assert sectors[l1]["sub"].keys() == s["sub"].keys()
+    assert components[2]["note"] == "No Quote"
+    assert components[1]["change_pct"] == -1.5
+
+
+def test_snapshot_binary_roundtrip():
+    df = pd.DataFrame({'代码': ['000001', '00700'], '名称': ['平安银行', '腾讯控股'],
+                       '最新价': [10.5, None], '涨跌幅': [1.25, None]})
+    snap = MarketSnapshot.from_frame('a', df)
+    back = MarketSnapshot.from_bytes(snap.to_bytes())
+    assert back.version == snap.version and back.market == 'a'
+    assert back.codes.tolist() == ['000001', '00700']
+    assert back.names.tolist() == ['平安银行', '腾讯控股']
+    assert back.get('000001') == {'price': 10.5, 'change_pct': 1.25}
+    assert back.get('00700') is None
+
+
+class _FakeRedis(dict):
+    def get(self, key):
+        return super().get(key)
+
+    def setex(self, key, ttl, value):
+        self[key] = value
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+def test_engine_reuses_decoded_snapshot_until_version_changes(mocker):
+    from src.alphasignal.core.fund_engine import FundEngine
+
+    df = pd.DataFrame({'代码': ['000001'], '名称': ['平安银行'], '最新价': [10.0], '涨跌幅': [1.0]})
+    spot = mocker.patch('src.alphasignal.core.fund_engine.ak.stock_zh_a_spot_em', return_value=df)
+    engine = FundEngine(db=mocker.MagicMock())
+    store = _FakeRedis()
+    engine.redis = engine.redis_bin = store
+
+    first = engine._get_market_snapshot('a')
+    assert engine._get_market_snapshot('a') is first
+    assert spot.call_count == 1
+
+    # Another process published a newer refresh: decode it from Redis, no upstream call
+    newer = MarketSnapshot('a', ['000001'], [11.0], [2.0], version='v2')
+    store['market:snapshot:a:v2'] = newer.to_bytes()
+    store['market:snapshot:a:version'] = 'v2'
+    second = engine._get_market_snapshot('a')
+    assert second.version == 'v2' and second.get('000001')['price'] == 11.0
+    assert spot.call_count == 1
@@ -0,0 +1,77 @@
+from src.alphasignal.providers.llm.base import prompt_content
+from src.alphasignal.utils.prompt_compactor import PromptCompactor
+from src.alphasignal.utils.tokens import estimate_tokens
+
+ARTICLE = """Title: Gold hits record as Fed cut bets grow
+
+Markdown Content:
+[Home](https://x.com) | [Markets](https://x.com/m) | [Commodities](https://x.com/c) | [Login](https://x.com/l)
+
+![logo](https://x.com/logo.png)
+
+# Gold hits record as Fed cut bets grow
+
+Gold prices climbed 1.8% to a record $2,450 an ounce as softer US CPI data boosted bets on a Federal Reserve rate cut. The dollar index fell 0.6%.
+
+Spot silver rose 2% while [10-year Treasury yields](https://x.com/t) slipped to 4.1%.
+
+* [Oil steadies ahead of OPEC meeting](https://x.com/1)
+* [Bitcoin ETF flows slow](https://x.com/2)
+
+Gold prices climbed 1.8% to a record $2,450 an ounce as softer US CPI data boosted bets on a Federal Reserve rate cut. The dollar index fell 0.6%.
+
+The company's annual picnic was held in the park. Attendees enjoyed sandwiches. Music played all afternoon.
+
+Subscribe to our newsletter for daily updates.
+
+© 2024 Example News. All rights reserved.
+"""
+
+
+def test_strips_navigation_links_boilerplate_and_repeats():
+    text, before, after = PromptCompactor(budget=10_000).compact(ARTICLE)
+    assert "Home" not in text and "OPEC" not in text and "https://" not in text and "logo" not in text
+    assert "newsletter" not in text and "All rights reserved" not in text and "Markdown Content" not in text
+    assert text.count("Gold prices climbed") == 1
+    assert "10-year Treasury yields slipped" in text          # inline link kept as its text
+    assert after == estimate_tokens(text) < before
+
+
+def test_budget_keeps_relevant_sentences_in_order():
+    compactor = PromptCompactor(budget=70)
+    text, _, after = compactor.compact(ARTICLE)
+    assert after <= 70
+    assert "Gold prices climbed" in text and "picnic" not in text
+    assert text.index("Gold hits record") < text.index("Gold prices climbed")
+    stats = compactor.stats()
+    assert stats["truncated"] == 1 and stats["saved_pct"] > 50
+
+
+def test_only_full_text_items_get_prompt_content():
+    crawled = {"id": 1, "content": ARTICLE, "extraction_method": "JINA_READER"}
+    summary = {"id": 2, "content": "Gold edges higher.", "extraction_method": "RSS_SUMMARY"}
+    PromptCompactor(budget=70).compact_items([crawled, summary])
+    assert crawled["content"] == ARTICLE and crawled["prompt_tokens_saved"] > 0
+    assert prompt_content(crawled) == crawled["prompt_content"]
+    assert "prompt_content" not in summary and prompt_content(summary) == "Gold edges higher."
+
+
+def test_sentences_mentioning_boilerplate_words_survive():
+    article = "\n\n".join([
+        "注册制改革持续推进，市场风险偏好回升，金价小幅回落。",
+        "Analysts recommended adding gold exposure as Fed cut odds rose.",
+        "版权交易平台数据显示，央行购金需求仍然强劲。",
+        "Cookie-cutter rate cuts are unlikely, the Fed said.",
+        "订阅",
+        "登录 / 注册",
+        "Recommended for you",
+        "Copyright 2024 Example News",
+    ])
+    text, _, _ = PromptCompactor(budget=10_000).compact(article)
+    paragraphs = text.split("\n\n")
+    assert paragraphs == [
+        "注册制改革持续推进，市场风险偏好回升，金价小幅回落。",
+        "Analysts recommended adding gold exposure as Fed cut odds rose.",
+        "版权交易平台数据显示，央行购金需求仍然强劲。",
+        "Cookie-cutter rate cuts are unlikely, the Fed said.",
+    ]
@@ -0,0 +1,137 @@
+import time
+
+from src.alphasignal.providers.market.tencent_parser import Quote, QuoteIndex
+from src.alphasignal.services.quote_book import QuoteBook
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.kv, self.hashes, self.sets = {}, {}, {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hmget(self, key, fields):
+        h = self.hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.kv:
+            return False
+        self.kv[key] = str(value)
+        return True
+
+    def get(self, key):
+        return self.kv.get(key)
+
+    def expire(self, key, ttl):
+        pass
+
+    def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(values)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+
+class _FakeClient:
+    def __init__(self):
+        self.requested = []
+
+    def fetch(self, secids):
+        secids = list(secids)
+        self.requested.append(sorted(secids))
+        index = QuoteIndex()
+        for s in secids:
+            index.add(Quote(s, s[2:], f"name-{s}", 10.0, 1.0))
+        return index
+
+
+def _book(mocker, store, client, db=None):
+    book = QuoteBook(db=db or mocker.MagicMock(), client=client, interval=1, max_age=30, universe_refresh=300)
+    book.redis = store
+    return book
+
+
+def test_poller_publishes_universe_and_other_process_reads_from_redis(mocker):
+    db = mocker.MagicMock()
+    db.get_quote_universe.return_value = (["600519", "00700"], ["510300"])
+    store, client = _FakeRedis(), _FakeClient()
+
+    poller = _book(mocker, store, client, db)
+    assert poller.poll_once() == 3
+    assert client.requested == [["hk00700", "sh510300", "sh600519"]]
+
+    reader = _book(mocker, store, _FakeClient())
+    quotes, missing = reader.get_quotes(["sh600519", "hk00700", "sz000001"])
+    assert missing == ["sz000001"]
+    assert quotes.get("600519").price == 10.0 and quotes.get("00700").name == "name-hk00700"
+
+    # Misses are tracked through Redis and included in the next poll
+    reader.track(missing)
+    poller._universe_at = 0
+    poller.poll_once()
+    assert "sz000001" in client.requested[-1]
+
+
+def test_stale_book_is_ignored_during_session(mocker):
+    store, client = _FakeRedis(), _FakeClient()
+    db = mocker.MagicMock()
+    db.get_quote_universe.return_value = (["600519"], [])
+    book = _book(mocker, store, client, db)
+    book.poll_once()
+    mocker.patch.object(book, "_in_session", return_value=True)
+
+    assert book.get_quotes(["sh600519"])[1] == []
+    book._updated_at = time.time() - 120
+    store.kv[QuoteBook.UPDATED_KEY] = str(time.time() - 120)
+    assert book.get_quotes(["sh600519"])[1] == ["sh600519"]
+
+
+def test_poll_reports_changed_secids_to_listeners(mocker):
+    db = mocker.MagicMock()
+    db.get_quote_universe.return_value = (["600519", "000001"], [])
+    client = _FakeClient()
+    book = _book(mocker, _FakeRedis(), client, db)
+    seen = []
+    book.add_listener(lambda quotes, changed: seen.append(sorted(changed)))
+
+    book.poll_once()
+    book.poll_once()
+    moved = QuoteIndex()
+    moved.add(Quote("sh600519", "600519", "n", 10.5, 6.0))
+    moved.add(Quote("sz000001", "000001", "n", 10.0, 1.0))
+    client.fetch = lambda secids: moved
+    book.poll_once()
+    assert seen == [["sh600519", "sz000001"], [], ["sh600519"]]
+
+
+def test_track_during_poll_does_not_disturb_fetch(mocker):
+    import threading
+
+    db = mocker.MagicMock()
+    db.get_quote_universe.return_value = (["600519", "000001"], [])
+    book = _book(mocker, _FakeRedis(), None, db)
+
+    class _TrackingClient(_FakeClient):
+        def fetch(self, secids):
+            def lazy():
+                for i, s in enumerate(secids):
+                    if i == 0:
+                        # A request thread tracks new secids while the poller iterates the universe
+                        t = threading.Thread(target=book.track, args=({"sh600036", "sz300750"},))
+                        t.start()
+                        t.join()
+                    yield s
+            return super().fetch(lazy())
+
+    book.client = _TrackingClient()
+    assert book.poll_once() == 2
+    assert book.poll_once() == 4
+    assert "sh600036" in book.client.requested[-1] and book.stats()["universe"] == 4
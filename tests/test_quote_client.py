@@ -0,0 +1,105 @@
+import threading
+import time
+
+from src.alphasignal.providers.market.tencent_parser import parse_payload
+from src.alphasignal.providers.market.tencent_quotes import TencentQuoteClient
+
+
+def _line(market_code, code, price, pct, name="名称"):
+    parts = [""] * 40
+    parts[1], parts[2], parts[3], parts[32] = name, code, str(price), str(pct)
+    return f'v_{market_code}="{"~".join(parts)}";\n'
+
+
+class _Resp:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeSession:
+    """Answers every secid in the URL; fails the first `fail_first` calls."""
+
+    def __init__(self, fail_first=0, delay=0.0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if call <= self.fail_first:
+                raise ConnectionError("reset by peer")
+            secids = url.split("q=", 1)[1].split(",")
+            return _Resp("".join(_line(s, s[2:], 10.0, 1.5) for s in secids).encode("gbk"))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_parse_payload_aliases_share_one_record():
+    payload = (_line("sh600519", "600519", 1500.0, 2.0, "贵州茅台") + _line("usNVDA", "NVDA.OQ", 120.5, -3.0)
+               + 'v_sz000001="1~bad~000001~-~";\n' + 'v_pv_none_match="1";').encode("gbk")
+    quotes = parse_payload(payload)
+    assert len(quotes) == 2
+    q = quotes["600519"]
+    assert q is quotes["sh600519"]
+    assert (q.name, q.price, q.change_pct) == ("贵州茅台", 1500.0, 2.0)
+    assert q["price"] == 1500.0 and q.get("name") == "贵州茅台"
+    assert quotes["NVDA"] is quotes["NVDA.OQ"] is quotes["usNVDA"]
+    assert "000001" not in quotes
+
+
+def test_chunks_fetched_concurrently_with_retry(mocker):
+    session = _FakeSession(fail_first=1, delay=0.05)
+    client = TencentQuoteClient(chunk_size=10, concurrency=4, retries=2, backoff=0)
+    mocker.patch.object(client, "_session", return_value=session)
+
+    secids = [f"sz{i:06d}" for i in range(80)]
+    quotes = client.fetch(secids)
+
+    assert all(f"{i:06d}" in quotes for i in range(80))
+    assert 1 < session.max_in_flight <= 4
+    stats = client.stats()
+    assert stats["chunks"] == 8 and stats["retries"] == 1 and stats["failed_chunks"] == 0
+
+
+def test_chunk_gives_up_after_retries(mocker):
+    client = TencentQuoteClient(chunk_size=10, concurrency=2, retries=1, backoff=0)
+    mocker.patch.object(client, "_session", return_value=_FakeSession(fail_first=100))
+    assert len(client.fetch(["sh600519"])) == 0
+    assert client.stats()["failed_chunks"] == 1
+
+
+def test_parse_payload_name_with_tilde_trail_byte():
+    # 亊 is encoded as 0x81 0x7E in GBK: the raw '~' split must not shift fields
+    payload = _line("sh600001", "600001", 9.5, 1.2, "亊科技").encode("gbk")
+    q = parse_payload(payload)["600001"]
+    assert (q.name, q.price, q.change_pct) == ("亊科技", 9.5, 1.2)
+
+
+def test_identical_concurrent_chunks_share_one_request(mocker):
+    session = _FakeSession(delay=0.1)
+    client = TencentQuoteClient(chunk_size=10, concurrency=2, retries=0)
+    mocker.patch.object(client, "_session", return_value=session)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.fetch(["sh600519", "sz000001"]))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert session.calls == 1
+    assert all(r["600519"].price == 10.0 for r in results)
+    assert client.stats()["coalesced_chunks"] == 3
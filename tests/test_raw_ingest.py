@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from src.alphasignal.core.database import IntelligenceDB
+
+
+def _db(mocker, existing_counts):
+    db = IntelligenceDB(auto_migrate=False)
+    cursor = mocker.MagicMock()
+    cursor.fetchall.return_value = existing_counts
+    conn = mocker.MagicMock()
+    conn.cursor.return_value = cursor
+    mocker.patch.object(db, "_get_conn", return_value=conn)
+    mocker.patch("src.alphasignal.core.database.get_macro_context").return_value.snapshot.return_value = {
+        "values": {"DX-Y.NYB": 104.0, "^TNX": 4.2, "GC=F": 2650.0}, "as_of": None}
+    return db, cursor
+
+
+def test_many_items_one_metrics_query_one_upsert(mocker):
+    t0 = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    items = [{"id": f"s{i}", "content": f"news {i}", "timestamp": (t0 + timedelta(minutes=20 * i)).isoformat()}
+             for i in range(5)]
+    items.append(dict(items[0]))  # same source_id twice in one batch
+    db, cursor = _db(mocker, [(2, 1)] * 5)
+    upsert = mocker.patch("src.alphasignal.core.database.execute_values",
+                          return_value=[(f"s{i}", 100 + i, True) for i in range(5)])
+    single = mocker.patch.object(db, "save_raw_intelligence")
+
+    ids = db.save_raw_intelligence_many(items)
+
+    assert ids == [100, 101, 102, 103, 104, 100]
+    assert cursor.execute.call_count == 1 and upsert.call_count == 1
+    single.assert_not_called()
+    rows = upsert.call_args[0][2]
+    assert len(rows) == 5
+    # clustering = existing rows in ±1h + earlier batch items in ±1h
+    assert [r[6] for r in rows] == [2, 3, 4, 5, 5]
+    assert rows[0][8] == 104.0 and rows[0][11] == 2650.0
+
+
+def test_items_without_source_id_fall_back_to_single_save(mocker):
+    db, _ = _db(mocker, [(0, 0)])
+    mocker.patch("src.alphasignal.core.database.execute_values", return_value=[("s1", 7, False)])
+    mocker.patch.object(db, "save_raw_intelligence", return_value=9)
+    assert db.save_raw_intelligence_many([{"content": "no id"}, {"id": "s1", "content": "x"}]) == [9, 7]
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+from src.alphasignal.core.rolling_metrics import ITEMS, URGENT, RollingCounters
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data, self.expiry = {}, {}
+
+    def pipeline(self, transaction=True):
+        return _Pipe(self)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def hgetall(self, key):
+        return {k: str(v) for k, v in self.data.get(key, {}).items()}
+
+    def hincrby(self, key, field, n):
+        h = self.data.setdefault(key, {})
+        h[str(field)] = int(h.get(str(field), 0)) + n
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({str(k): v for k, v in mapping.items()})
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def expireat(self, key, when):
+        self.expiry[key] = when
+
+    def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+        self.expiry[dst] = self.expiry.pop(src, None)
+
+
+class _Pipe:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.ops.append((name, a, kw))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*a, **kw) for name, a, kw in self.ops]
+
+
+def test_counters_match_window_definitions():
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    counters = RollingCounters(_FakeRedis(), retention_hours=48, sync_interval=0)
+    assert not counters.ready
+
+    # Startup reconcile: 3 items 30 min ago (1 urgent), 2 items 5h ago (both urgent)
+    counters.reconcile([(now - timedelta(minutes=30), 3, 1), (now - timedelta(hours=5), 2, 2)])
+    assert counters.ready
+    assert counters.metrics(now) == (3, 3.0)
+
+    counters.record(ITEMS, [now + timedelta(minutes=10)])
+    counters.record(URGENT, [now - timedelta(hours=5)], -1)
+    counters.record(ITEMS, [now - timedelta(days=10)])  # outside retention: ignored
+    assert counters.metrics(now) == (4, 2.0)
+    assert counters.covers(now - timedelta(hours=24)) and not counters.covers(now - timedelta(days=3))
+
+
+def test_other_workers_see_increments_and_single_reconciler():
+    redis = _FakeRedis()
+    a = RollingCounters(redis, sync_interval=0)
+    b = RollingCounters(redis, sync_interval=0)
+    assert a.claim_reconcile() and not b.claim_reconcile()
+    a.reconcile([])
+    now = datetime.now(timezone.utc)
+    a.record(ITEMS, [now, now])
+    assert b.ready and b.count(ITEMS, now - timedelta(minutes=1), now) == 2
+
+
+def test_hourly_keys_expire_and_reconcile_swaps_atomically():
+    redis = _FakeRedis()
+    counters = RollingCounters(redis, retention_hours=48, sync_interval=0)
+    now = datetime.now(timezone.utc)
+    counters.record(ITEMS, [now, now - timedelta(hours=3)])
+    hour_keys = [k for k in redis.data if k.startswith("metrics:counters:items:")]
+    assert len(hour_keys) == 2
+    assert all(45 * 3600 < redis.expiry[k] - now.timestamp() <= 49 * 3600 for k in hour_keys)
+
+    # The winning reconciler clears READY so workers use SQL until the rebuild lands
+    redis.set(RollingCounters.READY_KEY, "old")
+    assert counters.claim_reconcile() and RollingCounters.READY_KEY not in redis.data
+    counters.reconcile([(now - timedelta(minutes=5), 4, 0)])
+    # Rebuilt hour replaces the live one, stale hours are dropped, no temp keys are left
+    assert [k for k in redis.data if k.startswith("metrics:counters:items:")] == [counters._key(ITEMS, counters._hour(counters._bucket(now - timedelta(minutes=5))))]
+    assert not any(":rebuild:" in k for k in redis.data)
+    assert counters.ready and counters.count(ITEMS, now - timedelta(hours=4), now) == 4
@@ -0,0 +1,35 @@
+import random
+import time
+
+from src.alphasignal.core.simhash_index import SimhashIndex
+
+
+def _flip(fp, n, rnd):
+    for bit in rnd.sample(range(64), n):
+        fp ^= 1 << bit
+    return fp
+
+
+def test_matches_brute_force_within_threshold():
+    rnd = random.Random(3)
+    index = SimhashIndex(k=6)
+    history = [rnd.getrandbits(64) for _ in range(5000)]
+    for i, fp in enumerate(history):
+        index.add(fp, timestamp=0, payload=i)
+
+    for d in range(0, 10):
+        probe = _flip(history[d * 7], d, rnd)
+        expected = sorted(i for i, fp in enumerate(history) if (probe ^ fp).bit_count() <= 6)
+        assert sorted(p for _, _, p in index.query(probe)) == expected
+        assert index.contains_near(probe) == bool(expected)
+
+
+def test_window_eviction():
+    index = SimhashIndex(k=3, window_seconds=100)
+    now = time.time()
+    index.add(0xFFFF, timestamp=now - 150, payload="old")
+    index.add(0xFFFF0000, timestamp=now - 50, payload="new")
+    index.add(0x1, timestamp=now)  # evicts "old"
+    assert len(index) == 2
+    assert not index.query(0xFFFF)
+    assert [p for _, _, p in index.query(0xFFFF0001)] == ["new"]
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from src.alphasignal.core.fund_engine import FundEngine
+from src.alphasignal.infra.cache.single_flight import RedisLock, SingleFlight
+
+
+def _engine(mocker):
+    engine = FundEngine(db=mocker.MagicMock())
+    engine.redis = None
+    engine._locks = RedisLock(None)
+    return engine
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow, 21))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [21]
+    assert results == [42] * 5 and flight.coalesced == 4
+
+
+def test_concurrent_batch_misses_compute_once(mocker):
+    engine = _engine(mocker)
+    calls = []
+
+    def compute(codes, summary=False):
+        calls.append(list(codes))
+        time.sleep(0.1)
+        return [{"fund_code": c, "estimated_growth": 1.0} for c in codes]
+
+    mocker.patch.object(engine, "_compute_batch_valuation", side_effect=compute)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.calculate_batch_valuation(["F1", "F2"])))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [["F1", "F2"]]
+    assert all([r["fund_code"] for r in res] == ["F1", "F2"] for res in results)
+
+
+def test_stale_valuation_served_while_refreshing(mocker):
+    engine = _engine(mocker)
+    refreshed = threading.Event()
+
+    def compute(codes, summary=False):
+        refreshed.set()
+        return [{"fund_code": c, "estimated_growth": 2.0} for c in codes]
+
+    mocker.patch.object(engine, "_compute_batch_valuation", side_effect=compute)
+    mocker.patch.object(engine, "_cached_valuations",
+                        return_value=({"F1": {"fund_code": "F1", "estimated_growth": 1.5}},
+                                      {"F2": {"fund_code": "F2", "estimated_growth": 0.5}}))
+
+    results = engine.calculate_batch_valuation(["F1", "F2"])
+    assert [r["estimated_growth"] for r in results] == [1.5, 0.5]
+    assert refreshed.wait(2)
+    assert engine._compute_batch_valuation.call_args[0][0] == ["F2"]